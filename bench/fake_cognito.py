@@ -0,0 +1,186 @@
+"""Local stand-in for Cognito, for load tests.
+
+Serves the two things the app talks to Cognito for:
+- The JSON API used by boto3 (InitiateAuth for login and refresh; other
+  operations are rejected with NotAuthorizedException)
+- The user pool's JWKS, with the public half of a key generated at startup
+
+Any email logs in with PASSWORD. Tokens are signed with RS256 and carry the
+issuer and client id of the configured pool, so the app validates them
+exactly as it would real Cognito tokens. Point the app at it with
+COGNITO_ENDPOINT_URL.
+
+Usage:
+    uv run python -m bench.fake_cognito --port 9229 \\
+        --pool-id us-east-1_bench --client-id bench-client
+"""
+
+import argparse
+import asyncio
+import base64
+import time
+import uuid
+from typing import Any
+
+import uvicorn
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwt  # type: ignore[import-untyped]
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+PASSWORD = "Bench-password-1"
+KEY_ID = "bench"
+TOKEN_LIFETIME = 3600
+
+# Same media type as the real service; botocore checks it
+AMZ_JSON = "application/x-amz-json-1.1"
+
+
+def _b64url_uint(value: int) -> str:
+    raw = value.to_bytes((value.bit_length() + 7) // 8, "big")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+class FakeCognito:
+    """Token minting and request handling for one user pool."""
+
+    def __init__(
+        self, pool_id: str, client_id: str, region: str, latency: float
+    ) -> None:
+        self.client_id = client_id
+        self.issuer = f"https://cognito-idp.{region}.amazonaws.com/{pool_id}"
+        self.latency = latency
+        self._tokens: dict[str, dict[str, Any]] = {}
+        # refresh token -> email
+        self._refresh_tokens: dict[str, str] = {}
+        self.key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self.pem = self.key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+        numbers = self.key.public_key().public_numbers()
+        self.jwks = {
+            "keys": [
+                {
+                    "kty": "RSA",
+                    "alg": "RS256",
+                    "use": "sig",
+                    "kid": KEY_ID,
+                    "n": _b64url_uint(numbers.n),
+                    "e": _b64url_uint(numbers.e),
+                }
+            ]
+        }
+
+    def _sign(self, claims: dict[str, Any]) -> str:
+        token: str = jwt.encode(
+            claims, self.pem, algorithm="RS256", headers={"kid": KEY_ID}
+        )
+        return token
+
+    def tokens(self, email: str) -> dict[str, Any]:
+        """Tokens for `email`, minted once (signing costs ~1ms)."""
+        if email not in self._tokens:
+            tokens = self._tokens[email] = self._mint(email)
+            self._refresh_tokens[tokens["RefreshToken"]] = email
+        return self._tokens[email]
+
+    def _mint(self, email: str) -> dict[str, Any]:
+        sub = str(uuid.uuid5(uuid.NAMESPACE_DNS, email))
+        now = int(time.time())
+        common = {
+            "sub": sub,
+            "iss": self.issuer,
+            "iat": now,
+            "exp": now + TOKEN_LIFETIME,
+        }
+        return {
+            "AccessToken": self._sign(
+                {**common, "token_use": "access", "client_id": self.client_id}
+            ),
+            "IdToken": self._sign(
+                {
+                    **common,
+                    "token_use": "id",
+                    "aud": self.client_id,
+                    "email": email,
+                    "email_verified": True,
+                }
+            ),
+            "RefreshToken": f"refresh-{sub}",
+            "ExpiresIn": TOKEN_LIFETIME,
+            "TokenType": "Bearer",
+        }
+
+    def initiate_auth(self, body: dict[str, Any]) -> dict[str, Any] | None:
+        params = body.get("AuthParameters", {})
+        if body.get("AuthFlow") == "USER_PASSWORD_AUTH":
+            if params.get("PASSWORD") != PASSWORD:
+                return None
+            return {"AuthenticationResult": self.tokens(params["USERNAME"])}
+        if body.get("AuthFlow") == "REFRESH_TOKEN_AUTH":
+            email = self._refresh_tokens.get(params.get("REFRESH_TOKEN", ""))
+            if email is None:
+                return None
+            result = dict(self.tokens(email))
+            del result["RefreshToken"]
+            return {"AuthenticationResult": result}
+        return None
+
+
+def _error(code: str, message: str) -> JSONResponse:
+    return JSONResponse(
+        {"__type": code, "message": message}, status_code=400, media_type=AMZ_JSON
+    )
+
+
+def create_app(cognito: FakeCognito) -> Starlette:
+    async def api(request: Request) -> Response:
+        if cognito.latency:
+            await asyncio.sleep(cognito.latency)
+        operation = request.headers.get("x-amz-target", "").rpartition(".")[2]
+        body = await request.json()
+        if operation == "InitiateAuth":
+            result = cognito.initiate_auth(body)
+            if result is None:
+                return _error("NotAuthorizedException", "Incorrect credentials.")
+            return JSONResponse(result, media_type=AMZ_JSON)
+        return _error("NotAuthorizedException", f"{operation} is not supported")
+
+    async def jwks(request: Request) -> JSONResponse:
+        return JSONResponse(cognito.jwks)
+
+    return Starlette(
+        routes=[
+            Route("/", api, methods=["POST"]),
+            Route("/{pool_id}/.well-known/jwks.json", jwks),
+        ]
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9229)
+    parser.add_argument("--pool-id", default="us-east-1_bench")
+    parser.add_argument("--client-id", default="bench-client")
+    parser.add_argument("--region", default="us-east-1")
+    parser.add_argument(
+        "--latency-ms", type=float, default=0.0, help="Added to each API call"
+    )
+    args = parser.parse_args()
+
+    cognito = FakeCognito(
+        args.pool_id, args.client_id, args.region, args.latency_ms / 1000
+    )
+    uvicorn.run(
+        create_app(cognito), host=args.host, port=args.port, log_level="warning"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Startup import-time budget check.
+
+Imports `main` in fresh interpreters with `python -X importtime`, reports the
+best total and the slowest top-level packages, and fails when:
+- the total exceeds the budget (--budget-ms), or
+- a module meant to load lazily (boto3, botocore, httpx, jose) is imported at
+  startup
+
+Usage:
+    uv run python -m bench.importtime
+    uv run python -m bench.importtime --runs 10 --budget-ms 900 --top 15
+"""
+
+import argparse
+import subprocess
+import sys
+from collections import defaultdict
+
+# Generous enough for a laptop or CI runner; tighten once a baseline is known
+DEFAULT_BUDGET_MS = 1200.0
+
+# Heavy modules that must only be imported on first use / during warmup
+LAZY_MODULES = ("boto3", "botocore", "httpx", "jose")
+
+
+def import_profile(module: str) -> dict[str, tuple[int, int]]:
+    """Import `module` in a fresh interpreter.
+
+    Returns:
+        Module name -> (self us, cumulative us) from -X importtime.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{result.stderr}")
+
+    profile: dict[str, tuple[int, int]] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        profile[name.strip()] = (int(self_us), int(cumulative_us))
+    return profile
+
+
+def by_package(profile: dict[str, tuple[int, int]]) -> list[tuple[str, int]]:
+    """Sum self time per top-level package, slowest first."""
+    totals: dict[str, int] = defaultdict(int)
+    for name, (self_us, _) in profile.items():
+        totals[name.split(".")[0]] += self_us
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    # Best of several runs filters out cold disk caches and scheduler noise
+    profiles = [import_profile(args.module) for _ in range(args.runs)]
+    best = min(profiles, key=lambda profile: profile[args.module][1])
+    total_ms = best[args.module][1] / 1000
+
+    print(f"import {args.module}: {total_ms:.1f} ms (best of {args.runs})")
+    print(f"{'package':<30} {'self ms':>8}")
+    for package, self_us in by_package(best)[: args.top]:
+        print(f"{package:<30} {self_us / 1000:>8.1f}")
+
+    failures = []
+    if total_ms > args.budget_ms:
+        failures.append(f"{total_ms:.1f} ms exceeds the {args.budget_ms:.0f} ms budget")
+    eager = [name for name in LAZY_MODULES if name in best]
+    if eager:
+        failures.append(f"imported at startup, should be lazy: {', '.join(eager)}")
+
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}", file=sys.stderr)
+        raise SystemExit(1)
+    print(f"OK: within the {args.budget_ms:.0f} ms budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,421 @@
+"""HTTP load test with latency percentiles and a baseline regression gate.
+
+Starts the app with `python -m core.server` against local stand-ins (a
+SQLite file or --database-url, and bench.fake_cognito for the Cognito API
+and JWKS), then drives each scenario with a closed-loop asyncio client:
+--concurrency connections each send their next request as soon as the
+previous one completes, for --duration seconds after a --warmup period.
+
+Scenarios:
+- health: GET /health (one database round trip)
+- login: POST /auth/login (threadpool + boto3 call to the stand-in)
+- me: GET /auth/me with a bearer token (JWT validation)
+- refresh: POST /auth/refresh
+
+Each scenario reports throughput and p50/p95/p99/p99.9 latency, and is
+compared with bench/baselines/<scenario>.json. The run fails when
+throughput drops, or p50/p95/p99 latency grows, by more than --threshold,
+when more than --max-error-rate of the requests fail, or when a scenario
+has no baseline (unless --update-baselines is writing them). p99.9 is reported
+but not gated: a short run has too few samples beyond p99 to be stable.
+
+Baselines depend on the machine: record them on the runner that enforces
+them (`make bench-baseline`) and commit the JSON files.
+
+Rate limiting is disabled for the app under test, so login and refresh
+measure the endpoints rather than 429 responses.
+
+Usage:
+    make bench
+    uv run python -m bench.load --scenarios health,me --duration 20
+    uv run python -m bench.load --update-baselines
+    uv run python -m bench.load --database-url postgresql+asyncpg://...
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import httpx
+
+from bench.fake_cognito import PASSWORD
+
+BASELINE_DIR = Path(__file__).parent / "baselines"
+PERCENTILES = (50.0, 95.0, 99.0, 99.9)
+GATED_PERCENTILES = ("p50", "p95", "p99")
+POOL_ID = "us-east-1_bench"
+CLIENT_ID = "bench-client"
+EMAIL = "bench@example.com"
+
+
+@dataclass
+class Session:
+    """Credentials shared by the scenarios, from one login at startup."""
+
+    access_token: str = ""
+    refresh_token: str = ""
+    sub: str = ""
+
+
+Scenario = Callable[[httpx.AsyncClient, Session], Awaitable[httpx.Response]]
+
+
+async def _health(client: httpx.AsyncClient, session: Session) -> httpx.Response:
+    return await client.get("/health")
+
+
+async def _login(client: httpx.AsyncClient, session: Session) -> httpx.Response:
+    return await client.post("/auth/login", json={"email": EMAIL, "password": PASSWORD})
+
+
+async def _me(client: httpx.AsyncClient, session: Session) -> httpx.Response:
+    return await client.get(
+        "/auth/me", headers={"Authorization": f"Bearer {session.access_token}"}
+    )
+
+
+async def _refresh(client: httpx.AsyncClient, session: Session) -> httpx.Response:
+    return await client.post(
+        "/auth/refresh",
+        json={"username": session.sub, "refresh_token": session.refresh_token},
+    )
+
+
+SCENARIOS: dict[str, Scenario] = {
+    "health": _health,
+    "login": _login,
+    "me": _me,
+    "refresh": _refresh,
+}
+
+
+@dataclass
+class Result:
+    """Outcome of one scenario run."""
+
+    scenario: str
+    concurrency: int
+    duration_s: float
+    requests: int
+    errors: int
+    throughput_rps: float
+    latency_ms: dict[str, float]
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(p / 100 * len(sorted_values))
+    return sorted_values[min(max(rank, 1), len(sorted_values)) - 1]
+
+
+async def run_scenario(
+    base_url: str,
+    name: str,
+    session: Session,
+    *,
+    concurrency: int,
+    duration: float,
+    warmup: float,
+) -> Result:
+    """Drive one scenario with `concurrency` closed-loop clients."""
+    scenario = SCENARIOS[name]
+    latencies: list[float] = []
+    errors = 0
+    measuring = False
+    stop_at = time.perf_counter() + warmup + duration
+
+    async def client_loop(client: httpx.AsyncClient) -> None:
+        nonlocal errors
+        while time.perf_counter() < stop_at:
+            started = time.perf_counter()
+            try:
+                response = await scenario(client, session)
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            if measuring:
+                latencies.append(time.perf_counter() - started)
+                errors += failed
+
+    limits = httpx.Limits(
+        max_connections=concurrency, max_keepalive_connections=concurrency
+    )
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limits, timeout=30.0
+    ) as client:
+        tasks = [asyncio.create_task(client_loop(client)) for _ in range(concurrency)]
+        await asyncio.sleep(warmup)
+        measuring = True
+        started = time.perf_counter()
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return Result(
+        scenario=name,
+        concurrency=concurrency,
+        duration_s=round(elapsed, 3),
+        requests=len(latencies),
+        errors=errors,
+        throughput_rps=round(len(latencies) / elapsed, 1),
+        latency_ms={
+            f"p{p:g}": round(percentile(latencies, p) * 1000, 3) for p in PERCENTILES
+        },
+    )
+
+
+def compare(
+    result: Result,
+    baseline: dict[str, object],
+    threshold: float,
+    max_error_rate: float,
+) -> list[str]:
+    """Regressions of `result` against a baseline, as readable messages."""
+    failures = []
+    error_rate = result.errors / result.requests if result.requests else 1.0
+    if error_rate > max_error_rate:
+        failures.append(f"error rate {error_rate:.2%} > {max_error_rate:.2%}")
+
+    base_rps = float(baseline["throughput_rps"])  # type: ignore[arg-type]
+    if result.throughput_rps < base_rps * (1 - threshold):
+        failures.append(
+            f"throughput {result.throughput_rps:.0f} rps < baseline {base_rps:.0f}"
+        )
+    base_latency: dict[str, float] = baseline["latency_ms"]  # type: ignore[assignment]
+    for key in GATED_PERCENTILES:
+        current, base = result.latency_ms[key], base_latency[key]
+        if current > base * (1 + threshold):
+            failures.append(f"{key} {current:.2f} ms > baseline {base:.2f} ms")
+    return failures
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return int(sock.getsockname()[1])
+
+
+def _wait_until(url: str, process: subprocess.Popen[bytes], timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"{process.args!r} exited with {process.returncode}")
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise SystemExit(f"{url} not ready after {timeout:.0f}s")
+
+
+def _stop(process: subprocess.Popen[bytes]) -> None:
+    if process.poll() is None:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+@contextmanager
+def stand_ins(workers: int, database_url: str | None, log: Path) -> Iterator[str]:
+    """Start the fake Cognito and the app; yield the app's base URL."""
+    cognito_port, app_port = _free_port(), _free_port()
+    with tempfile.TemporaryDirectory(prefix="bench-") as tmp, open(log, "wb") as out:
+        env = {
+            **os.environ,
+            "DATABASE_URL": database_url or f"sqlite+aiosqlite:///{tmp}/bench.db",
+            "COGNITO_ENDPOINT_URL": f"http://127.0.0.1:{cognito_port}",
+            "COGNITO_USER_POOL_ID": POOL_ID,
+            "COGNITO_CLIENT_ID": CLIENT_ID,
+            "COGNITO_CLIENT_SECRET": "bench-secret",
+            # boto3 signs some calls even when the stand-in ignores it
+            "AWS_ACCESS_KEY_ID": "bench",
+            "AWS_SECRET_ACCESS_KEY": "bench",
+            "RATE_LIMIT_ENABLED": "false",
+            "RATE_LIMIT_SHM_PATH": f"{tmp}/ratelimit",
+            "LOG_LEVEL": "WARNING",
+            "LOG_REQUESTS": "false",
+            "METRICS_ENABLED": "false",
+        }
+        cognito = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "bench.fake_cognito",
+                "--port",
+                str(cognito_port),
+                "--pool-id",
+                POOL_ID,
+                "--client-id",
+                CLIENT_ID,
+            ],
+            stdout=out,
+            stderr=subprocess.STDOUT,
+        )
+        app = None
+        try:
+            _wait_until(
+                f"{env['COGNITO_ENDPOINT_URL']}/{POOL_ID}/.well-known/jwks.json",
+                cognito,
+                timeout=30,
+            )
+            app = subprocess.Popen(
+                [
+                    sys.executable,
+                    "-m",
+                    "core.server",
+                    "--host",
+                    "127.0.0.1",
+                    "--port",
+                    str(app_port),
+                    "--workers",
+                    str(workers),
+                ],
+                env=env,
+                stdout=out,
+                stderr=subprocess.STDOUT,
+            )
+            base_url = f"http://127.0.0.1:{app_port}"
+            _wait_until(f"{base_url}/ready", app, timeout=60)
+            yield base_url
+        finally:
+            if app is not None:
+                _stop(app)
+            _stop(cognito)
+
+
+async def _login_session(base_url: str) -> Session:
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        response = await client.post(
+            "/auth/login", json={"email": EMAIL, "password": PASSWORD}
+        )
+        response.raise_for_status()
+        tokens = response.json()
+        me = await client.get(
+            "/auth/me", headers={"Authorization": f"Bearer {tokens['access_token']}"}
+        )
+        me.raise_for_status()
+    return Session(
+        access_token=tokens["access_token"],
+        refresh_token=tokens["refresh_token"],
+        sub=me.json()["sub"],
+    )
+
+
+def _print_result(result: Result) -> None:
+    latency = "  ".join(f"{k} {v:8.2f}" for k, v in result.latency_ms.items())
+    print(
+        f"{result.scenario:<10} {result.throughput_rps:>9.1f} rps"
+        f"  {result.requests:>7} req  {result.errors:>4} err  {latency} ms"
+    )
+
+
+async def run(args: argparse.Namespace, base_url: str) -> list[Result]:
+    session = await _login_session(base_url)
+    results = []
+    for name in args.scenarios:
+        result = await run_scenario(
+            base_url,
+            name,
+            session,
+            concurrency=args.concurrency,
+            duration=args.duration,
+            warmup=args.warmup,
+        )
+        _print_result(result)
+        results.append(result)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--scenarios",
+        type=lambda value: value.split(","),
+        default=list(SCENARIOS),
+        help=f"Comma-separated, from: {', '.join(SCENARIOS)}",
+    )
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--database-url", help="Default: a temporary SQLite file")
+    parser.add_argument(
+        "--threshold", type=float, default=0.25, help="Allowed regression ratio"
+    )
+    parser.add_argument("--max-error-rate", type=float, default=0.001)
+    parser.add_argument("--baselines", type=Path, default=BASELINE_DIR)
+    parser.add_argument(
+        "--update-baselines",
+        action="store_true",
+        help="Write the results as the new baselines instead of comparing",
+    )
+    parser.add_argument("--output", type=Path, help="Also write results as JSON")
+    parser.add_argument(
+        "--log", type=Path, default=Path(tempfile.gettempdir()) / "bench-load.log"
+    )
+    args = parser.parse_args()
+
+    unknown = set(args.scenarios) - SCENARIOS.keys()
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    print(
+        f"{args.concurrency} connections, {args.duration:g}s per scenario, "
+        f"{args.workers} worker(s); server log: {args.log}"
+    )
+    with stand_ins(args.workers, args.database_url, args.log) as base_url:
+        results = asyncio.run(run(args, base_url))
+
+    if args.output:
+        args.output.write_text(
+            json.dumps([asdict(result) for result in results], indent=2) + "\n"
+        )
+
+    if args.update_baselines:
+        args.baselines.mkdir(parents=True, exist_ok=True)
+        for result in results:
+            path = args.baselines / f"{result.scenario}.json"
+            path.write_text(json.dumps(asdict(result), indent=2) + "\n")
+        print(f"Baselines written to {args.baselines}")
+        return
+
+    failures = []
+    for result in results:
+        path = args.baselines / f"{result.scenario}.json"
+        if not path.exists():
+            failures.append(
+                f"{result.scenario}: no baseline at {path} "
+                "(record one with --update-baselines)"
+            )
+            continue
+        baseline = json.loads(path.read_text())
+        for failure in compare(result, baseline, args.threshold, args.max_error_rate):
+            failures.append(f"{result.scenario}: {failure}")
+
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}", file=sys.stderr)
+        raise SystemExit(1)
+    print(f"OK: within {args.threshold:.0%} of the baselines")
+
+
+if __name__ == "__main__":
+    main()
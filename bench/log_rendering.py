@@ -0,0 +1,97 @@
+"""JSON log rendering benchmark.
+
+Compares the stdlib JSON pipeline (structlog -> ProcessorFormatter ->
+JSONRenderer -> StreamHandler) with the fast path (FastJSONRenderer writing
+bytes directly). Output goes to /dev/null, without queueing, so only the
+work done by the logging call itself is measured.
+
+Usage:
+    uv run python -m bench.log_rendering
+    uv run python -m bench.log_rendering --events 50000 --rounds 10
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections.abc import Callable
+
+import structlog
+
+from core.logging import configure_logging, get_logger, shutdown_logging
+
+REQUEST_ID = "0b6f6a4e-5f0c-4b7e-9d1a-2f1d3c4b5a69"
+
+
+def _plain(logger: structlog.stdlib.BoundLogger, index: int) -> None:
+    logger.info("Cache miss")
+
+
+def _request(logger: structlog.stdlib.BoundLogger, index: int) -> None:
+    logger.info(
+        "Request completed",
+        method="GET",
+        path="/auth/me",
+        status_code=200,
+        duration_ms=index / 100,
+    )
+
+
+SCENARIOS: dict[str, Callable[[structlog.stdlib.BoundLogger, int], None]] = {
+    "plain": _plain,
+    "request": _request,
+}
+
+
+def measure(fast: bool, scenario: str, events: int) -> float:
+    """Return log events per second for one configuration and scenario."""
+    configure_logging(level="INFO", format="json", fast_json=fast)
+    logger = get_logger("bench")
+    emit = SCENARIOS[scenario]
+    with structlog.contextvars.bound_contextvars(request_id=REQUEST_ID):
+        start = time.perf_counter()
+        for index in range(events):
+            emit(logger, index)
+        elapsed = time.perf_counter() - start
+    shutdown_logging()
+    return events / elapsed
+
+
+def run(events: int, rounds: int) -> None:
+    print(
+        f"{'scenario':<10} {'stdlib ev/s':>12} {'fast ev/s':>12} {'speedup':>8}",
+        file=sys.__stdout__,
+    )
+    for scenario in SCENARIOS:
+        measure(False, scenario, 500)
+        measure(True, scenario, 500)
+
+        # Interleave rounds and keep the best of each to filter scheduler noise
+        stdlib_eps = fast_eps = 0.0
+        for _ in range(rounds):
+            stdlib_eps = max(stdlib_eps, measure(False, scenario, events))
+            fast_eps = max(fast_eps, measure(True, scenario, events))
+        print(
+            f"{scenario:<10} {stdlib_eps:>12.0f} {fast_eps:>12.0f} "
+            f"{fast_eps / stdlib_eps:>7.2f}x",
+            file=sys.__stdout__,
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    # Log output is discarded; results are printed to the original stdout
+    with open(os.devnull, "w") as devnull:
+        sys.stdout = devnull
+        try:
+            run(args.events, args.rounds)
+        finally:
+            sys.stdout = sys.__stdout__
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""Microbenchmarks for per-request hot paths.
+
+Each case runs in-process, without a server or network:
+- asgi.bare / asgi.middleware: GET through a bare app and through one with
+  register_middleware(), driven by a raw ASGI call
+- auth.user_warm / auth.user_cold: get_current_user with the parsed
+  signing key cached, and with the key cache cleared before each call (the
+  JWKS itself is preloaded; fetching it is network time, not measured here)
+- auth.secret_hash: CognitoService._get_secret_hash
+- schema.*: parsing auth request bodies and dumping auth responses
+- db.session / db.select1: get_db acquire and release, without and with a
+  query (the query is what checks a connection out of the pool), against
+  the configured DATABASE_URL
+
+Every case runs --rounds rounds of --iterations calls after a warm-up round,
+with a gc.collect() before each round. The median time per call is reported
+with the minimum and the interquartile range (as a percentage of the
+median) as a noise indicator. Compare runs on the same machine only.
+
+Usage:
+    make bench-micro
+    uv run python -m bench.micro --output micro.json
+    uv run python -m bench.micro --compare micro.json --filter auth.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import gc
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+from fastapi import FastAPI
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import text
+from starlette.requests import Request
+from starlette.types import Message
+
+from bench.fake_cognito import FakeCognito
+from core.middleware import register_middleware
+from core.responses import FastJSONResponse
+from db.database import close_db, get_db
+from features.auth_aws_cognito import dependencies as auth_dependencies
+from features.auth_aws_cognito.schemas import (
+    LoginRequest,
+    RegisterRequest,
+    TokenResponse,
+    UserResponse,
+)
+from features.auth_aws_cognito.services import CognitoService
+from settings import settings
+
+
+@dataclass
+class Case:
+    """A benchmarked operation: a sync callable or a coroutine function."""
+
+    name: str
+    call: Callable[[], Any]
+    is_async: bool = False
+
+
+@dataclass
+class Timing:
+    """Per-call timings of one case, in microseconds."""
+
+    median_us: float
+    min_us: float
+    iqr_pct: float
+    rounds: int
+    iterations: int
+
+
+def _scope(path: str, headers: list[tuple[bytes, bytes]]) -> dict[str, Any]:
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"bench"), *headers],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+
+
+async def call(app: FastAPI, path: str) -> None:
+    """Issue one GET through the ASGI interface and discard the response."""
+    received = False
+
+    async def receive() -> Message:
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # Middleware may keep listening for a disconnect; none comes
+        await asyncio.Event().wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: Message) -> None:
+        pass
+
+    await app(_scope(path, []), receive, send)
+
+
+def build_app(middleware: bool) -> FastAPI:
+    app = FastAPI(default_response_class=FastJSONResponse)
+    if middleware:
+        register_middleware(app)
+
+    @app.get("/ping")
+    async def ping() -> dict[str, str]:
+        return {"status": "ok"}
+
+    return app
+
+
+def auth_cases() -> list[Case]:
+    cognito = FakeCognito(
+        settings.cognito_user_pool_id,
+        settings.cognito_client_id,
+        settings.cognito_region,
+        latency=0.0,
+    )
+    token = cognito.tokens("bench@example.com")["AccessToken"]
+    auth_dependencies._set_jwks(cognito.jwks, time.time() + 86_400)
+    request = Request(
+        _scope("/auth/me", [(b"authorization", f"Bearer {token}".encode())])
+    )
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+    async def user_warm() -> None:
+        await auth_dependencies.get_current_user(request, credentials)
+
+    async def user_cold() -> None:
+        auth_dependencies._signing_keys.clear()
+        await auth_dependencies.get_current_user(request, credentials)
+
+    service = CognitoService()
+    return [
+        Case("auth.user_warm", user_warm, is_async=True),
+        Case("auth.user_cold", user_cold, is_async=True),
+        Case("auth.secret_hash", lambda: service._get_secret_hash("bench@example.com")),
+    ]
+
+
+def schema_cases() -> list[Case]:
+    login = b'{"email": "bench@example.com", "password": "Bench-password-1"}'
+    tokens = TokenResponse(
+        access_token="a" * 900,
+        id_token="i" * 1100,
+        refresh_token="r" * 1700,
+        expires_in=3600,
+    )
+    user = UserResponse(
+        sub="0b6f6a4e-5f0c-4b7e-9d1a-2f1d3c4b5a69",
+        email="bench@example.com",
+        email_verified=True,
+    )
+    return [
+        Case("schema.login_parse", lambda: LoginRequest.model_validate_json(login)),
+        Case(
+            "schema.register_parse", lambda: RegisterRequest.model_validate_json(login)
+        ),
+        Case("schema.token_dump", tokens.model_dump_json),
+        Case("schema.user_dump", user.model_dump_json),
+    ]
+
+
+def db_cases() -> list[Case]:
+    request = Request(_scope("/", []))
+
+    async def session() -> None:
+        generator = get_db(request)
+        await anext(generator)
+        with contextlib.suppress(StopAsyncIteration):
+            await anext(generator)
+
+    async def select1() -> None:
+        generator = get_db(request)
+        db = await anext(generator)
+        await db.execute(text("SELECT 1"))
+        with contextlib.suppress(StopAsyncIteration):
+            await anext(generator)
+
+    return [
+        Case("db.session", session, is_async=True),
+        Case("db.select1", select1, is_async=True),
+    ]
+
+
+def asgi_cases() -> list[Case]:
+    bare, full = build_app(middleware=False), build_app(middleware=True)
+    return [
+        Case("asgi.bare", lambda: call(bare, "/ping"), is_async=True),
+        Case("asgi.middleware", lambda: call(full, "/ping"), is_async=True),
+    ]
+
+
+async def _time_round(case: Case, iterations: int) -> float:
+    gc.collect()
+    if case.is_async:
+        started = time.perf_counter_ns()
+        for _ in range(iterations):
+            await case.call()
+    else:
+        started = time.perf_counter_ns()
+        for _ in range(iterations):
+            case.call()
+    return (time.perf_counter_ns() - started) / iterations / 1000
+
+
+async def measure(case: Case, iterations: int, rounds: int) -> Timing:
+    await _time_round(case, max(iterations // 10, 1))
+    samples = sorted([await _time_round(case, iterations) for _ in range(rounds)])
+    median = statistics.median(samples)
+    quartiles = statistics.quantiles(samples, n=4) if rounds > 1 else [median] * 3
+    return Timing(
+        median_us=round(median, 3),
+        min_us=round(samples[0], 3),
+        iqr_pct=round((quartiles[2] - quartiles[0]) / median * 100, 1),
+        rounds=rounds,
+        iterations=iterations,
+    )
+
+
+def _commit() -> str | None:
+    result = subprocess.run(
+        ["git", "rev-parse", "--short", "HEAD"],
+        capture_output=True,
+        text=True,
+        check=False,
+        cwd=Path(__file__).parent,
+    )
+    return result.stdout.strip() or None
+
+
+async def run(args: argparse.Namespace) -> dict[str, Timing]:
+    cases = [*asgi_cases(), *auth_cases(), *schema_cases(), *db_cases()]
+    results = {}
+    try:
+        for case in cases:
+            if args.filter and not case.name.startswith(args.filter):
+                continue
+            results[case.name] = await measure(case, args.iterations, args.rounds)
+    finally:
+        await close_db()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--filter", default="", help="Only cases with this prefix")
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    parser.add_argument("--compare", type=Path, help="Earlier --output to diff with")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    previous = {}
+    if args.compare:
+        previous = json.loads(args.compare.read_text())["results"]
+
+    print(f"{'case':<24} {'median us':>10} {'min us':>10} {'iqr %':>6}", end="")
+    print(f" {'change':>8}" if previous else "")
+    for name, timing in results.items():
+        line = (
+            f"{name:<24} {timing.median_us:>10.2f} {timing.min_us:>10.2f}"
+            f" {timing.iqr_pct:>6.1f}"
+        )
+        if name in previous:
+            before = previous[name]["median_us"]
+            line += f" {(timing.median_us - before) / before:>+8.1%}"
+        print(line)
+
+    if args.output:
+        report = {
+            "commit": _commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "results": {name: asdict(timing) for name, timing in results.items()},
+        }
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
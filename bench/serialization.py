@@ -0,0 +1,152 @@
+"""Response serialization benchmark.
+
+Compares FastAPI's stock response path (validate the returned model again,
+then render) with FastJSONResponse + ModelResponseRoute for the auth schemas
+and a ListResponse page. Requests are driven in-process through a raw ASGI
+call so only routing and serialization are measured.
+
+Usage:
+    uv run python -m bench.serialization
+    uv run python -m bench.serialization --iterations 5000 --rounds 10
+"""
+
+import argparse
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+
+from fastapi import APIRouter, FastAPI
+from pydantic import BaseModel
+from starlette.types import Message, Scope
+
+from core.responses import FastJSONResponse, ModelResponseRoute
+from core.schemas import ListResponse, PaginationMeta
+from features.auth_aws_cognito.schemas import (
+    RegisterResponse,
+    TokenResponse,
+    UserResponse,
+)
+
+TOKEN = "eyJraWQiOiJrZXkiLCJhbGciOiJSUzI1NiJ9." + "a" * 800 + ".signature"
+
+PAYLOADS: dict[str, BaseModel] = {
+    "register": RegisterResponse(
+        message="Registration successful. Please check your email.",
+        user_sub="0b6f6a4e-5f0c-4b7e-9d1a-2f1d3c4b5a69",
+    ),
+    "token": TokenResponse(
+        access_token=TOKEN, id_token=TOKEN, refresh_token=TOKEN, expires_in=3600
+    ),
+    "me": UserResponse(
+        sub="0b6f6a4e-5f0c-4b7e-9d1a-2f1d3c4b5a69",
+        email="user@example.com",
+        email_verified=True,
+    ),
+    "list": ListResponse[UserResponse](
+        items=[
+            UserResponse(
+                sub=f"0b6f6a4e-5f0c-4b7e-9d1a-{i:012d}",
+                email=f"user{i}@example.com",
+                email_verified=i % 2 == 0,
+            )
+            for i in range(50)
+        ],
+        meta=PaginationMeta(page=1, page_size=50, total_items=500, total_pages=10),
+    ),
+}
+
+
+def build_app(fast: bool) -> FastAPI:
+    """Build a bare app serving every payload, with or without the fast path."""
+    if fast:
+        app = FastAPI(default_response_class=FastJSONResponse)
+        router = APIRouter(route_class=ModelResponseRoute)
+    else:
+        app = FastAPI()
+        router = APIRouter()
+
+    for name, payload in PAYLOADS.items():
+        router.add_api_route(
+            f"/{name}",
+            _returning(payload),
+            methods=["GET"],
+            response_model=type(payload),
+        )
+
+    app.include_router(router)
+    return app
+
+
+def _returning(payload: BaseModel) -> Callable[[], Awaitable[BaseModel]]:
+    """Build a parameterless endpoint that returns a prebuilt model."""
+
+    async def endpoint() -> BaseModel:
+        return payload
+
+    return endpoint
+
+
+async def call(app: FastAPI, path: str) -> None:
+    """Issue one GET through the ASGI interface and discard the response."""
+    scope: Scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+
+    async def receive() -> Message:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: Message) -> None:
+        pass
+
+    await app(scope, receive, send)
+
+
+async def measure(app: FastAPI, path: str, iterations: int) -> float:
+    """Return requests per second for `iterations` sequential calls."""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await call(app, path)
+    return iterations / (time.perf_counter() - start)
+
+
+async def run(iterations: int, rounds: int) -> None:
+    stock, fast = build_app(fast=False), build_app(fast=True)
+
+    print(f"{'schema':<10} {'stock req/s':>12} {'fast req/s':>12} {'speedup':>8}")
+    for name in PAYLOADS:
+        path = f"/{name}"
+        await measure(stock, path, 200)
+        await measure(fast, path, 200)
+
+        # Interleave rounds and keep the best of each to filter scheduler noise
+        stock_rps = fast_rps = 0.0
+        for _ in range(rounds):
+            stock_rps = max(stock_rps, await measure(stock, path, iterations))
+            fast_rps = max(fast_rps, await measure(fast, path, iterations))
+        print(
+            f"{name:<10} {stock_rps:>12.0f} {fast_rps:>12.0f} "
+            f"{fast_rps / stock_rps:>7.2f}x"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args.iterations, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,20 @@
 """Shared test fixtures."""
 
-import pytest
-from httpx import ASGITransport, AsyncClient
+import os
+import tempfile
 
-from main import app
+# Settings are validated on import: give tests what a .env file would
+os.environ.setdefault("COGNITO_USER_POOL_ID", "us-east-1_test")
+os.environ.setdefault("COGNITO_CLIENT_ID", "test-client-id")
+os.environ.setdefault("COGNITO_CLIENT_SECRET", "test-client-secret")
+_test_dir = tempfile.mkdtemp(prefix="paxx-test-")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{_test_dir}/test.db")
+os.environ.setdefault("RATE_LIMIT_SHM_PATH", f"{_test_dir}/ratelimit")
+
+import pytest  # noqa: E402
+from httpx import ASGITransport, AsyncClient  # noqa: E402
+
+from main import app  # noqa: E402
 
 
 @pytest.fixture
@@ -1,18 +1,38 @@
 """Core utilities module.
 
 This module provides reusable components for the application:
-- dependencies: Common FastAPI dependencies (pagination, etc.)
+- cache: Per-worker response cache and the cache_response route decorator
+- conditional: ETag helpers and the etag_version route decorator
+- dependencies: Common FastAPI dependencies (pagination, sparse
+  fieldsets)
 - logging: Structured logging with structlog
+- responses: Fast JSON response class, response-model route class and
+  streaming list responses
 - schemas: Standard response schemas (success, error, list)
 
 Usage:
-    from core.dependencies import get_pagination, PaginationParams
+    from core.cache import cache_response, response_cache
+    from core.conditional import etag_version
+    from core.dependencies import get_pagination, PaginationParams, sparse_fields
     from core.logging import get_logger
+    from core.responses import FastJSONResponse, StreamingListResponse
     from core.schemas import SuccessResponse, ErrorResponse, ListResponse
 """
 
-from core.dependencies import PaginationParams, get_pagination
+from core.cache import cache_response, response_cache
+from core.conditional import etag_version
+from core.dependencies import (
+    FieldSelection,
+    PaginationParams,
+    get_pagination,
+    sparse_fields,
+)
 from core.logging import configure_logging, get_logger
+from core.responses import (
+    FastJSONResponse,
+    ModelResponseRoute,
+    StreamingListResponse,
+)
 from core.schemas import (
     ErrorResponse,
     ListResponse,
@@ -21,10 +41,18 @@ from core.schemas import (
 )
 
 __all__ = [
+    "cache_response",
+    "response_cache",
+    "etag_version",
     "PaginationParams",
     "get_pagination",
+    "FieldSelection",
+    "sparse_fields",
     "configure_logging",
     "get_logger",
+    "FastJSONResponse",
+    "ModelResponseRoute",
+    "StreamingListResponse",
     "SuccessResponse",
     "ErrorResponse",
     "ListResponse",
@@ -0,0 +1,182 @@
+"""Admission control (load shedding) for incoming requests.
+
+Caps the number of requests a worker processes concurrently. Requests over
+the cap wait in a bounded priority queue; requests that cannot be queued,
+are evicted by a higher-priority request or wait longer than the queue
+timeout are shed (the middleware answers 503 with Retry-After).
+
+Priority classes (highest first):
+- CRITICAL: settings.admission_critical_paths (e.g. /health)
+- HIGH: authenticated reads (GET/HEAD with an Authorization header)
+- NORMAL: everything else
+- LOW: settings.admission_low_priority_paths (e.g. /auth/register)
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from enum import IntEnum
+
+from fastapi import Request
+
+from core.metrics import counter, gauge, histogram
+from settings import settings
+
+in_flight_gauge = gauge("admission_in_flight", "Requests currently being processed")
+queue_depth_gauge = gauge("admission_queue_depth", "Requests waiting for a slot")
+admitted_total = counter(
+    "admission_admitted", "Requests admitted for processing", ["priority"]
+)
+shed_total = counter(
+    "admission_shed", "Requests rejected by admission control", ["priority", "reason"]
+)
+queue_wait_seconds = histogram(
+    "admission_queue_wait_seconds",
+    "Time admitted requests spent in the wait queue",
+    ["priority"],
+)
+
+
+class Priority(IntEnum):
+    """Admission priority classes (lower value wins)."""
+
+    CRITICAL = 0
+    HIGH = 1
+    NORMAL = 2
+    LOW = 3
+
+
+class RequestShed(Exception):
+    """Raised when a request is rejected by admission control.
+
+    Attributes:
+        reason: queue_full, evicted or queue_timeout.
+    """
+
+    def __init__(self, reason: str) -> None:
+        self.reason = reason
+        super().__init__(reason)
+
+
+class AdmissionController:
+    """Per-worker in-flight cap with a bounded priority wait queue.
+
+    Slots are handed over directly from a finishing request to the best
+    waiter, so a queued request is never overtaken by a newcomer of the
+    same priority.
+    """
+
+    def __init__(
+        self, max_in_flight: int, max_queue: int, queue_timeout: float
+    ) -> None:
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters: list[tuple[int, int, asyncio.Future[None]]] = []
+        self._sequence = itertools.count()
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of requests currently waiting for a slot."""
+        return len(self._waiters)
+
+    async def acquire(self, priority: Priority) -> None:
+        """Wait for a processing slot.
+
+        Raises:
+            RequestShed: If the request is rejected instead of admitted.
+        """
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            in_flight_gauge.set(self.in_flight)
+            self._admit(priority, 0.0)
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            self._evict_below(priority)
+
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        entry = (int(priority), next(self._sequence), future)
+        heapq.heappush(self._waiters, entry)
+        queue_depth_gauge.set(len(self._waiters))
+        start = time.monotonic()
+
+        try:
+            async with asyncio.timeout(self.queue_timeout):
+                await future
+        except TimeoutError:
+            if not _owns_slot(future):
+                self._remove(entry)
+                shed_total.inc(priority=priority.name, reason="queue_timeout")
+                raise RequestShed("queue_timeout") from None
+        except asyncio.CancelledError:
+            # Client went away while queued
+            if _owns_slot(future):
+                self.release()
+            else:
+                self._remove(entry)
+            raise
+
+        self._admit(priority, time.monotonic() - start)
+
+    def release(self) -> None:
+        """Release a slot, handing it to the best waiting request if any."""
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                queue_depth_gauge.set(len(self._waiters))
+                return
+        queue_depth_gauge.set(0)
+        self.in_flight -= 1
+        in_flight_gauge.set(self.in_flight)
+
+    def _admit(self, priority: Priority, waited: float) -> None:
+        admitted_total.inc(priority=priority.name)
+        queue_wait_seconds.observe(waited, priority=priority.name)
+
+    def _evict_below(self, priority: Priority) -> None:
+        """Make room in a full queue by evicting a lower-priority waiter."""
+        worst = max(self._waiters, default=None, key=lambda entry: entry[:2])
+        if worst is None or worst[0] <= priority:
+            shed_total.inc(priority=priority.name, reason="queue_full")
+            raise RequestShed("queue_full")
+
+        self._remove(worst)
+        worst[2].set_exception(RequestShed("evicted"))
+        shed_total.inc(priority=Priority(worst[0]).name, reason="evicted")
+
+    def _remove(self, entry: tuple[int, int, asyncio.Future[None]]) -> None:
+        try:
+            self._waiters.remove(entry)
+        except ValueError:
+            return
+        heapq.heapify(self._waiters)
+        queue_depth_gauge.set(len(self._waiters))
+
+
+def _owns_slot(future: asyncio.Future[None]) -> bool:
+    """Check whether a slot was handed to this waiter."""
+    return future.done() and not future.cancelled() and future.exception() is None
+
+
+def classify_request(request: Request) -> Priority:
+    """Map a request to its admission priority class."""
+    path = request.url.path
+    if path in settings.admission_critical_paths:
+        return Priority.CRITICAL
+    if path in settings.admission_low_priority_paths:
+        return Priority.LOW
+    if request.method in ("GET", "HEAD") and "authorization" in request.headers:
+        return Priority.HIGH
+    return Priority.NORMAL
+
+
+# Per-worker controller used by the admission control middleware
+admission_controller = AdmissionController(
+    max_in_flight=settings.admission_max_in_flight,
+    max_queue=settings.admission_max_queue,
+    queue_timeout=settings.admission_queue_timeout,
+)
@@ -0,0 +1,346 @@
+"""In-process dispatch of batched sub-requests (POST /batch).
+
+A page that makes a dozen small API calls pays TLS, proxy and connection
+costs for each of them. The batch endpoint takes a list of sub-requests and
+runs them through the ASGI app inside the worker, concurrently (up to
+settings.batch_concurrency at a time), then returns all responses together.
+
+Sub-requests go through the full middleware stack, so rate limits, caching,
+ETags and idempotency apply to each of them, except:
+
+- Admission control and drain tracking, which already count the batch
+  request itself (a sub-request waiting for a slot its own batch holds
+  would deadlock).
+- Deadlines: each sub-request gets the time left to the batch request.
+- In atomic batches, idempotency, the response cache and single-flight:
+  they would keep or share responses built on the batch's transaction,
+  which may still be rolled back (see in_atomic_batch()).
+
+Sub-requests inherit the batch request's headers (Authorization, cookies,
+Accept-Language, ...) minus those describing the batch body itself, and can
+add or override headers of their own.
+
+State shared by the sub-requests of one batch lives in a BatchContext,
+reachable from their scope with batch_context():
+
+- shared(): run a coroutine once per batch, e.g. validating the bearer
+  token (see features.auth_aws_cognito.dependencies.get_current_user).
+- session: for atomic batches, the single database session every
+  sub-request gets from db.database.get_db. Atomic batches run one
+  sub-request at a time, since a session must not be used concurrently.
+"""
+
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable, Sequence
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+from urllib.parse import unquote
+
+from pydantic_core import to_json
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Scope
+
+from core.deadlines import remaining
+from core.logging import get_logger
+from core.metrics import counter, histogram
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = get_logger(__name__)
+
+batch_size = histogram(
+    "batch_size",
+    "Sub-requests per batch request",
+    buckets=(1, 2, 5, 10, 15, 20, 25, 50),
+)
+batch_subrequests_total = counter(
+    "batch_subrequests",
+    "Batched sub-requests, by status class",
+    ["status"],
+)
+
+# Scope state key holding the BatchContext of a sub-request
+STATE_KEY = "batch"
+
+# ASGI scope keys a sub-request takes over from the batch request
+_SCOPE_KEYS = (
+    "type",
+    "asgi",
+    "http_version",
+    "scheme",
+    "server",
+    "client",
+    "root_path",
+)
+
+# Batch request headers that describe the batch itself, not its sub-requests
+_NOT_INHERITED = frozenset(
+    {
+        b"content-length",
+        b"content-type",
+        b"transfer-encoding",
+        b"connection",
+        b"expect",
+        b"idempotency-key",
+        b"if-none-match",
+        b"if-modified-since",
+        b"x-request-id",
+        b"x-request-timeout",
+    }
+)
+
+# Response headers left out of the batch response
+_NOT_RETURNED = frozenset({"content-length", "connection", "transfer-encoding"})
+
+
+@dataclass
+class SubRequest:
+    """A request to dispatch as part of a batch.
+
+    Attributes:
+        method: HTTP method.
+        path: Path of the route, optionally with a query string.
+        headers: Headers added to (or replacing) the inherited ones.
+        body: Encoded request body, if any.
+    """
+
+    method: str
+    path: str
+    headers: dict[str, str] = field(default_factory=dict)
+    body: bytes | None = None
+
+
+@dataclass
+class SubResponse:
+    """Response of a sub-request, as sent by the app."""
+
+    status: int
+    headers: list[tuple[bytes, bytes]]
+    body: bytes
+
+
+# Answer for sub-requests of an atomic batch after one of them failed
+NOT_RUN = SubResponse(
+    status=424,
+    headers=[(b"content-type", b"application/json")],
+    body=b'{"message":"Not run: an earlier request in the batch failed"}',
+)
+
+
+class BatchContext:
+    """State shared by the sub-requests of one batch.
+
+    Attributes:
+        session: Database session shared by all sub-requests (atomic batches
+            only); the batch endpoint commits or rolls it back.
+    """
+
+    def __init__(self, session: "AsyncSession | None" = None) -> None:
+        self.session = session
+        self._shared: dict[Hashable, asyncio.Future[Any]] = {}
+
+    async def shared(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Run factory() once per batch for `key`; other callers share its result.
+
+        A failure is shared too: every caller gets the same exception.
+        """
+        future = self._shared.get(key)
+        if future is None:
+            future = self._shared[key] = asyncio.ensure_future(factory())
+        # One cancelled sub-request must not cancel the others' result
+        return await asyncio.shield(future)
+
+
+def batch_context(scope: Scope) -> BatchContext | None:
+    """Return the BatchContext when `scope` is a batched sub-request."""
+    state = scope.get("state")
+    return state.get(STATE_KEY) if state else None
+
+
+def in_atomic_batch(scope: Scope) -> bool:
+    """Whether `scope` is a sub-request of an atomic batch.
+
+    Its database writes are only committed if the whole batch succeeds, so
+    its response must not outlive the batch (stored for replay, cached or
+    shared with other requests).
+    """
+    context = batch_context(scope)
+    return context is not None and context.session is not None
+
+
+def _sub_scope(
+    parent: Scope, request: SubRequest, context: BatchContext, request_id: str
+) -> Scope:
+    path, _, query = request.path.partition("?")
+
+    overrides = {
+        name.lower().encode("latin-1"): value.encode("latin-1")
+        for name, value in request.headers.items()
+    }
+    headers = [
+        (name, value)
+        for name, value in parent["headers"]
+        if name not in _NOT_INHERITED and name not in overrides
+    ]
+    headers.extend(overrides.items())
+    if request.body is not None:
+        headers.append((b"content-length", str(len(request.body)).encode()))
+        if b"content-type" not in overrides:
+            headers.append((b"content-type", b"application/json"))
+    if b"x-request-id" not in overrides:
+        headers.append((b"x-request-id", request_id.encode("latin-1")))
+    left = remaining()
+    if left is not None:
+        headers.append((b"x-request-timeout", f"{left:.3f}".encode()))
+
+    return {
+        **{key: parent[key] for key in _SCOPE_KEYS if key in parent},
+        "method": request.method,
+        # Decoded like a server does; the route sees the same path parameters
+        "path": unquote(path),
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "headers": headers,
+        "state": {**parent.get("state", {}), STATE_KEY: context},
+    }
+
+
+async def call_subrequest(
+    app: ASGIApp,
+    parent: Scope,
+    request: SubRequest,
+    context: BatchContext,
+    request_id: str,
+) -> SubResponse:
+    """Run one sub-request through `app` and collect its response."""
+    scope = _sub_scope(parent, request, context, request_id)
+    received = False
+
+    async def receive() -> Message:
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": request.body or b""}
+        # Only a disconnect would come next: the batch request owns the
+        # connection, and cancels its sub-requests if the client leaves
+        await asyncio.Event().wait()
+        return {"type": "http.disconnect"}
+
+    status = 0
+    headers: list[tuple[bytes, bytes]] = []
+    chunks: list[bytes] = []
+
+    async def send(message: Message) -> None:
+        nonlocal status, headers
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            headers = list(message.get("headers", []))
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    try:
+        await app(scope, receive, send)
+    except Exception:
+        # The app already answered 500 if it could; the exception is
+        # re-raised for the server to log, which is us here
+        logger.exception(
+            "Batch sub-request failed", method=request.method, path=scope["path"]
+        )
+        if not status:
+            status = 500
+            headers = [(b"content-type", b"application/json")]
+            chunks = [b'{"message":"Internal server error"}']
+
+    batch_subrequests_total.inc(status=f"{status // 100}xx")
+    return SubResponse(status=status, headers=headers, body=b"".join(chunks))
+
+
+async def dispatch_batch(
+    app: ASGIApp,
+    parent: Scope,
+    requests: Sequence[SubRequest],
+    context: BatchContext,
+    *,
+    concurrency: int,
+    atomic: bool = False,
+) -> list[SubResponse]:
+    """Run sub-requests through `app`, returning responses in request order.
+
+    Args:
+        app: The ASGI app (with its middleware) to dispatch to.
+        parent: Scope of the batch request.
+        requests: Sub-requests to run.
+        context: State shared by the sub-requests.
+        concurrency: Sub-requests run at the same time.
+        atomic: Run sub-requests one at a time and stop at the first error
+            response (status >= 400); the rest are answered with 424.
+    """
+    batch_size.observe(len(requests))
+    parent_id = parent.get("state", {}).get("request_id") or "batch"
+
+    if atomic:
+        responses: list[SubResponse] = []
+        for index, request in enumerate(requests):
+            if responses and responses[-1].status >= 400:
+                responses.append(NOT_RUN)
+                continue
+            responses.append(
+                await call_subrequest(
+                    app, parent, request, context, f"{parent_id}.{index}"
+                )
+            )
+        return responses
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(index: int, request: SubRequest) -> SubResponse:
+        async with semaphore:
+            return await call_subrequest(
+                app, parent, request, context, f"{parent_id}.{index}"
+            )
+
+    return list(
+        await asyncio.gather(*(run(index, r) for index, r in enumerate(requests)))
+    )
+
+
+def _encode_response(response: SubResponse) -> bytes:
+    headers = Headers(raw=response.headers)
+    body = response.body
+    media_type = headers.get("content-type", "").partition(";")[0].strip()
+    if not body:
+        body = b"null"
+    elif not (media_type == "application/json" or media_type.endswith("+json")):
+        body = to_json(body.decode("utf-8", errors="replace"))
+    # JSON bodies are embedded as sent, without parsing them again
+    return b"".join(
+        (
+            b'{"status":',
+            str(response.status).encode(),
+            b',"headers":',
+            to_json(
+                {
+                    name: value
+                    for name, value in headers.items()
+                    if name not in _NOT_RETURNED
+                }
+            ),
+            b',"body":',
+            body,
+            b"}",
+        )
+    )
+
+
+def encode_responses(responses: Sequence[SubResponse]) -> bytes:
+    """Encode a batch response: {"responses": [{status, headers, body}, ...]}.
+
+    JSON bodies are included as JSON, other bodies as strings, empty bodies
+    as null.
+    """
+    return (
+        b'{"responses":['
+        + b",".join(_encode_response(response) for response in responses)
+        + b"]}"
+    )
@@ -0,0 +1,378 @@
+"""Server-side response cache for GET routes.
+
+Routes opt in with the cache_response decorator. Entries are keyed by path,
+query string and the caller's `sub`, and live in a per-worker LRU bounded by
+settings.response_cache_max_bytes. Hits are answered by the response cache
+middleware before routing, so dependencies (including token validation) and
+the handler do not run.
+
+A cached entry is only served to a token that has already been validated by
+the route's user dependency: the first request with a token always takes the
+full path, which records token -> sub until the token's `exp` (or the entry
+TTL, if sooner).
+
+Usage:
+    from core.cache import cache_response, response_cache
+
+    @router.get("/me/settings", response_model=SettingsResponse)
+    @cache_response(ttl=30, user=get_current_user, tags=["settings"])
+    async def get_settings(current_user: dict = Depends(get_current_user)):
+        ...
+
+    # After a write, drop what it made stale (this worker only; other
+    # workers catch up when their entries expire)
+    response_cache.invalidate(tag="settings", sub=current_user["sub"])
+"""
+
+import functools
+import hashlib
+import inspect
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from typing import Annotated, Any, TypeVar
+
+from fastapi import Depends, Request, Response
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+
+from core.metrics import counter, gauge
+from settings import settings
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+response_cache_requests_total = counter(
+    "response_cache_requests",
+    "Response cache lookups by outcome",
+    ["outcome"],
+)
+response_cache_evictions_total = counter(
+    "response_cache_evictions", "Entries evicted to stay within the memory budget"
+)
+response_cache_bytes = gauge("response_cache_bytes", "Bytes held by the response cache")
+
+# Accounted per entry on top of body and headers
+ENTRY_OVERHEAD = 256
+
+# Response headers not worth storing (recomputed for every delivery)
+_VOLATILE_HEADERS = {b"content-length", b"date", b"x-process-time", b"x-request-id"}
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """Caching options attached to a route by cache_response.
+
+    Attributes:
+        ttl: Seconds an entry is served.
+        tags: Labels used by ResponseCache.invalidate().
+        vary: Request headers whose values select different entries.
+    """
+
+    ttl: float
+    tags: tuple[str, ...]
+    vary: tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    """Stored response bytes.
+
+    Attributes:
+        status_code: HTTP status code.
+        headers: Raw response headers.
+        body: Response body bytes.
+        vary: Request headers the response varies on.
+        vary_values: Values of the Vary request headers it was produced for.
+        expires_at: time.monotonic() after which the entry is dropped.
+        sub: Principal the entry belongs to ("" for public routes).
+        tags: Tags from the route's CachePolicy.
+        size: Bytes accounted against the memory budget.
+    """
+
+    status_code: int
+    headers: list[tuple[bytes, bytes]]
+    body: bytes
+    vary: tuple[str, ...]
+    vary_values: tuple[str | None, ...]
+    expires_at: float
+    sub: str
+    tags: tuple[str, ...]
+    size: int
+
+    def to_response(self) -> Response:
+        """Rebuild the stored response."""
+        response = Response(content=self.body, status_code=self.status_code)
+        response.raw_headers = [
+            *self.headers,
+            (b"content-length", str(len(self.body)).encode()),
+        ]
+        return response
+
+
+@dataclass(frozen=True)
+class CacheTarget:
+    """Marker set on request.state by cache_response for the middleware.
+
+    Attributes:
+        policy: Route caching options.
+        sub: Principal that was validated for this request.
+        principal_expires_at: time.time() when the caller's token expires.
+    """
+
+    policy: CachePolicy
+    sub: str
+    principal_expires_at: float | None
+
+
+class ResponseCache:
+    """Per-worker LRU of response bytes bounded by total size."""
+
+    def __init__(
+        self, max_bytes: int, max_entry_bytes: int, max_principals: int
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.max_principals = max_principals
+        self.size = 0
+        self._entries: OrderedDict[tuple[str, str, str], CachedResponse] = OrderedDict()
+        # Hash of a validated Authorization header -> (sub, expires at)
+        self._principals: OrderedDict[str, tuple[str, float]] = OrderedDict()
+
+    def lookup(self, request: Request) -> CachedResponse | None:
+        """Find a fresh entry for a GET request."""
+        authorization = request.headers.get("authorization")
+        sub = ""
+        if authorization:
+            principal = self._principal(authorization)
+            if principal is not None:
+                sub = principal
+
+        path, query = request.url.path, request.url.query
+        entry = self._get((path, query, sub))
+        if entry is None and sub:
+            # The route may be public
+            entry = self._get((path, query, ""))
+        if entry is None:
+            return None
+
+        if entry.vary_values != tuple(request.headers.get(name) for name in entry.vary):
+            return None
+        return entry
+
+    def store(
+        self, request: Request, target: CacheTarget, response: Response, body: bytes
+    ) -> None:
+        """Store a response produced by a cache_response route."""
+        vary = set(target.policy.vary)
+        for value in response.headers.getlist("vary"):
+            vary.update(name.strip().lower() for name in value.split(","))
+        if "*" in vary:
+            return
+        cache_control = response.headers.get("cache-control", "")
+        if "no-store" in cache_control or "set-cookie" in response.headers:
+            return
+
+        headers = [
+            (name, value)
+            for name, value in response.raw_headers
+            if name not in _VOLATILE_HEADERS
+        ]
+        size = len(body) + sum(len(n) + len(v) for n, v in headers) + ENTRY_OVERHEAD
+        if size > self.max_entry_bytes:
+            return
+
+        now = time.monotonic()
+        expires_at = now + target.policy.ttl
+        authorization = request.headers.get("authorization")
+        if target.sub and authorization:
+            principal_ttl = target.policy.ttl
+            if target.principal_expires_at is not None:
+                principal_ttl = min(
+                    principal_ttl, target.principal_expires_at - time.time()
+                )
+            if principal_ttl <= 0:
+                return
+            self._remember_principal(authorization, target.sub, now + principal_ttl)
+
+        ordered_vary = tuple(sorted(vary))
+        entry = CachedResponse(
+            status_code=response.status_code,
+            headers=headers,
+            body=body,
+            vary=ordered_vary,
+            vary_values=tuple(request.headers.get(name) for name in ordered_vary),
+            expires_at=expires_at,
+            sub=target.sub,
+            tags=target.policy.tags,
+            size=size,
+        )
+        key = (request.url.path, request.url.query, target.sub)
+        self._discard(key)
+        self._entries[key] = entry
+        self.size += size
+        while self.size > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= evicted.size
+            response_cache_evictions_total.inc()
+        response_cache_bytes.set(self.size)
+
+    def invalidate(
+        self,
+        *,
+        tag: str | None = None,
+        sub: str | None = None,
+        path_prefix: str | None = None,
+    ) -> int:
+        """Drop entries matching all given criteria.
+
+        Only affects this worker; other workers serve their copies until
+        the TTL expires.
+
+        Args:
+            tag: Tag from cache_response(tags=...).
+            sub: Principal whose entries to drop.
+            path_prefix: Drop entries whose path starts with this prefix.
+
+        Returns:
+            Number of entries dropped.
+        """
+        stale = [
+            key
+            for key, entry in self._entries.items()
+            if (tag is None or tag in entry.tags)
+            and (sub is None or entry.sub == sub)
+            and (path_prefix is None or key[0].startswith(path_prefix))
+        ]
+        for key in stale:
+            self._discard(key)
+        response_cache_bytes.set(self.size)
+        return len(stale)
+
+    def clear(self) -> None:
+        """Drop every entry and remembered principal."""
+        self._entries.clear()
+        self._principals.clear()
+        self.size = 0
+        response_cache_bytes.set(0)
+
+    def _get(self, key: tuple[str, str, str]) -> CachedResponse | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._discard(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _discard(self, key: tuple[str, str, str]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry.size
+
+    def _principal(self, authorization: str) -> str | None:
+        token_hash = hashlib.sha256(authorization.encode()).hexdigest()
+        principal = self._principals.get(token_hash)
+        if principal is None:
+            return None
+        sub, expires_at = principal
+        if expires_at <= time.monotonic():
+            del self._principals[token_hash]
+            return None
+        return sub
+
+    def _remember_principal(
+        self, authorization: str, sub: str, expires_at: float
+    ) -> None:
+        token_hash = hashlib.sha256(authorization.encode()).hexdigest()
+        self._principals[token_hash] = (sub, expires_at)
+        self._principals.move_to_end(token_hash)
+        while len(self._principals) > self.max_principals:
+            self._principals.popitem(last=False)
+
+
+def cache_response(
+    ttl: float,
+    user: Callable[..., Any] | None = None,
+    tags: Sequence[str] = (),
+    vary: Sequence[str] = (),
+) -> Callable[[F], F]:
+    """Cache a GET route's successful responses.
+
+    Args:
+        ttl: Seconds an entry is served.
+        user: Dependency returning the principal (a dict with "sub" and
+            optionally "exp", e.g. get_current_user). Without it the route
+            is treated as public and shared by all callers.
+        tags: Labels for ResponseCache.invalidate().
+        vary: Request headers whose values select different entries, in
+            addition to the response's own Vary header.
+
+    Returns:
+        Decorator to apply below the router decorator.
+    """
+    policy = CachePolicy(
+        ttl=ttl,
+        tags=tuple(tags),
+        vary=tuple(name.lower() for name in vary),
+    )
+
+    def decorator(endpoint: F) -> F:
+        signature = inspect.signature(endpoint, eval_str=True)
+        is_coroutine = inspect.iscoroutinefunction(endpoint)
+
+        @functools.wraps(endpoint)
+        async def wrapper(
+            *args: Any, _cache_request: Request, _cache_user: Any = None, **kwargs: Any
+        ) -> Any:
+            if _cache_request.method == "GET":
+                sub = ""
+                expires_at = None
+                if user is not None:
+                    sub = str(_cache_user["sub"])
+                    expires_at = _cache_user.get("exp")
+                _cache_request.state.response_cache = CacheTarget(
+                    policy, sub, expires_at
+                )
+
+            if is_coroutine:
+                return await endpoint(*args, **kwargs)
+            return await run_in_threadpool(endpoint, *args, **kwargs)
+
+        extra = [
+            inspect.Parameter(
+                "_cache_request", inspect.Parameter.KEYWORD_ONLY, annotation=Request
+            )
+        ]
+        if user is not None:
+            extra.append(
+                inspect.Parameter(
+                    "_cache_user",
+                    inspect.Parameter.KEYWORD_ONLY,
+                    annotation=Annotated[Any, Depends(user)],
+                )
+            )
+        wrapper.__signature__ = signature.replace(  # type: ignore[attr-defined]
+            parameters=[*signature.parameters.values(), *extra]
+        )
+        wrapper.__cache_policy__ = policy  # type: ignore[attr-defined]
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def has_cached_routes(app: Starlette) -> bool:
+    """Check whether any route of `app` is decorated with cache_response."""
+    return any(
+        hasattr(getattr(route, "endpoint", None), "__cache_policy__")
+        for route in app.routes
+    )
+
+
+# Per-worker cache used by the response cache middleware
+response_cache = ResponseCache(
+    max_bytes=settings.response_cache_max_bytes,
+    max_entry_bytes=settings.response_cache_max_entry_bytes,
+    max_principals=settings.response_cache_max_principals,
+)
@@ -0,0 +1,130 @@
+"""Conditional GET support (ETag / If-None-Match).
+
+This module provides:
+- Weak ETag helpers shared with the conditional GET middleware
+- etag_version: route decorator for handlers that can supply a cheap version key
+
+Usage:
+    from core.conditional import etag_version
+
+    async def items_version(db: Annotated[AsyncSession, Depends(get_db)]) -> str:
+        return str(await db.scalar(select(func.max(Item.updated_at))))
+
+    @router.get("/items", response_model=ListResponse[ItemPublic])
+    @etag_version(items_version)
+    async def list_items(db: Annotated[AsyncSession, Depends(get_db)]):
+        ...
+"""
+
+import functools
+import hashlib
+import inspect
+from collections.abc import Callable
+from typing import Annotated, Any, TypeVar
+
+from fastapi import Depends, Request, Response, status
+from starlette.concurrency import run_in_threadpool
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# Headers that must be repeated on a 304 so caches can update their entry
+NOT_MODIFIED_HEADERS = ("cache-control", "content-location", "expires", "vary")
+
+
+def make_weak_etag(data: bytes) -> str:
+    """Build a weak ETag from raw bytes.
+
+    Args:
+        data: Serialized response body or version key.
+
+    Returns:
+        ETag header value, e.g. W/"5d41402abc4b2a76b9719d911017c592".
+    """
+    return f'W/"{hashlib.blake2b(data, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Check an If-None-Match header against an ETag.
+
+    Uses the weak comparison required for If-None-Match (RFC 9110 13.1.2).
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+
+    opaque_tag = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque_tag
+        for candidate in if_none_match.split(",")
+    )
+
+
+def not_modified(etag: str, headers: dict[str, str] | None = None) -> Response:
+    """Build an empty 304 Not Modified response carrying the ETag."""
+    response_headers = dict(headers or {})
+    response_headers["ETag"] = etag
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=response_headers)
+
+
+def etag_version(version_key: Callable[..., Any]) -> Callable[[F], F]:
+    """Decorate a GET route with a cheap version key for conditional requests.
+
+    `version_key` is resolved as a regular FastAPI dependency, so it can
+    depend on get_db, get_current_user, query params, etc. Its return value
+    (e.g. max updated_at from TimestampMixin) is turned into a weak ETag:
+
+    - If it matches If-None-Match, a 304 is returned without running the
+      handler or serializing the response model.
+    - Otherwise the handler runs and the ETag is attached to the response,
+      so the conditional GET middleware does not need to hash the body.
+
+    Returning None from `version_key` disables the shortcut for that request.
+
+    Args:
+        version_key: Dependency callable returning a version (str, int, datetime...).
+
+    Returns:
+        Decorator to apply below the router decorator.
+    """
+
+    def decorator(endpoint: F) -> F:
+        signature = inspect.signature(endpoint, eval_str=True)
+        is_coroutine = inspect.iscoroutinefunction(endpoint)
+
+        @functools.wraps(endpoint)
+        async def wrapper(
+            *args: Any, _etag_request: Request, _etag_version: Any, **kwargs: Any
+        ) -> Any:
+            if _etag_version is not None:
+                # Same version key, different query -> different representation
+                etag = make_weak_etag(
+                    f"{_etag_request.url.path}?{_etag_request.url.query}"
+                    f"#{_etag_version}".encode()
+                )
+                if etag_matches(_etag_request.headers.get("if-none-match"), etag):
+                    return not_modified(etag)
+                _etag_request.state.etag = etag
+
+            if is_coroutine:
+                return await endpoint(*args, **kwargs)
+            return await run_in_threadpool(endpoint, *args, **kwargs)
+
+        wrapper.__signature__ = signature.replace(  # type: ignore[attr-defined]
+            parameters=[
+                *signature.parameters.values(),
+                inspect.Parameter(
+                    "_etag_request",
+                    inspect.Parameter.KEYWORD_ONLY,
+                    annotation=Request,
+                ),
+                inspect.Parameter(
+                    "_etag_version",
+                    inspect.Parameter.KEYWORD_ONLY,
+                    annotation=Annotated[Any, Depends(version_key)],
+                ),
+            ]
+        )
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
@@ -0,0 +1,169 @@
+"""Per-request deadlines.
+
+Every HTTP request gets a deadline, tracked in a contextvar so it is visible
+to dependencies, route handlers (including sync handlers run in the
+threadpool) and outbound calls made on behalf of the request.
+
+The deadline is the shorter of:
+- The route timeout (settings.request_timeout, or request_timeout(...) on the route)
+- The client's X-Request-Timeout header (seconds, capped at
+  settings.request_timeout_max)
+
+RequestDeadlineMiddleware enforces it by cancelling the request; consumers
+use remaining()/bounded_timeout() to size their own timeouts, e.g. the
+Postgres statement_timeout set in db.database or httpx/botocore timeouts.
+
+Usage:
+    from core.deadlines import bounded_timeout, request_timeout
+
+    @router.get("/export", dependencies=[Depends(request_timeout(120))])
+    async def export(): ...
+
+    await client.get(url, timeout=bounded_timeout(5.0))
+"""
+
+import asyncio
+import time
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from core.exceptions import DeadlineExceededError
+from settings import settings
+
+# Smallest timeout handed to outbound calls, so an almost-expired deadline
+# fails fast instead of passing 0 (which some clients treat as "no timeout")
+MIN_TIMEOUT = 0.001
+
+
+@dataclass
+class Deadline:
+    """Deadline of the current request.
+
+    Attributes:
+        started_at: time.monotonic() when the request started.
+        expires_at: time.monotonic() when the request must be finished.
+        client_expires_at: Deadline requested by the client, if any.
+        timeout_scope: asyncio.timeout() scope enforcing the deadline.
+    """
+
+    started_at: float
+    expires_at: float
+    client_expires_at: float | None = None
+    timeout_scope: asyncio.Timeout | None = field(default=None, repr=False)
+
+    def remaining(self) -> float:
+        """Seconds left before the deadline (never negative)."""
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def set_timeout(self, seconds: float) -> None:
+        """Replace the route timeout; a client deadline still caps it."""
+        expires_at = self.started_at + seconds
+        if self.client_expires_at is not None:
+            expires_at = min(expires_at, self.client_expires_at)
+        self.expires_at = expires_at
+
+        if self.timeout_scope is not None and not self.timeout_scope.expired():
+            loop = asyncio.get_running_loop()
+            self.timeout_scope.reschedule(loop.time() + self.remaining())
+
+
+_current_deadline: ContextVar[Deadline | None] = ContextVar(
+    "request_deadline", default=None
+)
+
+
+def parse_timeout_header(value: str | None) -> float | None:
+    """Parse an X-Request-Timeout header value (seconds).
+
+    Returns:
+        Timeout capped at settings.request_timeout_max, or None if the
+        header is missing or invalid.
+    """
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        return None
+    if not 0 < seconds < float("inf"):
+        return None
+    return min(seconds, settings.request_timeout_max)
+
+
+@contextmanager
+def deadline_context(client_timeout: float | None) -> Iterator[Deadline]:
+    """Start the deadline for a new request and make it current.
+
+    Args:
+        client_timeout: Timeout requested by the client, if any.
+
+    Yields:
+        The request's Deadline.
+    """
+    now = time.monotonic()
+    client_expires_at = now + client_timeout if client_timeout is not None else None
+    deadline = Deadline(
+        started_at=now,
+        expires_at=now + settings.request_timeout,
+        client_expires_at=client_expires_at,
+    )
+    if client_expires_at is not None:
+        deadline.expires_at = min(deadline.expires_at, client_expires_at)
+
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def current_deadline() -> Deadline | None:
+    """Return the deadline of the current request, if any."""
+    return _current_deadline.get()
+
+
+def remaining() -> float | None:
+    """Seconds left for the current request, or None outside a request."""
+    deadline = _current_deadline.get()
+    return deadline.remaining() if deadline is not None else None
+
+
+def bounded_timeout(default: float) -> float:
+    """Clamp an outbound call timeout to the time left for the request."""
+    left = remaining()
+    if left is None:
+        return default
+    return max(min(default, left), MIN_TIMEOUT)
+
+
+def check_deadline() -> None:
+    """Raise if the current request has run out of time.
+
+    Call this before starting expensive or blocking work, particularly in
+    sync code running in the threadpool, which cancellation cannot stop.
+
+    Raises:
+        DeadlineExceededError: If the deadline has passed.
+    """
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceededError()
+
+
+def request_timeout(seconds: float) -> Callable[[], Awaitable[None]]:
+    """Dependency factory overriding the deadline for a route.
+
+    The client's X-Request-Timeout header can still shorten it.
+
+    Example:
+        @router.get("/export", dependencies=[Depends(request_timeout(120))])
+    """
+
+    async def apply_request_timeout() -> None:
+        deadline = _current_deadline.get()
+        if deadline is not None:
+            deadline.set_timeout(seconds)
+
+    return apply_request_timeout
@@ -2,12 +2,23 @@
 
 This module provides reusable dependencies for common patterns:
 - Pagination parameters
+- Sparse fieldsets (?fields=)
 """
 
-from typing import Annotated
+import functools
+from collections.abc import Callable
+from typing import Annotated, Any, TypeVar
 
 from fastapi import Query
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+from sqlalchemy import Select, inspect
+from sqlalchemy.orm import load_only
+
+from core.exceptions import BadRequestError
+
+S = TypeVar("S", bound=Select[Any])
+
+_MISSING = object()
 
 
 class PaginationParams(BaseModel):
@@ -60,3 +71,128 @@ def get_pagination(
         PaginationParams with calculated offset and limit.
     """
     return PaginationParams(page=page, page_size=page_size)
+
+
+@functools.cache
+def _sparse_model(schema: type[BaseModel], fields: frozenset[str]) -> type[BaseModel]:
+    """Subclass of `schema` that only reads and dumps `fields`.
+
+    Being a subclass, it keeps the schema's config, validators and
+    serializers. Other fields become optional and are excluded from dumps,
+    and objects (e.g. ORM rows) are read through the requested attributes
+    only, so columns left unloaded by FieldSelection.apply are not touched.
+    """
+
+    def read_requested(cls: type[BaseModel], data: Any) -> Any:
+        if isinstance(data, dict):
+            return data
+        values = {name: getattr(data, name, _MISSING) for name in fields}
+        return {name: value for name, value in values.items() if value is not _MISSING}
+
+    omitted = [name for name in schema.model_fields if name not in fields]
+    namespace: dict[str, Any] = {
+        "__module__": schema.__module__,
+        "__annotations__": dict.fromkeys(omitted, Any),
+        **{name: Field(default=None, exclude=True) for name in omitted},
+        # Attributes are read by field name, whatever the aliases
+        "model_config": ConfigDict(populate_by_name=True),
+        "_read_requested": model_validator(mode="before")(read_requested),
+    }
+    return type(f"{schema.__name__}Fields", (schema,), namespace)
+
+
+class FieldSelection:
+    """Fields requested with ?fields=, validated against a response schema.
+
+    Attributes:
+        schema: The route's item schema.
+        fields: Requested field names, or None for all fields.
+        model: Schema to validate and serialize items with: a subclass of
+            `schema` dumping only the requested fields (or `schema` itself).
+    """
+
+    def __init__(self, schema: type[BaseModel], fields: frozenset[str] | None) -> None:
+        self.schema = schema
+        self.fields = fields
+        self.model = schema if fields is None else _sparse_model(schema, fields)
+
+    def apply(self, statement: S, entity: Any) -> S:
+        """Load only the requested columns of `entity` (plus its primary key).
+
+        Requested fields that are not columns of the entity (relationships,
+        properties) are left to the statement's own loader options.
+        """
+        if self.fields is None:
+            return statement
+        columns = inspect(entity).column_attrs
+        selected = [
+            getattr(entity, name) for name in sorted(self.fields) if name in columns
+        ]
+        if not selected:
+            return statement
+        return statement.options(load_only(*selected))
+
+
+def sparse_fields(
+    schema: type[BaseModel],
+) -> Callable[[str | None], FieldSelection]:
+    """Build a ?fields= dependency for routes returning `schema` items.
+
+    Example:
+        @router.get("/users", response_model=ListResponse[UserPublic])
+        async def list_users(
+            selection: Annotated[FieldSelection, Depends(sparse_fields(UserPublic))],
+            db: Annotated[AsyncSession, Depends(get_db)],
+        ):
+            result = await db.execute(selection.apply(select(User), User))
+            # GET /users?fields=id,email -> [{"id": 1, "email": "..."}]
+            return FastJSONResponse(
+                ListResponse[selection.model](items=result.scalars().all(), meta=...)
+            )
+
+    Unselected columns are not loaded, so only serialize through
+    `selection.model`: reading them from the ORM objects would trigger a
+    lazy load. Model validators of `schema` see unselected fields as None.
+
+    Schemas with computed fields are not supported: they may depend on any
+    field, selected or not.
+
+    Args:
+        schema: Item schema whose fields (or their aliases) may be requested.
+
+    Returns:
+        Dependency returning a FieldSelection; unknown fields are rejected
+        with 400.
+
+    Raises:
+        ValueError: If `schema` has computed fields.
+    """
+    if schema.model_computed_fields:
+        raise ValueError(
+            f"sparse_fields does not support computed fields "
+            f"({schema.__name__}: {', '.join(schema.model_computed_fields)})"
+        )
+    names = {(info.alias or name): name for name, info in schema.model_fields.items()}
+
+    def dependency(
+        fields: Annotated[
+            str | None,
+            Query(description=f"Comma-separated subset of: {', '.join(sorted(names))}"),
+        ] = None,
+    ) -> FieldSelection:
+        requested = {
+            field.strip() for field in (fields or "").split(",") if field.strip()
+        }
+        if not requested:
+            # Absent, empty or only separators (?fields=,): all fields
+            return FieldSelection(schema, None)
+
+        unknown = requested - names.keys()
+        if unknown:
+            raise BadRequestError(
+                "Invalid fields",
+                detail=f"Unknown fields: {', '.join(sorted(unknown))}",
+            )
+        return FieldSelection(schema, frozenset(names[field] for field in requested))
+
+    return dependency
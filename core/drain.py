@@ -0,0 +1,123 @@
+"""Graceful connection draining.
+
+Sending SIGUSR1 to a worker (or to the core.server parent, which forwards
+it) starts a drain:
+
+1. GET /ready fails at once, so load balancers stop routing new traffic.
+2. Every response carries `Connection: close`, so keep-alive clients move
+   to another instance instead of sending their next request here.
+3. Requests keep being served for settings.drain_delay seconds (until the
+   load balancer has noticed), then the worker waits for in-flight requests
+   for up to settings.drain_timeout seconds.
+4. The worker stops itself with SIGTERM. The server's graceful shutdown
+   then runs the lifespan shutdown, which disposes the database engine.
+
+Requests that complete after the drain started are counted as drained;
+requests still running when the server gives up waiting are cut off. Both
+are logged by the lifespan shutdown and exported as drain_requests_total.
+
+A plain SIGTERM (e.g. `docker stop` without a prior SIGUSR1) still drains
+in-flight requests, but readiness only fails once shutdown begins.
+"""
+
+import asyncio
+import os
+import signal
+import time
+
+from core.logging import get_logger
+from core.metrics import counter
+from core.warmup import readiness
+
+logger = get_logger(__name__)
+
+drain_requests_total = counter(
+    "drain_requests",
+    "Requests finished while draining, by outcome",
+    ["outcome"],
+)
+
+
+class Drainer:
+    """In-flight request tracking and the drain procedure for this worker."""
+
+    def __init__(self) -> None:
+        self.draining = False
+        self.in_flight = 0
+        self.drained = 0
+        self.cut_off = 0
+        self.finished = False
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._task: asyncio.Task[None] | None = None
+
+    def request_started(self) -> None:
+        self.in_flight += 1
+        self._idle.clear()
+
+    def request_finished(self, cancelled: bool) -> None:
+        self.in_flight -= 1
+        if self.in_flight == 0:
+            self._idle.set()
+        if not self.draining or self.finished:
+            return
+        if cancelled:
+            self.cut_off += 1
+            drain_requests_total.inc(outcome="cut_off")
+        else:
+            self.drained += 1
+            drain_requests_total.inc(outcome="drained")
+
+    def start(self, reason: str = "draining") -> None:
+        """Fail readiness and close keep-alive connections from now on."""
+        if self.draining:
+            return
+        self.draining = True
+        readiness.set_not_ready(reason)
+        logger.info("Draining", reason=reason, in_flight=self.in_flight)
+
+    def finish(self) -> None:
+        """Count requests still running as cut off.
+
+        Called from the lifespan shutdown: by then the server has stopped
+        waiting for them and cancelled whatever was left.
+        """
+        if self.in_flight:
+            self.cut_off += self.in_flight
+            drain_requests_total.inc(self.in_flight, outcome="cut_off")
+        self.finished = True
+
+    async def wait_idle(self, timeout: float) -> bool:
+        """Wait until no request is in flight; False if `timeout` passed."""
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except TimeoutError:
+            return False
+        return True
+
+    def install_signal_handler(self, delay: float, timeout: float) -> None:
+        """Start a drain (then stop the worker) when SIGUSR1 arrives."""
+        loop = asyncio.get_running_loop()
+        try:
+            loop.add_signal_handler(signal.SIGUSR1, self._on_signal, delay, timeout)
+        except (NotImplementedError, RuntimeError):
+            # Windows, or the app runs outside the main thread (tests)
+            logger.debug("Drain signal handler not installed")
+
+    def _on_signal(self, delay: float, timeout: float) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._drain_and_stop(delay, timeout))
+
+    async def _drain_and_stop(self, delay: float, timeout: float) -> None:
+        self.start("draining")
+        started = time.monotonic()
+        await asyncio.sleep(delay)
+        idle = await self.wait_idle(max(timeout - (time.monotonic() - started), 0))
+        if not idle:
+            logger.warning("Drain deadline passed", in_flight=self.in_flight)
+        # The server's own graceful shutdown takes it from here
+        os.kill(os.getpid(), signal.SIGTERM)
+
+
+# Drain state of this worker
+drainer = Drainer()
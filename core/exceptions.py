@@ -86,6 +86,19 @@ class ConflictError(AppException):
         super().__init__(message, status.HTTP_409_CONFLICT, detail)
 
 
+class DeadlineExceededError(AppException):
+    """Request deadline exceeded error.
+
+    Example:
+        raise DeadlineExceededError(detail="Upstream call not started")
+    """
+
+    def __init__(
+        self, message: str = "Request deadline exceeded", detail: str | None = None
+    ) -> None:
+        super().__init__(message, status.HTTP_504_GATEWAY_TIMEOUT, detail)
+
+
 async def app_exception_handler(request: Request, exc: AppException) -> JSONResponse:
     """Handle AppException and subclasses.
 
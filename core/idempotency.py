@@ -0,0 +1,369 @@
+"""Idempotency-Key support for unsafe requests.
+
+Clients send an `Idempotency-Key` header on POST/PATCH requests they may
+retry. The first request with a key runs normally and its response (status,
+headers, body) is stored; retries with the same key get the stored bytes
+back without running the handler. Concurrent duplicates wait for the first
+execution instead of running in parallel.
+
+Storage:
+- In-memory LRU per worker (fast path for retries hitting the same worker)
+- Postgres table `idempotency_keys` shared by all workers and nodes; a row
+  with a NULL status_code marks a request still in progress (a lease that
+  expires after settings.request_timeout_max). Expired rows are deleted
+  periodically.
+
+Keys are scoped by method, path and the caller's Authorization header, so
+two users can never see each other's responses. Reusing a key with a
+different request body is rejected with 422. 5xx responses and the "retry
+later" statuses in RETRYABLE_STATUSES are not stored, so those requests can
+be retried.
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from typing import Any, cast
+
+from fastapi import Request, Response
+from sqlalchemy import (
+    CursorResult,
+    LargeBinary,
+    String,
+    Text,
+    delete,
+    select,
+    update,
+)
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Mapped, mapped_column
+
+from core.logging import get_logger
+from core.metrics import counter
+from db.database import Base, TimestampMixin, async_session_factory
+from settings import settings
+
+logger = get_logger(__name__)
+
+idempotency_requests_total = counter(
+    "idempotency_requests",
+    "Requests carrying an Idempotency-Key, by outcome",
+    ["outcome"],
+)
+
+# Interval between checks of a row claimed by another worker
+POLL_INTERVAL = 0.05
+
+# Statuses telling the client to retry later (timeout, conflict, rate limit);
+# storing them would replay the refusal to a correctly retried request
+RETRYABLE_STATUSES = frozenset({408, 409, 429})
+
+# Response headers that describe this particular delivery, not the result
+_VOLATILE_HEADERS = {"content-length", "date", "x-process-time", "x-request-id"}
+
+
+class IdempotencyRecord(TimestampMixin, Base):
+    """Stored response for an idempotency key.
+
+    A NULL status_code means the first request is still being processed.
+    """
+
+    __tablename__ = "idempotency_keys"
+
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    fingerprint: Mapped[str] = mapped_column(String(64))
+    status_code: Mapped[int | None]
+    headers: Mapped[str | None] = mapped_column(Text)
+    body: Mapped[bytes | None] = mapped_column(LargeBinary)
+    expires_at: Mapped[datetime] = mapped_column(index=True)
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    """Response captured for replay.
+
+    Attributes:
+        fingerprint: Hash of the request body that produced the response.
+        status_code: HTTP status code.
+        headers: Raw response headers (latin-1 decoded name/value pairs).
+        body: Response body bytes.
+        expires_at: time.time() after which the entry is no longer replayed.
+    """
+
+    fingerprint: str
+    status_code: int
+    headers: list[tuple[str, str]]
+    body: bytes
+    expires_at: float
+
+    def to_response(self) -> Response:
+        """Rebuild the stored response, marked as a replay."""
+        response = Response(content=self.body, status_code=self.status_code)
+        response.raw_headers = [
+            *(
+                (name.encode("latin-1"), value.encode("latin-1"))
+                for name, value in self.headers
+            ),
+            (b"content-length", str(len(self.body)).encode()),
+            (b"idempotent-replayed", b"true"),
+        ]
+        return response
+
+
+class IdempotencyKeyMismatch(Exception):
+    """Raised when a key is reused with a different request body."""
+
+
+class IdempotencyStore:
+    """Two-level store coordinating idempotent request execution."""
+
+    def __init__(self, max_entries: int, ttl: float) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._cache: OrderedDict[str, StoredResponse] = OrderedDict()
+        self._in_flight: dict[str, asyncio.Future[StoredResponse | None]] = {}
+        self._last_cleanup = 0.0
+        self._background_tasks: set[asyncio.Task[None]] = set()
+
+    @staticmethod
+    def scope_key(request: Request, key: str) -> str:
+        """Scope a client-supplied key to the method, path and caller."""
+        scoped = "\n".join(
+            (
+                request.method,
+                request.url.path,
+                request.headers.get("authorization", ""),
+                key,
+            )
+        )
+        return hashlib.sha256(scoped.encode()).hexdigest()
+
+    async def begin(self, key: str, fingerprint: str) -> StoredResponse | None:
+        """Claim a key or wait for its stored response.
+
+        Returns:
+            The stored response to replay, or None if the caller now owns the
+            key and must call finish() once the request has been handled.
+
+        Raises:
+            IdempotencyKeyMismatch: If the key was used with another body.
+        """
+        while True:
+            stored = self._lookup(key)
+            if stored is None:
+                future = self._in_flight.get(key)
+                if future is not None:
+                    stored = await asyncio.shield(future)
+                    if stored is None:
+                        # First execution was not stored; try to claim it
+                        continue
+                else:
+                    stored, claimed = await self._claim(key, fingerprint)
+                    if claimed:
+                        return None
+                    if stored is None:
+                        await asyncio.sleep(POLL_INTERVAL)
+                        continue
+
+            if stored.fingerprint != fingerprint:
+                raise IdempotencyKeyMismatch(key)
+            return stored
+
+    async def finish(self, key: str, response: StoredResponse | None) -> None:
+        """Store the response for a claimed key and wake waiting duplicates.
+
+        Passing None releases the claim without storing anything (e.g. for
+        responses that are not storable or when the handler raised).
+        """
+        future = self._in_flight.pop(key, None)
+        if response is not None:
+            self._remember(key, response)
+        if future is not None and not future.done():
+            future.set_result(response)
+
+        try:
+            async with async_session_factory() as session:
+                if response is None:
+                    await session.execute(
+                        delete(IdempotencyRecord).where(
+                            IdempotencyRecord.key == key,
+                            IdempotencyRecord.status_code.is_(None),
+                        )
+                    )
+                else:
+                    await session.execute(
+                        update(IdempotencyRecord)
+                        .where(IdempotencyRecord.key == key)
+                        .values(
+                            status_code=response.status_code,
+                            headers=json.dumps(response.headers),
+                            body=response.body,
+                            expires_at=_to_datetime(response.expires_at),
+                        )
+                    )
+                await session.commit()
+        except SQLAlchemyError:
+            logger.warning("Failed to persist idempotency record", exc_info=True)
+
+        self._maybe_cleanup()
+
+    @staticmethod
+    def is_storable(status_code: int) -> bool:
+        """Whether a response with this status is stored for replay."""
+        return status_code < 500 and status_code not in RETRYABLE_STATUSES
+
+    def new_response(
+        self,
+        fingerprint: str,
+        status_code: int,
+        raw_headers: list[tuple[bytes, bytes]],
+        body: bytes,
+    ) -> StoredResponse:
+        """Build a StoredResponse that expires after the configured TTL."""
+        headers = [
+            (name.decode("latin-1"), value.decode("latin-1"))
+            for name, value in raw_headers
+            if name.decode("latin-1").lower() not in _VOLATILE_HEADERS
+        ]
+        return StoredResponse(
+            fingerprint=fingerprint,
+            status_code=status_code,
+            headers=headers,
+            body=body,
+            expires_at=time.time() + self.ttl,
+        )
+
+    def _lookup(self, key: str) -> StoredResponse | None:
+        stored = self._cache.get(key)
+        if stored is None:
+            return None
+        if stored.expires_at <= time.time():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return stored
+
+    def _remember(self, key: str, response: StoredResponse) -> None:
+        self._cache[key] = response
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    async def _claim(
+        self, key: str, fingerprint: str
+    ) -> tuple[StoredResponse | None, bool]:
+        """Try to claim a key in the database.
+
+        Returns:
+            (stored response, claimed). Both empty means another worker
+            holds the key and the caller should poll again.
+        """
+        self._in_flight[key] = asyncio.get_running_loop().create_future()
+        try:
+            stored, claimed = await self._claim_in_database(key, fingerprint)
+        except SQLAlchemyError:
+            # Degrade to per-worker idempotency rather than failing the request
+            logger.warning("Idempotency store unavailable", exc_info=True)
+            return None, True
+        except BaseException:
+            self._in_flight.pop(key).set_result(None)
+            raise
+
+        if not claimed:
+            future = self._in_flight.pop(key)
+            future.set_result(stored)
+            if stored is not None:
+                self._remember(key, stored)
+        return stored, claimed
+
+    async def _claim_in_database(
+        self, key: str, fingerprint: str
+    ) -> tuple[StoredResponse | None, bool]:
+        # Pending rows expire after the longest possible request, so a claim
+        # left behind by a crashed worker does not block the key for the TTL
+        expires_at = _to_datetime(time.time() + settings.request_timeout_max)
+        async with async_session_factory() as session:
+            session.add(
+                IdempotencyRecord(
+                    key=key, fingerprint=fingerprint, expires_at=expires_at
+                )
+            )
+            try:
+                await session.commit()
+                return None, True
+            except IntegrityError:
+                await session.rollback()
+
+            record = await session.scalar(
+                select(IdempotencyRecord).where(IdempotencyRecord.key == key)
+            )
+            if record is None:
+                # Deleted in the meantime (released or cleaned up); retry
+                return None, False
+
+            if record.expires_at.replace(tzinfo=UTC) <= datetime.now(UTC):
+                await session.delete(record)
+                await session.commit()
+                return None, False
+
+            if record.status_code is None:
+                if record.fingerprint != fingerprint:
+                    raise IdempotencyKeyMismatch(key)
+                return None, False
+
+            return (
+                StoredResponse(
+                    fingerprint=record.fingerprint,
+                    status_code=record.status_code,
+                    headers=[
+                        (name, value)
+                        for name, value in json.loads(record.headers or "[]")
+                    ],
+                    body=record.body or b"",
+                    expires_at=record.expires_at.replace(tzinfo=UTC).timestamp(),
+                ),
+                False,
+            )
+
+    def _maybe_cleanup(self) -> None:
+        now = time.monotonic()
+        if now - self._last_cleanup < settings.idempotency_cleanup_interval:
+            return
+        self._last_cleanup = now
+        task = asyncio.get_running_loop().create_task(self._delete_expired())
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def _delete_expired(self) -> None:
+        try:
+            async with async_session_factory() as session:
+                result = await session.execute(
+                    delete(IdempotencyRecord).where(
+                        IdempotencyRecord.expires_at <= _to_datetime(time.time())
+                    )
+                )
+                await session.commit()
+            logger.debug(
+                "Expired idempotency records deleted",
+                count=cast(CursorResult[Any], result).rowcount,
+            )
+        except SQLAlchemyError:
+            logger.warning(
+                "Failed to delete expired idempotency records", exc_info=True
+            )
+
+
+def _to_datetime(timestamp: float) -> datetime:
+    """Convert a UNIX timestamp to a naive UTC datetime for storage."""
+    return datetime.fromtimestamp(timestamp, UTC).replace(tzinfo=None)
+
+
+# Per-worker store used by the idempotency middleware
+idempotency_store = IdempotencyStore(
+    max_entries=settings.idempotency_cache_size,
+    ttl=timedelta(hours=settings.idempotency_ttl_hours).total_seconds(),
+)
@@ -0,0 +1,223 @@
+"""Request-scoped batching and caching of database lookups (DataLoader).
+
+Resolving related objects one at a time (for each order, load its customer)
+costs one query per object. A DataLoader collects the keys requested during
+one event-loop tick, loads them with a single query, and caches the results
+for the rest of the request, so repeated keys are only loaded once.
+
+Keys requested concurrently are batched together: from tasks started with
+asyncio.gather(), or all at once with load_many(). Awaiting load() in a
+plain loop still issues one query per key.
+
+Usage:
+    from core.loaders import Loaders, get_loaders
+
+    @router.get("/orders")
+    async def list_orders(
+        db: Annotated[AsyncSession, Depends(get_db)],
+        loaders: Annotated[Loaders, Depends(get_loaders)],
+    ):
+        orders = (await db.execute(select(Order))).scalars().all()
+        customers = await loaders.model(Customer).load_many(
+            [order.customer_id for order in orders]
+        )  # SELECT ... FROM customers WHERE id = ANY($1)
+
+Loaders run their queries on the request's session (get_db), so do not
+await them concurrently with other queries on that session. The loaders of
+one Loaders share a lock, so their own batches take turns on it.
+"""
+
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable, Iterable, Mapping
+from typing import Annotated, Any, Generic, TypeVar
+
+from fastapi import Depends
+from sqlalchemy import any_, bindparam, select
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.metrics import histogram
+from db.database import get_db
+
+loader_batch_size = histogram(
+    "loader_batch_size",
+    "Keys loaded per DataLoader query",
+    ["loader"],
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500),
+)
+
+# Keys per query; larger batches are split (SQLite limits bound parameters)
+MAX_BATCH_SIZE = 500
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+M = TypeVar("M")
+
+
+class DataLoader(Generic[K, V]):  # noqa: UP046
+    """Batches and caches lookups by key for the lifetime of one request.
+
+    Args:
+        batch_load: Loads many keys at once, returning the values found by
+            key. Keys it leaves out resolve to None. Calls for one tick's
+            keys are made one after another, never concurrently.
+        name: Label for the loader_batch_size metric.
+        max_batch_size: Keys per batch_load call.
+    """
+
+    def __init__(
+        self,
+        batch_load: Callable[[list[K]], Awaitable[Mapping[K, V]]],
+        *,
+        name: str = "loader",
+        max_batch_size: int = MAX_BATCH_SIZE,
+    ) -> None:
+        self.batch_load = batch_load
+        self.name = name
+        self.max_batch_size = max_batch_size
+        self._cache: dict[K, asyncio.Future[V | None]] = {}
+        self._queue: list[tuple[K, asyncio.Future[V | None]]] = []
+        self._tasks: set[asyncio.Future[None]] = set()
+
+    async def load(self, key: K) -> V | None:
+        """Load one value, batched with the other keys of this tick."""
+        future = self._cache.get(key)
+        if future is None:
+            future = self._enqueue(key)
+        # A cancelled caller must not cancel the batch other callers wait for
+        return await asyncio.shield(future)
+
+    async def load_many(self, keys: Iterable[K]) -> list[V | None]:
+        """Load several values (in the order of `keys`) in one batch."""
+        futures = []
+        for key in keys:
+            future = self._cache.get(key)
+            if future is None:
+                future = self._enqueue(key)
+            futures.append(future)
+        return list(await asyncio.shield(asyncio.gather(*futures)))
+
+    def prime(self, key: K, value: V | None) -> None:
+        """Cache a value already at hand, e.g. an object just created."""
+        future: asyncio.Future[V | None] = asyncio.get_running_loop().create_future()
+        future.set_result(value)
+        self._cache[key] = future
+
+    def clear(self, key: K | None = None) -> None:
+        """Forget one cached key (or all), e.g. after updating the row."""
+        if key is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(key, None)
+
+    def _enqueue(self, key: K) -> asyncio.Future[V | None]:
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[V | None] = loop.create_future()
+        self._cache[key] = future
+        if not self._queue:
+            # Runs after the callbacks already scheduled for this tick, so
+            # concurrently started lookups join the same batch
+            loop.call_soon(self._dispatch)
+        self._queue.append((key, future))
+        return future
+
+    def _dispatch(self) -> None:
+        queue, self._queue = self._queue, []
+        task = asyncio.ensure_future(self._run(queue))
+        # The loop only keeps weak references to tasks
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, queue: list[tuple[K, asyncio.Future[V | None]]]) -> None:
+        """Load the queued keys, one batch_load call per chunk in turn."""
+        for start in range(0, len(queue), self.max_batch_size):
+            batch = queue[start : start + self.max_batch_size]
+            loader_batch_size.observe(len(batch), loader=self.name)
+            try:
+                values = await self.batch_load([key for key, _ in batch])
+            except asyncio.CancelledError:
+                self._fail(queue[start:], None)
+                raise
+            except Exception as e:
+                self._fail(batch, e)
+                continue
+            for key, future in batch:
+                if not future.done():
+                    future.set_result(values.get(key))
+
+    def _fail(
+        self,
+        batch: list[tuple[K, asyncio.Future[V | None]]],
+        error: Exception | None,
+    ) -> None:
+        """Fail (or cancel) a batch; its keys are retried by a later load()."""
+        for key, future in batch:
+            if self._cache.get(key) is future:
+                del self._cache[key]
+            if future.done():
+                continue
+            if error is None:
+                future.cancel()
+            else:
+                future.set_exception(error)
+
+
+def model_loader(  # noqa: UP047
+    session: AsyncSession,
+    model: type[M],
+    column: str = "id",
+    *,
+    lock: asyncio.Lock | None = None,
+) -> DataLoader[Any, M]:
+    """Build a DataLoader fetching rows of `model` by `column`.
+
+    On PostgreSQL the keys are sent as one array parameter
+    (`WHERE id = ANY($1)`), so every batch size shares one statement in the
+    driver's prepared statement cache; other databases use `IN (...)`.
+
+    Queries hold `lock` (pass the same lock to every loader on `session`),
+    since a session must not run two queries at once.
+    """
+    attribute = getattr(model, column)
+    session_lock = lock or asyncio.Lock()
+
+    async def batch_load(keys: list[Any]) -> dict[Any, M]:
+        if session.get_bind().dialect.name == "postgresql":
+            condition = attribute == any_(
+                bindparam("keys", keys, type_=ARRAY(attribute.type))
+            )
+        else:
+            condition = attribute.in_(keys)
+        async with session_lock:
+            result = await session.execute(select(model).where(condition))
+            return {getattr(row, column): row for row in result.scalars()}
+
+    return DataLoader(batch_load, name=f"{model.__name__}.{column}")
+
+
+class Loaders:
+    """The DataLoaders of one request, created on first use.
+
+    Attributes:
+        session: Session the loaders query with.
+    """
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+        self._loaders: dict[tuple[type, str], DataLoader[Any, Any]] = {}
+        # Loaders of different models may dispatch in the same tick
+        self._lock = asyncio.Lock()
+
+    def model(self, model: type[M], column: str = "id") -> DataLoader[Any, M]:
+        """Loader for rows of `model` by `column` (a unique column)."""
+        loader = self._loaders.get((model, column))
+        if loader is None:
+            loader = self._loaders[(model, column)] = model_loader(
+                self.session, model, column, lock=self._lock
+            )
+        return loader
+
+
+async def get_loaders(db: Annotated[AsyncSession, Depends(get_db)]) -> Loaders:
+    """Dependency providing the request's loaders, on the request's session."""
+    return Loaders(db)
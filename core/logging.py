@@ -2,34 +2,389 @@
 
 Configures structlog to output JSON or console format to stdout,
 following 12-factor app principles (Factor XI: Logs).
+
+With a queue size set, log calls only enqueue the record; rendering and the
+stdout write happen on a background thread (QueueListener), so a slow log
+pipe does not stall the event loop. Call shutdown_logging() on exit to
+flush the queue.
+
+LogSampler drops low-value events before any rendering work is done (see
+settings.log_sample_ratio and related settings).
+
+In JSON mode with fast_json, structlog events skip the stdlib logging
+machinery: they are rendered straight to bytes by pydantic-core and written
+to stdout (through the background writer when queueing). Stdlib records
+(uvicorn, SQLAlchemy...) still go through ProcessorFormatter.
 """
 
+import atexit
+import datetime
 import logging
+import queue
+import random
 import sys
-from typing import Literal
+import threading
+import time
+import zlib
+from collections.abc import Mapping
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, BinaryIO, Literal
 
+import pydantic_core
 import structlog
 
+from core.metrics import counter
+
+log_records_dropped_total = counter(
+    "log_records_dropped", "Log records dropped because the log queue was full"
+)
+
+_LOGGER_NAMES = ("", "uvicorn", "uvicorn.error", "uvicorn.access")
+
+_listener: "BoundedQueueListener | None" = None
+_writer: "LogWriter | None" = None
+# Arguments of the last configure_logging() call, for restart_logging()
+_config: dict[str, Any] = {}
+
+# Queue between the handler and the listener; None stops the listener
+LogQueue = queue.Queue[logging.LogRecord | None]
+
+
+class BoundedQueueHandler(QueueHandler):
+    """QueueHandler that defers all formatting to the listener thread.
+
+    The stdlib QueueHandler formats records in prepare(), i.e. on the
+    calling thread; here records are enqueued as-is. When the queue is full
+    records are either dropped (and counted) or the caller blocks, depending
+    on `overflow`.
+    """
+
+    def __init__(self, log_queue: LogQueue, overflow: Literal["drop", "block"]) -> None:
+        super().__init__(log_queue)
+        self.log_queue = log_queue
+        self.overflow = overflow
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.overflow == "block":
+            self.log_queue.put(record)
+            return
+        try:
+            self.log_queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            log_records_dropped_total.inc()
+
+
+class BoundedQueueListener(QueueListener):
+    """QueueListener that reports dropped records and drains fully on stop."""
+
+    def __init__(
+        self,
+        log_queue: LogQueue,
+        producer: BoundedQueueHandler,
+        handler: logging.Handler,
+    ) -> None:
+        super().__init__(log_queue, handler)
+        self.log_queue = log_queue
+        self.producer = producer
+        self._reported_drops = 0
+
+    def handle(self, record: logging.LogRecord) -> None:
+        super().handle(record)
+        self._report_drops()
+
+    def enqueue_sentinel(self) -> None:
+        # Wait for room instead of failing when the queue is full
+        self.log_queue.put(None)
+
+    def _report_drops(self) -> None:
+        dropped = self.producer.dropped
+        if dropped == self._reported_drops:
+            return
+        record = logging.LogRecord(
+            name=__name__,
+            level=logging.WARNING,
+            pathname=__file__,
+            lineno=0,
+            msg="Log records dropped, log queue full (%d since last report)",
+            args=(dropped - self._reported_drops,),
+            exc_info=None,
+        )
+        self._reported_drops = dropped
+        super().handle(record)
+
+
+class LogSampler:
+    """structlog processor that drops events before they are rendered.
+
+    Rules, in order:
+    - WARNING and above, and events with `duration_ms` of at least
+      `slow_ms` (slow requests), are always kept
+    - `rate_limits` caps how many events per second are kept for an event
+      name (e.g. {"Cache miss": 10}); these events are not sampled further
+    - The remaining events are kept with probability `event_ratios[event]`,
+      or `ratio` for other events. Sampling is deterministic by request_id,
+      so a sampled request keeps all of its events.
+
+    Records from stdlib loggers (uvicorn etc.) are never dropped here.
+    """
+
+    def __init__(
+        self,
+        ratio: float = 1.0,
+        event_ratios: Mapping[str, float] | None = None,
+        rate_limits: Mapping[str, float] | None = None,
+        slow_ms: float | None = None,
+    ) -> None:
+        self.ratio = ratio
+        self.event_ratios = dict(event_ratios or {})
+        self.rate_limits = dict(rate_limits or {})
+        self.slow_ms = slow_ms
+        # Event name -> [tokens, last refill time]
+        self._buckets: dict[str, list[float]] = {}
+        self._lock = threading.Lock()
+
+    def __call__(
+        self, logger: object, method_name: str, event_dict: structlog.typing.EventDict
+    ) -> structlog.typing.EventDict:
+        if "_record" in event_dict or method_name not in _SAMPLED_METHODS:
+            return event_dict
+        slow_ms = self.slow_ms
+        if slow_ms is not None and event_dict.get("duration_ms", 0) >= slow_ms:
+            return event_dict
+
+        event = event_dict.get("event")
+        if not isinstance(event, str):
+            event = ""
+        limit = self.rate_limits.get(event)
+        if limit is not None:
+            if not self._take_token(event, limit):
+                raise structlog.DropEvent
+            return event_dict
+
+        ratio = self.event_ratios.get(event, self.ratio)
+        if ratio >= 1.0:
+            return event_dict
+        request_id = event_dict.get("request_id")
+        if request_id is not None:
+            sample = zlib.crc32(str(request_id).encode()) / 0x1_0000_0000
+        else:
+            sample = random.random()
+        if sample >= ratio:
+            raise structlog.DropEvent
+        return event_dict
+
+    def _take_token(self, event: str, per_second: float) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(event)
+            if bucket is None:
+                bucket = self._buckets[event] = [per_second, now]
+            tokens = min(per_second, bucket[0] + (now - bucket[1]) * per_second)
+            bucket[1] = now
+            if tokens < 1.0:
+                bucket[0] = tokens
+                return False
+            bucket[0] = tokens - 1.0
+            return True
+
+
+# Log methods subject to sampling; warning and above are always kept
+_SAMPLED_METHODS = frozenset({"debug", "info", "msg"})
+
+
+class FastJSONRenderer:
+    """Render an event dict to a JSON line (bytes) with pydantic-core.
+
+    Adds an ISO 8601 UTC timestamp; the date/time part is formatted once per
+    second and only the microseconds are added per event.
+    """
+
+    def __init__(self) -> None:
+        self._second = -1
+        self._prefix = ""
+
+    def timestamp(self) -> str:
+        now = time.time()
+        second = int(now)
+        if second != self._second:
+            moment = datetime.datetime.fromtimestamp(second, datetime.UTC)
+            self._prefix = moment.strftime("%Y-%m-%dT%H:%M:%S")
+            self._second = second
+        return f"{self._prefix}.{int((now - second) * 1_000_000):06d}Z"
+
+    def __call__(
+        self, logger: object, method_name: str, event_dict: structlog.typing.EventDict
+    ) -> bytes:
+        event_dict["timestamp"] = self.timestamp()
+        return pydantic_core.to_json(event_dict, fallback=repr) + b"\n"
+
+
+class LogWriter:
+    """Write rendered log lines to a binary stream.
+
+    With a queue size, lines are handed to a background thread that writes
+    them in batches; the overflow policy matches BoundedQueueHandler.
+    """
+
+    def __init__(
+        self,
+        stream: BinaryIO,
+        queue_size: int = 0,
+        overflow: Literal["drop", "block"] = "drop",
+    ) -> None:
+        self.stream = stream
+        self.overflow = overflow
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._queue: queue.Queue[bytes | None] | None = None
+        self._thread: threading.Thread | None = None
+        if queue_size > 0:
+            self._queue = queue.Queue(maxsize=queue_size)
+            self._thread = threading.Thread(
+                target=self._run, name="log-writer", daemon=True
+            )
+            self._thread.start()
+
+    def write(self, line: bytes) -> None:
+        log_queue = self._queue
+        if log_queue is None:
+            self._write(line)
+        elif self.overflow == "block":
+            log_queue.put(line)
+        else:
+            try:
+                log_queue.put_nowait(line)
+            except queue.Full:
+                self.dropped += 1
+                log_records_dropped_total.inc()
+
+    def stop(self) -> None:
+        """Drain queued lines; later writes happen on the calling thread."""
+        if self._queue is None or self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._queue = self._thread = None
+
+    def _run(self) -> None:
+        assert self._queue is not None
+        log_queue = self._queue
+        reported = 0
+        while True:
+            batch = [log_queue.get()]
+            # Coalesce whatever is already queued into one write
+            while len(batch) < 256:
+                try:
+                    batch.append(log_queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            lines = [line for line in batch if line is not None]
+            if self.dropped != reported:
+                lines.append(_render_drop_report(self.dropped - reported))
+                reported = self.dropped
+            if lines:
+                self._write(b"".join(lines))
+            if stop:
+                return
+
+    def _write(self, data: bytes) -> None:
+        with self._lock:
+            self.stream.write(data)
+            self.stream.flush()
+
+
+class _FastLogger:
+    """structlog logger writing pre-rendered lines to the current LogWriter.
+
+    The writer is looked up on every call rather than bound, so loggers
+    cached before restart_logging() (e.g. in a forked worker) keep working.
+    """
+
+    def __init__(self, name: str | None = None, *args: Any) -> None:
+        self.name = name
+
+    def msg(self, message: bytes) -> None:
+        if _writer is not None:
+            _writer.write(message)
+
+    debug = info = warning = warn = error = critical = exception = fatal = msg
+    log = msg
+
+
+def _render_drop_report(count: int) -> bytes:
+    return FastJSONRenderer()(
+        None,
+        "warning",
+        {
+            "event": "Log records dropped, log queue full",
+            "count": count,
+            "level": "warning",
+            "logger": __name__,
+        },
+    )
+
+
+def _capture_exc_info(
+    logger: object, method_name: str, event_dict: structlog.typing.EventDict
+) -> structlog.typing.EventDict:
+    """Resolve exc_info=True while still on the logging thread.
+
+    Rendering may happen on the queue listener thread, where
+    sys.exc_info() no longer refers to the exception being logged.
+    """
+    if event_dict.get("exc_info") is True:
+        event_dict["exc_info"] = sys.exc_info()
+    return event_dict
+
 
 def configure_logging(
     level: str = "INFO",
     format: Literal["json", "console"] = "console",
+    queue_size: int = 0,
+    overflow: Literal["drop", "block"] = "drop",
+    sampler: LogSampler | None = None,
+    fast_json: bool = False,
 ) -> None:
     """Configure structured logging for the application.
 
     Args:
         level: Log level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
         format: Output format - "json" for production, "console" for development
+        queue_size: Records buffered for the background writer thread
+            (0 writes synchronously on the calling thread)
+        overflow: What to do when the buffer is full - "drop" the record
+            or "block" the caller until there is room
+        sampler: Drops events before rendering (runs right after the
+            context variables are merged, so request_id is available)
+        fast_json: In JSON mode, render structlog events straight to bytes
+            and bypass stdlib logging for them
     """
+    _config.update(
+        level=level,
+        format=format,
+        queue_size=queue_size,
+        overflow=overflow,
+        sampler=sampler,
+        fast_json=fast_json,
+    )
+
     # Shared processors for both formats
     shared_processors: list[structlog.typing.Processor] = [
         structlog.contextvars.merge_contextvars,
+        *([sampler] if sampler is not None else []),
         structlog.stdlib.add_log_level,
         structlog.stdlib.add_logger_name,
         structlog.stdlib.PositionalArgumentsFormatter(),
         structlog.processors.TimeStamper(fmt="iso"),
         structlog.processors.StackInfoRenderer(),
         structlog.processors.UnicodeDecoder(),
+        _capture_exc_info,
     ]
 
     if format == "json":
@@ -42,6 +397,7 @@ def configure_logging(
             foreign_pre_chain=shared_processors,
             processors=[
                 structlog.stdlib.ProcessorFormatter.remove_processors_meta,
+                structlog.processors.format_exc_info,
                 structlog.processors.JSONRenderer(),
             ],
         )
@@ -58,33 +414,96 @@ def configure_logging(
             ],
         )
 
+    shutdown_logging()
+
     # Configure structlog
-    structlog.configure(
-        processors=shared_processors + [
-            structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
-        ],
-        logger_factory=structlog.stdlib.LoggerFactory(),
-        wrapper_class=structlog.stdlib.BoundLogger,
-        cache_logger_on_first_use=True,
-    )
+    if format == "json" and fast_json:
+        global _writer
+        _writer = LogWriter(sys.stdout.buffer, queue_size, overflow)
+        structlog.configure(
+            processors=[
+                structlog.contextvars.merge_contextvars,
+                *([sampler] if sampler is not None else []),
+                structlog.processors.add_log_level,
+                structlog.stdlib.add_logger_name,
+                structlog.stdlib.PositionalArgumentsFormatter(),
+                structlog.processors.StackInfoRenderer(),
+                structlog.processors.format_exc_info,
+                FastJSONRenderer(),
+            ],
+            logger_factory=_FastLogger,
+            wrapper_class=structlog.make_filtering_bound_logger(
+                logging.getLevelNamesMapping()[level]
+            ),
+            cache_logger_on_first_use=True,
+        )
+    else:
+        structlog.configure(
+            processors=shared_processors + [
+                structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
+            ],
+            logger_factory=structlog.stdlib.LoggerFactory(),
+            wrapper_class=structlog.stdlib.BoundLogger,
+            cache_logger_on_first_use=True,
+        )
 
     # Configure standard library logging to use structlog
-    handler = logging.StreamHandler(sys.stdout)
-    handler.setFormatter(formatter)
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(formatter)
 
-    root_logger = logging.getLogger()
-    root_logger.handlers.clear()
-    root_logger.addHandler(handler)
-    root_logger.setLevel(level)
+    handler: logging.Handler = stream_handler
+    if queue_size > 0:
+        global _listener
+        log_queue: LogQueue = queue.Queue(maxsize=queue_size)
+        handler = BoundedQueueHandler(log_queue, overflow)
+        _listener = BoundedQueueListener(log_queue, handler, stream_handler)
+        _listener.start()
 
-    # Configure uvicorn loggers to use the same format
-    for logger_name in ["uvicorn", "uvicorn.error", "uvicorn.access"]:
+    # Root logger, plus uvicorn loggers using the same format
+    for logger_name in _LOGGER_NAMES:
         logger = logging.getLogger(logger_name)
         logger.handlers.clear()
         logger.addHandler(handler)
         logger.setLevel(level)
 
 
+def shutdown_logging() -> None:
+    """Flush queued log records and switch back to synchronous writes.
+
+    Called from the application lifespan on shutdown. Records logged
+    afterwards (e.g. by uvicorn) are written directly.
+    """
+    global _listener
+    if _writer is not None:
+        _writer.stop()
+    if _listener is None:
+        return
+
+    listener, _listener = _listener, None
+    listener.stop()
+    listener._report_drops()
+
+    (stream_handler,) = listener.handlers
+    for logger_name in _LOGGER_NAMES:
+        logger = logging.getLogger(logger_name)
+        if listener.producer in logger.handlers:
+            logger.removeHandler(listener.producer)
+            logger.addHandler(stream_handler)
+
+
+def restart_logging() -> None:
+    """Re-apply the last configuration, starting fresh writer threads.
+
+    Threads do not survive fork(): a preforked worker calls this after the
+    parent has flushed with shutdown_logging().
+    """
+    if _config:
+        configure_logging(**_config)
+
+
+atexit.register(shutdown_logging)
+
+
 def get_logger(name: str | None = None) -> structlog.stdlib.BoundLogger:
     """Get a structured logger instance.
 
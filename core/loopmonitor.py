@@ -0,0 +1,143 @@
+"""Event-loop lag monitor and blocked-loop detector.
+
+Sync work on the event loop (CPU-heavy code such as RSA signature checks,
+blocking I/O, a sync database call) stalls every request on the worker, and
+only shows up as unexplained tail latency. This module makes it visible.
+
+A watchdog thread posts a probe callback to the loop every
+settings.loop_monitor_interval_ms and measures how long the loop takes to
+run it:
+- Every probe delay is exported as the event_loop_lag_seconds histogram.
+- When a probe has waited settings.loop_block_threshold_ms, the loop is
+  blocked. The watchdog captures the loop thread's stack at that moment
+  and logs it ("Event loop blocked"), with the logging context (request_id)
+  of the task that was running. Each stall is logged once.
+
+The stack shows the code running when the threshold was crossed, which is
+usually the blocking call. A C extension holding the GIL (it is not
+released during the call) delays the capture until it returns.
+
+Usage (in the application lifespan):
+    loop_monitor.start(interval=0.05, threshold=0.1)
+    ...
+    loop_monitor.stop()
+"""
+
+import asyncio
+import sys
+import threading
+import time
+import traceback
+
+import structlog
+
+from core.logging import get_logger
+from core.metrics import counter, histogram
+
+logger = get_logger(__name__)
+
+event_loop_lag_seconds = histogram(
+    "event_loop_lag_seconds",
+    "Delay before the event loop ran a callback posted to it",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+event_loop_blocks_total = counter(
+    "event_loop_blocks",
+    "Times the event loop was blocked longer than the threshold",
+)
+
+# Innermost frames of a blocked stack that are logged
+STACK_LIMIT = 30
+
+
+def _task_context(task: asyncio.Task[object] | None) -> dict[str, object]:
+    """The structlog context variables bound in `task` (e.g. request_id)."""
+    if task is None:
+        return {}
+    prefix = structlog.contextvars.STRUCTLOG_KEY_PREFIX
+    return {
+        var.name[len(prefix) :]: value
+        for var, value in task.get_context().items()
+        if var.name.startswith(prefix) and value is not Ellipsis
+    }
+
+
+class LoopMonitor:
+    """Watchdog thread measuring the lag of one event loop."""
+
+    def __init__(self) -> None:
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id = 0
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        # Monotonic time the pending probe was posted (None: no probe pending)
+        self._probe_sent: float | None = None
+        self._reported = False
+
+    def start(self, interval: float, threshold: float | None) -> None:
+        """Start monitoring the running loop (call from the loop thread).
+
+        Args:
+            interval: Seconds between probes.
+            threshold: Seconds a probe may wait before the loop counts as
+                blocked and its stack is logged; None only measures lag.
+        """
+        if self._thread is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._stop.clear()
+        self._probe_sent = None
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(interval, threshold),
+            name="loop-monitor",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the watchdog thread."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self, interval: float, threshold: float | None) -> None:
+        assert self._loop is not None
+        while not self._stop.wait(interval):
+            now = time.monotonic()
+            sent = self._probe_sent
+            if sent is None:
+                self._probe_sent = now
+                self._reported = False
+                try:
+                    self._loop.call_soon_threadsafe(self._probe, now)
+                except RuntimeError:
+                    # Loop closed
+                    return
+            elif threshold is not None and not self._reported:
+                if now - sent >= threshold:
+                    self._reported = True
+                    self._report(now - sent)
+
+    def _probe(self, sent: float) -> None:
+        event_loop_lag_seconds.observe(time.monotonic() - sent)
+        self._probe_sent = None
+
+    def _report(self, blocked: float) -> None:
+        """Log the loop thread's stack (runs on the watchdog thread)."""
+        event_loop_blocks_total.inc()
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = traceback.extract_stack(frame, limit=STACK_LIMIT) if frame else []
+        # The watchdog thread has no request context: use the blocked task's
+        logger.warning(
+            "Event loop blocked",
+            blocked_ms=round(blocked * 1000, 1),
+            stack="".join(traceback.format_list(stack)),
+            **_task_context(asyncio.current_task(self._loop)),
+        )
+
+
+loop_monitor = LoopMonitor()
@@ -0,0 +1,574 @@
+"""In-process metrics with Prometheus text exposition.
+
+This module provides a small metrics registry so middleware and services
+can publish counters, gauges and histograms without an external client
+library.
+
+Metrics live in the worker process that records them. Under core.server's
+forked workers, /metrics must not report whichever worker happened to take
+the scrape, so multiprocess mode (enable_multiprocess(), called by the
+launcher before forking) also writes every sample value to a memory-mapped
+file per process in a shared directory. Rendering then reads all the files
+and aggregates them:
+- counters and histograms are summed over every worker, including workers
+  that have exited (the launcher folds their counts into an archive file
+  with registry.archive_worker(), so totals never go backwards when
+  workers are recycled);
+- gauges are summed over live workers, or their maximum is taken
+  (aggregate="max"), e.g. for durations.
+
+Usage:
+    from core.metrics import counter, histogram
+
+    shed_total = counter("shed_total", "Requests rejected", ["reason"])
+    shed_total.inc(reason="queue_full")
+
+    wait_seconds = histogram("queue_wait_seconds", "Time spent queued")
+    wait_seconds.observe(0.012)
+"""
+
+import bisect
+import fcntl
+import json
+import math
+import mmap
+import os
+import struct
+import threading
+from collections.abc import Iterable, Sequence
+from pathlib import Path
+from typing import Literal
+
+# Default histogram buckets (seconds), tuned for request-level latencies
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+LabelValues = tuple[str, ...]
+
+# Value file layout: bytes in use (uint64), then entries of key length
+# (uint32), key (UTF-8 JSON, padded to 8 bytes) and value (float64)
+_USED = struct.Struct("<Q")
+_KEY_LENGTH = struct.Struct("<I")
+_VALUE = struct.Struct("<d")
+_INITIAL_FILE_SIZE = 64 * 1024
+# Counts of exited workers, summed with the live workers' files
+_ARCHIVE_NAME = "archive.db"
+
+
+class _ValueFile:
+    """Sample values of one process, memory-mapped so others can read them.
+
+    Only the owning process writes. An entry is complete before the used
+    length is raised to include it, so readers never see a partial entry.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._offsets: dict[tuple[str, str, LabelValues], int] = {}
+        # Kept open (and mapped) for the life of the process
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600)
+        os.ftruncate(self._fd, _INITIAL_FILE_SIZE)
+        self._map = mmap.mmap(self._fd, _INITIAL_FILE_SIZE)
+        self._used = _USED.size
+        _USED.pack_into(self._map, 0, self._used)
+
+    def write(self, name: str, field: str, labels: LabelValues, value: float) -> None:
+        """Store the current value of one sample."""
+        with self._lock:
+            offset = self._offsets.get((name, field, labels))
+            if offset is None:
+                offset = self._offsets[(name, field, labels)] = self._append(
+                    json.dumps([name, field, *labels])
+                )
+            _VALUE.pack_into(self._map, offset, value)
+
+    def close(self) -> None:
+        self._map.close()
+        os.close(self._fd)
+
+    def _append(self, key: str) -> int:
+        encoded = key.encode()
+        padded = -(-(_KEY_LENGTH.size + len(encoded)) // 8) * 8
+        needed = self._used + padded + _VALUE.size
+        if needed > len(self._map):
+            size = len(self._map)
+            while size < needed:
+                size *= 2
+            os.ftruncate(self._fd, size)
+            self._map.resize(size)
+        _KEY_LENGTH.pack_into(self._map, self._used, len(encoded))
+        start = self._used + _KEY_LENGTH.size
+        self._map[start : start + len(encoded)] = encoded
+        offset = self._used + padded
+        _VALUE.pack_into(self._map, offset, 0.0)
+        self._used = offset + _VALUE.size
+        _USED.pack_into(self._map, 0, self._used)
+        return offset
+
+
+def _read_values(path: Path) -> dict[str, float]:
+    """Sample values (by JSON key) stored in a value file."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < _USED.size:
+        return {}
+    (used,) = _USED.unpack_from(data, 0)
+    values = {}
+    position = _USED.size
+    while position < min(used, len(data)):
+        (length,) = _KEY_LENGTH.unpack_from(data, position)
+        start = position + _KEY_LENGTH.size
+        key = data[start : start + length].decode()
+        position += -(-(_KEY_LENGTH.size + length) // 8) * 8
+        (values[key],) = _VALUE.unpack_from(data, position)
+        position += _VALUE.size
+    return values
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class _Multiprocess:
+    """Shared directory of per-process value files."""
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self._lock = threading.Lock()
+        # This process's file, created on its first write
+        self._file: _ValueFile | None = None
+
+    def write(self, name: str, field: str, labels: LabelValues, value: float) -> None:
+        file = self._file
+        if file is None:
+            with self._lock:
+                file = self._file
+                if file is None:
+                    file = self._file = _ValueFile(self.directory / f"{os.getpid()}.db")
+        file.write(name, field, labels, value)
+
+    def forget_file(self) -> None:
+        """Drop the inherited value file (in a freshly forked child)."""
+        self._lock = threading.Lock()
+        self._file = None
+
+    def locked(self, exclusive: bool) -> "_DirectoryLock":
+        return _DirectoryLock(self.directory / ".lock", exclusive)
+
+    def files(self) -> list[tuple[Path, bool]]:
+        """Value files with whether their process is alive."""
+        files = []
+        for path in self.directory.glob("*.db"):
+            alive = path.stem.isdigit() and _pid_alive(int(path.stem))
+            files.append((path, alive))
+        return files
+
+
+class _DirectoryLock:
+    """flock() on the directory's lock file, shared or exclusive."""
+
+    def __init__(self, path: Path, exclusive: bool) -> None:
+        self.path = path
+        self.operation = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+
+    def __enter__(self) -> None:
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self._fd, self.operation)
+
+    def __exit__(self, *exc_info: object) -> None:
+        os.close(self._fd)
+
+
+_multiprocess: _Multiprocess | None = None
+
+
+class Metric:
+    """Base class for labelled metrics.
+
+    Attributes:
+        name: Metric name (without namespace prefix).
+        documentation: Help text shown in the exposition output.
+        labelnames: Names of the labels every sample must provide.
+    """
+
+    type_name = "untyped"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _store(self, field: str, labels: LabelValues, value: float) -> None:
+        """Publish a sample value to the other workers (multiprocess mode)."""
+        if _multiprocess is not None:
+            _multiprocess.write(self.name, field, labels, value)
+
+    def _reset(self) -> None:
+        """Forget all values (e.g. those inherited by a forked worker)."""
+        raise NotImplementedError
+
+    def _empty(self) -> "Metric":
+        """A metric like this one, without values (to aggregate into)."""
+        raise NotImplementedError
+
+    def _merge(self, field: str, labels: LabelValues, value: float) -> None:
+        """Add one worker's sample value to this (aggregating) metric."""
+        raise NotImplementedError
+
+    def _key(self, labels: dict[str, str]) -> LabelValues:
+        if labels.keys() != set(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _format_labels(self, values: LabelValues, extra: str = "") -> str:
+        pairs = [
+            f'{name}="{_escape(value)}"'
+            for name, value in zip(self.labelnames, values, strict=True)
+        ]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def samples(self, prefix: str) -> Iterable[str]:
+        """Yield exposition lines for every labelled sample."""
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """Monotonically increasing counter."""
+
+    type_name = "counter"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """Increment the counter for the given labels."""
+        key = self._key(labels)
+        with self._lock:
+            value = self._values[key] = self._values.get(key, 0.0) + amount
+            self._store("", key, value)
+
+    def value(self, **labels: str) -> float:
+        """Return the current value for the given labels."""
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self, prefix: str) -> Iterable[str]:
+        for key, value in list(self._values.items()):
+            yield f"{prefix}{self.name}_total{self._format_labels(key)} {value}"
+
+    def _reset(self) -> None:
+        self._values.clear()
+
+    def _merge(self, field: str, labels: LabelValues, value: float) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + value
+
+    def _empty(self) -> "Counter":
+        return Counter(self.name, self.documentation, self.labelnames)
+
+
+class Gauge(Metric):
+    """Value that can go up and down.
+
+    Attributes:
+        aggregate: How the values of live workers are combined in
+            multiprocess mode: "sum" (e.g. in-flight requests) or "max".
+    """
+
+    type_name = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        aggregate: Literal["sum", "max"] = "sum",
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.aggregate = aggregate
+        self._values: dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        """Set the gauge for the given labels."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+            self._store("", key, value)
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """Increase the gauge for the given labels."""
+        key = self._key(labels)
+        with self._lock:
+            value = self._values[key] = self._values.get(key, 0.0) + amount
+            self._store("", key, value)
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        """Decrease the gauge for the given labels."""
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: str) -> float:
+        """Return the current value for the given labels."""
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self, prefix: str) -> Iterable[str]:
+        for key, value in list(self._values.items()):
+            yield f"{prefix}{self.name}{self._format_labels(key)} {value}"
+
+    def _reset(self) -> None:
+        self._values.clear()
+
+    def _merge(self, field: str, labels: LabelValues, value: float) -> None:
+        current = self._values.get(labels)
+        if current is None:
+            self._values[labels] = value
+        elif self.aggregate == "max":
+            self._values[labels] = max(current, value)
+        else:
+            self._values[labels] = current + value
+
+    def _empty(self) -> "Gauge":
+        return Gauge(self.name, self.documentation, self.labelnames, self.aggregate)
+
+
+class Histogram(Metric):
+    """Cumulative histogram with fixed upper bounds."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket..., +Inf count], sum
+        self._counts: dict[LabelValues, list[int]] = {}
+        self._sums: dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Record one observation for the given labels."""
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            # First bucket whose upper bound holds the value (else +Inf)
+            index = bisect.bisect_left(self.buckets, value)
+            counts[index] += 1
+            self._sums[key] += value
+            self._store(str(index), key, counts[index])
+            self._store("sum", key, self._sums[key])
+
+    def count(self, **labels: str) -> int:
+        """Return the number of observations for the given labels."""
+        return sum(self._counts.get(self._key(labels), ()))
+
+    def samples(self, prefix: str) -> Iterable[str]:
+        for key, counts in list(self._counts.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(
+                (*self.buckets, math.inf), counts, strict=True
+            ):
+                cumulative += bucket_count
+                le = "+Inf" if bound == math.inf else repr(bound)
+                labels = self._format_labels(key, f'le="{le}"')
+                yield f"{prefix}{self.name}_bucket{labels} {cumulative}"
+            labels = self._format_labels(key)
+            yield f"{prefix}{self.name}_sum{labels} {self._sums[key]}"
+            yield f"{prefix}{self.name}_count{labels} {cumulative}"
+
+    def _reset(self) -> None:
+        self._counts.clear()
+        self._sums.clear()
+
+    def _merge(self, field: str, labels: LabelValues, value: float) -> None:
+        counts = self._counts.get(labels)
+        if counts is None:
+            counts = self._counts[labels] = [0] * (len(self.buckets) + 1)
+            self._sums[labels] = 0.0
+        if field == "sum":
+            self._sums[labels] += value
+        else:
+            counts[int(field)] += int(value)
+
+    def _empty(self) -> "Histogram":
+        return Histogram(self.name, self.documentation, self.labelnames, self.buckets)
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together by the /metrics endpoint."""
+
+    def __init__(self, namespace: str = "app") -> None:
+        self.namespace = namespace
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        """Register a metric, returning the existing one if already present."""
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            if type(existing) is not type(metric):
+                raise ValueError(f"Metric {metric.name} already registered")
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Render all metrics in Prometheus text format (version 0.0.4).
+
+        In multiprocess mode the values of all workers are aggregated.
+        """
+        metrics = list(self._metrics.values())
+        if _multiprocess is not None:
+            metrics = self._aggregate(_multiprocess)
+        prefix = f"{self.namespace}_" if self.namespace else ""
+        lines: list[str] = []
+        for metric in metrics:
+            full_name = f"{prefix}{metric.name}"
+            lines.append(f"# HELP {full_name} {metric.documentation}")
+            lines.append(f"# TYPE {full_name} {metric.type_name}")
+            lines.extend(metric.samples(prefix))
+        return "\n".join(lines) + "\n"
+
+    def _aggregate(self, multiprocess: _Multiprocess) -> list[Metric]:
+        """Copies of the registered metrics holding every worker's values."""
+        merged = {name: metric._empty() for name, metric in self._metrics.items()}
+        with multiprocess.locked(exclusive=False):
+            files = multiprocess.files()
+            values = [(_read_values(path), alive) for path, alive in files]
+        for file_values, alive in values:
+            for key, value in file_values.items():
+                name, field, *labels = json.loads(key)
+                metric = merged.get(name)
+                if metric is None or (isinstance(metric, Gauge) and not alive):
+                    continue
+                metric._merge(field, tuple(labels), value)
+        return list(merged.values())
+
+    def reset(self) -> None:
+        """Forget the values of every metric."""
+        for metric in self._metrics.values():
+            with metric._lock:
+                metric._reset()
+
+    def archive_worker(self, pid: int) -> None:
+        """Fold an exited worker's counters and histograms into the archive.
+
+        Gauges of exited workers no longer count, so only the remaining
+        values are kept; the worker's own file is removed. Called by the
+        launcher when it reaps a worker, so the directory does not grow with
+        recycled workers.
+        """
+        if _multiprocess is None:
+            return
+        directory = _multiprocess.directory
+        path = directory / f"{pid}.db"
+        archive_path = directory / _ARCHIVE_NAME
+        with _multiprocess.locked(exclusive=True):
+            if not path.exists():
+                return
+            totals = _read_values(archive_path) if archive_path.exists() else {}
+            for key, value in _read_values(path).items():
+                if isinstance(self._metrics.get(json.loads(key)[0]), Gauge):
+                    continue
+                totals[key] = totals.get(key, 0.0) + value
+
+            temporary = directory / f".{_ARCHIVE_NAME}.tmp"
+            archive = _ValueFile(temporary)
+            for key, value in totals.items():
+                name, field, *labels = json.loads(key)
+                archive.write(name, field, tuple(labels), value)
+            archive.close()
+            os.replace(temporary, archive_path)
+            path.unlink()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+# Process-wide registry
+registry = MetricsRegistry()
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    """Create (or fetch) a counter in the process-wide registry."""
+    return registry.register(Counter(name, documentation, labelnames))  # type: ignore[return-value]
+
+
+def gauge(
+    name: str,
+    documentation: str,
+    labelnames: Sequence[str] = (),
+    aggregate: Literal["sum", "max"] = "sum",
+) -> Gauge:
+    """Create (or fetch) a gauge in the process-wide registry."""
+    return registry.register(  # type: ignore[return-value]
+        Gauge(name, documentation, labelnames, aggregate)
+    )
+
+
+def histogram(
+    name: str,
+    documentation: str,
+    labelnames: Sequence[str] = (),
+    buckets: Sequence[float] = DEFAULT_BUCKETS,
+) -> Histogram:
+    """Create (or fetch) a histogram in the process-wide registry."""
+    return registry.register(  # type: ignore[return-value]
+        Histogram(name, documentation, labelnames, buckets)
+    )
+
+
+def enable_multiprocess(directory: str | Path) -> None:
+    """Share metric values between the forked workers of this process.
+
+    Call in the parent before forking. Value files left in `directory` by
+    an earlier run are removed. Forked workers start with empty metrics and
+    write their values to `directory`/<pid>.db.
+    """
+    global _multiprocess
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    for path in directory.glob("*.db"):
+        path.unlink(missing_ok=True)
+    registry.reset()
+    _multiprocess = _Multiprocess(directory)
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+def _after_fork() -> None:
+    if _multiprocess is not None:
+        _multiprocess.forget_file()
+        registry.reset()
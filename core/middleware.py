@@ -4,11 +4,58 @@ This module provides middleware that can be added to the FastAPI app.
 Common middleware patterns are included here.
 """
 
+import asyncio
+import hashlib
+import math
 import time
 import uuid
-from collections.abc import Awaitable, Callable
+from collections.abc import AsyncIterator, Awaitable, Callable
 
-from fastapi import FastAPI, Request, Response
+import structlog
+from fastapi import FastAPI, Request, Response, status
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.admission import RequestShed, admission_controller, classify_request
+from core.batch import batch_context, in_atomic_batch
+from core.cache import (
+    has_cached_routes,
+    response_cache,
+    response_cache_requests_total,
+)
+from core.conditional import (
+    NOT_MODIFIED_HEADERS,
+    etag_matches,
+    make_weak_etag,
+    not_modified,
+)
+from core.deadlines import deadline_context, parse_timeout_header
+from core.drain import drainer
+from core.idempotency import (
+    IdempotencyKeyMismatch,
+    StoredResponse,
+    idempotency_requests_total,
+    idempotency_store,
+)
+from core.logging import get_logger
+from core.profiling import ProfilingMiddleware
+from core.ratelimit import (
+    bucket_key,
+    match_rule,
+    rate_limit_decisions_total,
+    rate_limiter,
+)
+from core.singleflight import (
+    SharedResponse,
+    is_single_flight_path,
+    single_flight,
+    single_flight_requests_total,
+    single_flight_wait_seconds,
+)
+from settings import settings
+
+logger = get_logger(__name__)
 
 
 async def request_id_middleware(
@@ -19,6 +66,7 @@ async def request_id_middleware(
     The request ID is:
     - Generated as a UUID4 if not provided in X-Request-ID header
     - Stored in request.state.request_id for access in handlers
+    - Bound to the structlog context, so every log event carries it
     - Returned in X-Request-ID response header
 
     Usage in routes:
@@ -30,7 +78,8 @@ async def request_id_middleware(
     request_id = request.headers.get("X-Request-ID", str(uuid.uuid4()))
     request.state.request_id = request_id
 
-    response = await call_next(request)
+    with structlog.contextvars.bound_contextvars(request_id=request_id):
+        response = await call_next(request)
     response.headers["X-Request-ID"] = request_id
 
     return response
@@ -41,7 +90,8 @@ async def timing_middleware(
 ) -> Response:
     """Add request timing information to responses.
 
-    Adds X-Process-Time header with the request processing time in seconds.
+    Adds X-Process-Time header with the request processing time in seconds,
+    and logs a "Request completed" event when settings.log_requests is on.
     """
     start_time = time.perf_counter()
 
@@ -49,6 +99,14 @@ async def timing_middleware(
 
     process_time = time.perf_counter() - start_time
     response.headers["X-Process-Time"] = f"{process_time:.4f}"
+    if settings.log_requests:
+        logger.info(
+            "Request completed",
+            method=request.method,
+            path=request.url.path,
+            status_code=response.status_code,
+            duration_ms=round(process_time * 1000, 2),
+        )
 
     return response
 
@@ -79,20 +137,464 @@ async def security_headers_middleware(
     return response
 
 
+async def admission_control_middleware(
+    request: Request, call_next: Callable[[Request], Awaitable[Response]]
+) -> Response:
+    """Cap in-flight requests per worker and shed load when overloaded.
+
+    Requests wait in a bounded priority queue (see core.admission) when the
+    worker is at capacity. Shed requests get 503 with a Retry-After header.
+    Batched sub-requests run under their batch request's slot.
+    """
+    if batch_context(request.scope) is not None:
+        return await call_next(request)
+
+    try:
+        await admission_controller.acquire(classify_request(request))
+    except RequestShed:
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"message": "Server is overloaded, please retry later"},
+            headers={"Retry-After": str(settings.admission_retry_after)},
+        )
+
+    try:
+        return await call_next(request)
+    finally:
+        admission_controller.release()
+
+
+async def rate_limit_middleware(
+    request: Request, call_next: Callable[[Request], Awaitable[Response]]
+) -> Response:
+    """Enforce the per-route limits in settings.rate_limit_rules.
+
+    Counters are shared by all workers (see core.ratelimit). Rejected
+    requests get 429 with a Retry-After header; if the limiter backend is
+    unavailable, requests are let through.
+    """
+    rule = match_rule(request)
+    if rule is None:
+        return await call_next(request)
+
+    try:
+        decision = await rate_limiter.check(bucket_key(request, rule), rule)
+    except Exception:
+        logger.warning("Rate limiter unavailable", rule=rule.name, exc_info=True)
+        rate_limit_decisions_total.inc(rule=rule.name, outcome="error")
+        return await call_next(request)
+
+    if not decision.allowed:
+        rate_limit_decisions_total.inc(rule=rule.name, outcome="limited")
+        return JSONResponse(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            content={"message": "Too many requests, please retry later"},
+            headers={
+                "Retry-After": str(math.ceil(decision.retry_after)),
+                "RateLimit-Limit": str(rule.limit),
+                "RateLimit-Remaining": "0",
+            },
+        )
+
+    rate_limit_decisions_total.inc(rule=rule.name, outcome="allowed")
+    response = await call_next(request)
+    response.headers["RateLimit-Limit"] = str(rule.limit)
+    response.headers["RateLimit-Remaining"] = str(decision.remaining)
+    return response
+
+
+async def single_flight_middleware(
+    request: Request, call_next: Callable[[Request], Awaitable[Response]]
+) -> Response:
+    """Collapse identical concurrent GETs on settings.single_flight_paths.
+
+    The first request (leader) runs the handler; identical requests arriving
+    meanwhile wait and get a copy of its response bytes (see
+    core.singleflight). If the leader fails or its response cannot be shared
+    (streamed or larger than settings.single_flight_max_body_bytes), waiters
+    run the handler themselves. Sub-requests of atomic batches never share.
+    """
+    if (
+        request.method != "GET"
+        or not is_single_flight_path(request.url.path)
+        or in_atomic_batch(request.scope)
+    ):
+        return await call_next(request)
+
+    key = single_flight.flight_key(request)
+    future = single_flight.join(key)
+    if future is not None:
+        started = time.perf_counter()
+        shared = await asyncio.shield(future)
+        single_flight_wait_seconds.observe(time.perf_counter() - started)
+        if shared is None:
+            single_flight_requests_total.inc(outcome="fallback")
+            return await call_next(request)
+
+        single_flight_requests_total.inc(outcome="collapsed")
+        state = request.scope.setdefault("state", {})
+        for name, value in shared.state.items():
+            state.setdefault(name, value)
+        return shared.to_response()
+
+    single_flight_requests_total.inc(outcome="leader")
+    result: SharedResponse | None = None
+    try:
+        response = await call_next(request)
+        content_length = response.headers.get("content-length")
+        if (
+            content_length is not None
+            and int(content_length) <= settings.single_flight_max_body_bytes
+        ):
+            body = b"".join([chunk async for chunk in response.body_iterator])  # type: ignore[attr-defined]
+            response.body_iterator = _replay_body(body)  # type: ignore[attr-defined]
+            result = single_flight.share(request, response, body)
+    finally:
+        single_flight.finish(key, result)
+    return response
+
+
+async def conditional_get_middleware(
+    request: Request, call_next: Callable[[Request], Awaitable[Response]]
+) -> Response:
+    """Add weak ETags to GET responses and answer If-None-Match with 304.
+
+    The ETag is taken from (in order):
+    - An ETag header already set by the handler
+    - request.state.etag, set by the core.conditional.etag_version decorator
+    - A hash of the serialized body (only for bodies with a known length
+      up to settings.etag_max_body_bytes, so streamed responses pass through)
+    """
+    if request.method not in ("GET", "HEAD"):
+        return await call_next(request)
+
+    response = await call_next(request)
+    if response.status_code != 200:
+        return response
+
+    etag = response.headers.get("etag") or getattr(request.state, "etag", None)
+    if etag is None:
+        content_length = response.headers.get("content-length")
+        if content_length is None or int(content_length) > settings.etag_max_body_bytes:
+            return response
+
+        body = b"".join([chunk async for chunk in response.body_iterator])  # type: ignore[attr-defined]
+        response.body_iterator = _replay_body(body)  # type: ignore[attr-defined]
+        etag = make_weak_etag(body)
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(
+            etag,
+            {
+                name: response.headers[name]
+                for name in NOT_MODIFIED_HEADERS
+                if name in response.headers
+            },
+        )
+
+    response.headers["ETag"] = etag
+    return response
+
+
+async def response_cache_middleware(
+    request: Request, call_next: Callable[[Request], Awaitable[Response]]
+) -> Response:
+    """Serve and fill the response cache for GET routes (see core.cache).
+
+    Hits are answered before routing, so neither dependencies nor the
+    handler run. Responses are only stored for routes decorated with
+    cache_response. Sub-requests of atomic batches bypass the cache.
+    """
+    if request.method != "GET" or in_atomic_batch(request.scope):
+        return await call_next(request)
+
+    entry = response_cache.lookup(request)
+    if entry is not None:
+        response_cache_requests_total.inc(outcome="hit")
+        response = entry.to_response()
+        etag = response.headers.get("etag")
+        if_none_match = request.headers.get("if-none-match")
+        if etag is not None and etag_matches(if_none_match, etag):
+            return not_modified(
+                etag,
+                {
+                    name: response.headers[name]
+                    for name in NOT_MODIFIED_HEADERS
+                    if name in response.headers
+                },
+            )
+        return response
+
+    response = await call_next(request)
+    target = getattr(request.state, "response_cache", None)
+    if target is None or response.status_code != 200:
+        return response
+
+    response_cache_requests_total.inc(outcome="miss")
+    body = b"".join([chunk async for chunk in response.body_iterator])  # type: ignore[attr-defined]
+    response.body_iterator = _replay_body(body)  # type: ignore[attr-defined]
+    response_cache.store(request, target, response, body)
+    return response
+
+
+async def idempotency_middleware(
+    request: Request, call_next: Callable[[Request], Awaitable[Response]]
+) -> Response:
+    """Replay stored responses for retried requests with an Idempotency-Key.
+
+    See core.idempotency for storage and concurrency semantics. Responses
+    from a replay carry an Idempotent-Replayed: true header. Sub-requests of
+    atomic batches are not stored: the batch may still roll back.
+    """
+    key = request.headers.get("idempotency-key")
+    if (
+        key is None
+        or request.method not in settings.idempotency_methods
+        or request.url.path in settings.idempotency_exclude_paths
+        or in_atomic_batch(request.scope)
+    ):
+        return await call_next(request)
+
+    if not key or len(key) > 255:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "message": "Invalid Idempotency-Key",
+                "detail": "Key must be between 1 and 255 characters",
+            },
+        )
+
+    fingerprint = hashlib.sha256(await request.body()).hexdigest()
+    scoped_key = idempotency_store.scope_key(request, key)
+    try:
+        stored = await idempotency_store.begin(scoped_key, fingerprint)
+    except IdempotencyKeyMismatch:
+        idempotency_requests_total.inc(outcome="mismatch")
+        return JSONResponse(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            content={
+                "message": "Idempotency-Key already used",
+                "detail": "The key was used with a different request body",
+            },
+        )
+
+    if stored is not None:
+        idempotency_requests_total.inc(outcome="replayed")
+        return stored.to_response()
+
+    result: StoredResponse | None = None
+    try:
+        response = await call_next(request)
+        body = b"".join([chunk async for chunk in response.body_iterator])  # type: ignore[attr-defined]
+        response.body_iterator = _replay_body(body)  # type: ignore[attr-defined]
+        if idempotency_store.is_storable(response.status_code):
+            result = idempotency_store.new_response(
+                fingerprint, response.status_code, response.raw_headers, body
+            )
+    finally:
+        # Shielded so waiting duplicates are released even on cancellation
+        await asyncio.shield(idempotency_store.finish(scoped_key, result))
+
+    idempotency_requests_total.inc(outcome="executed")
+    return response
+
+
+async def _replay_body(body: bytes) -> AsyncIterator[bytes]:
+    """Yield an already-consumed response body again."""
+    yield body
+
+
+class RequestDeadlineMiddleware:
+    """Enforce the per-request deadline (see core.deadlines).
+
+    Written as a plain ASGI middleware because it needs to own the receive
+    channel: request messages are pumped by a background task so a client
+    disconnect is noticed even while the handler is busy, not only when it
+    next reads the body.
+
+    - Deadline passes before the response starts: the request is cancelled
+      and answered with 504.
+    - Client disconnects before the response completes: the request is
+      cancelled and nothing is sent.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        client_timeout = parse_timeout_header(headers.get("x-request-timeout"))
+        messages: asyncio.Queue[Message] = asyncio.Queue()
+        response_started = False
+        response_complete = False
+        disconnected = False
+        # Clients may close once Content-Length bytes arrived, before the
+        # final empty body message: that is not an early disconnect
+        body_remaining: int | None = None
+
+        async def receive_from_pump() -> Message:
+            message = await messages.get()
+            messages.task_done()
+            return message
+
+        async def tracking_send(message: Message) -> None:
+            nonlocal response_started, response_complete, body_remaining
+            if message["type"] == "http.response.start":
+                response_started = True
+                content_length = Headers(raw=message.get("headers", [])).get(
+                    "content-length"
+                )
+                if content_length is not None and content_length.isdigit():
+                    body_remaining = int(content_length)
+            elif message["type"] == "http.response.body":
+                if body_remaining is not None:
+                    body_remaining -= len(message.get("body", b""))
+                if not message.get("more_body", False) or body_remaining == 0:
+                    response_complete = True
+            await send(message)
+
+        with deadline_context(client_timeout) as deadline:
+
+            async def pump_receive(timeout_scope: asyncio.Timeout) -> None:
+                nonlocal disconnected
+                while True:
+                    message = await receive()
+                    messages.put_nowait(message)
+                    if message["type"] == "http.disconnect":
+                        if not response_complete:
+                            disconnected = True
+                            timeout_scope.reschedule(asyncio.get_running_loop().time())
+                        return
+                    if message.get("more_body", False):
+                        # Keep backpressure: wait until the app read the chunk
+                        await messages.join()
+
+            try:
+                async with asyncio.timeout(deadline.remaining()) as timeout_scope:
+                    deadline.timeout_scope = timeout_scope
+                    pump = asyncio.create_task(pump_receive(timeout_scope))
+                    try:
+                        await self.app(scope, receive_from_pump, tracking_send)
+                    finally:
+                        pump.cancel()
+            except TimeoutError:
+                if not timeout_scope.expired():
+                    raise
+                elapsed = time.monotonic() - deadline.started_at
+                if disconnected:
+                    logger.info(
+                        "Client disconnected, request cancelled",
+                        path=scope["path"],
+                        elapsed=round(elapsed, 4),
+                    )
+                    return
+
+                logger.warning(
+                    "Request deadline exceeded",
+                    path=scope["path"],
+                    elapsed=round(elapsed, 4),
+                    response_started=response_started,
+                )
+                if not response_started:
+                    response = JSONResponse(
+                        status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                        content={"message": "Request deadline exceeded"},
+                    )
+                    await response(scope, receive_from_pump, send)
+
+
+class DrainMiddleware:
+    """Track in-flight requests for draining (see core.drain).
+
+    While the worker drains, responses get `Connection: close` so the
+    server closes keep-alive connections after the current response.
+    Batched sub-requests are counted through their batch request.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or batch_context(scope) is not None:
+            await self.app(scope, receive, send)
+            return
+
+        async def closing_send(message: Message) -> None:
+            if message["type"] == "http.response.start" and drainer.draining:
+                headers = [
+                    (name, value)
+                    for name, value in message.get("headers", [])
+                    if name.lower() != b"connection"
+                ]
+                headers.append((b"connection", b"close"))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        drainer.request_started()
+        cancelled = False
+        try:
+            await self.app(scope, receive, closing_send)
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        finally:
+            drainer.request_finished(cancelled)
+
+
 def register_middleware(app: FastAPI) -> None:
     """Register custom middleware with the FastAPI app.
 
     Middleware is executed in reverse order of registration
-    (last registered runs first).
+    (last registered runs first). Call it after including the routers: the
+    response cache middleware is only added when a route uses
+    cache_response.
 
     Args:
         app: FastAPI application instance
     """
+    # Add profiling middleware (innermost, samples only the handler)
+    if settings.profiling_enabled:
+        app.add_middleware(ProfilingMiddleware)
+
+    # Add single-flight middleware (shares raw handler responses)
+    if settings.single_flight_enabled and settings.single_flight_paths:
+        app.middleware("http")(single_flight_middleware)
+
+    # Add conditional GET middleware (sees the raw handler response)
+    if settings.etag_enabled:
+        app.middleware("http")(conditional_get_middleware)
+
+    # Add response cache middleware (stores responses with their ETag)
+    if settings.response_cache_enabled and has_cached_routes(app):
+        app.middleware("http")(response_cache_middleware)
+
+    # Add idempotency middleware (stores handler responses for replay)
+    if settings.idempotency_enabled:
+        app.middleware("http")(idempotency_middleware)
+
     # Add timing middleware (runs last, measures total time)
     app.middleware("http")(timing_middleware)
 
     # Add security headers middleware
     app.middleware("http")(security_headers_middleware)
 
-    # Add request ID middleware (runs first)
+    # Add request ID middleware
     app.middleware("http")(request_id_middleware)
+
+    # Add admission control middleware (sheds before any work)
+    if settings.admission_enabled:
+        app.middleware("http")(admission_control_middleware)
+
+    # Add rate limit middleware (rejects before taking an admission slot)
+    if settings.rate_limit_enabled:
+        app.middleware("http")(rate_limit_middleware)
+
+    # Add request deadline middleware (runs first, so queue time counts)
+    app.add_middleware(RequestDeadlineMiddleware)
+
+    # Add drain middleware (outermost, counts every in-flight request)
+    app.add_middleware(DrainMiddleware)
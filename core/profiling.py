@@ -0,0 +1,237 @@
+"""On-demand sampling profiler for single requests.
+
+Profiles the requests that carry `X-Profile: <settings.profiling_secret>`,
+plus a random settings.profiling_sample_rate fraction of all requests, and
+writes one collapsed-stack file per profiled request to
+settings.profiling_dir, named after its request ID:
+
+    <unix time>-<request id>.folded    "frame;frame;frame <microseconds>" lines
+
+The files load directly into speedscope, inferno or flamegraph.pl.
+
+While a request is profiled, a sampler thread wakes every
+settings.profiling_interval_ms and records where the request is:
+- Running on the event loop: the loop thread's stack.
+- Suspended: the chain of coroutines it is awaiting, ending in a
+  "[waiting]" frame (I/O, locks, or the threadpool for sync code; the
+  worker thread's own stack is not sampled).
+
+Each sample is weighted by the wall time since the previous one: a busy
+event loop can delay the sampler (it needs the GIL), and that time is
+charged to the stack that was holding it. The weights add up to the
+request's latency. Only the endpoint and the dependencies run inside the
+profiler (it is the innermost middleware); middleware time is not sampled.
+
+When PROFILING_ENABLED is off the middleware is not installed at all.
+Other requests pay one header lookup (and a random() call when sampling),
+and at most settings.profiling_max_concurrent requests per worker are
+profiled at once.
+"""
+
+import asyncio
+import hmac
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from collections.abc import Awaitable, Generator
+from pathlib import Path
+from types import FrameType
+from typing import Any
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from core.logging import get_logger
+from core.metrics import counter
+from settings import settings
+
+logger = get_logger(__name__)
+
+profiled_requests_total = counter(
+    "profiled_requests",
+    "Requests profiled by the sampling profiler, by trigger",
+    ["trigger"],
+)
+
+# Request IDs come from the client: keep file names safe
+_UNSAFE_FILENAME = re.compile(r"[^A-Za-z0-9._-]")
+_ROOT = str(Path(__file__).resolve().parent.parent) + os.sep
+
+
+def _label(frame: FrameType) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    if filename.startswith(_ROOT):
+        filename = filename[len(_ROOT) :]
+    else:
+        # site-packages/<package>/... -> <package>/...
+        filename = filename.rpartition("site-packages" + os.sep)[2]
+    return f"{code.co_qualname} ({filename}:{code.co_firstlineno})".replace(";", ",")
+
+
+class RequestProfile:
+    """Samples of one request's stacks.
+
+    Attributes:
+        request_id: ID of the profiled request, used in the file name.
+        samples: Collapsed stack (root first, ";"-separated) -> microseconds.
+        running: True while the request's code runs on the event loop.
+    """
+
+    def __init__(self, request_id: str, interval: float) -> None:
+        self.request_id = request_id
+        self.interval = interval
+        self.samples: Counter[str] = Counter()
+        self.running = False
+        self._awaitable: Awaitable[Any] | None = None
+        self._thread_id = threading.get_ident()
+        self._stop = threading.Event()
+
+    def sample(self, weight: int) -> None:
+        """Charge `weight` microseconds to the request's current stack."""
+        if self.running:
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            # Walk up to the profiler's own frame: what is above it is the
+            # event loop and the outer middleware
+            while frame is not None and frame.f_code is not _TRACKED_CODE:
+                stack.append(_label(frame))
+                frame = frame.f_back
+            stack.reverse()
+        else:
+            stack = []
+            awaitable: Any = self._awaitable
+            while awaitable is not None:
+                frame = getattr(awaitable, "cr_frame", None) or getattr(
+                    awaitable, "gi_frame", None
+                )
+                if frame is None:
+                    break
+                stack.append(_label(frame))
+                awaitable = getattr(awaitable, "cr_await", None) or getattr(
+                    awaitable, "gi_yieldfrom", None
+                )
+            stack.append("[waiting]")
+        if stack:
+            self.samples[";".join(stack)] += weight
+
+    def _run_sampler(self) -> None:
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            self.sample(round((now - last) * 1_000_000))
+            last = now
+
+    async def run(self, awaitable: Awaitable[Any]) -> Any:
+        """Await `awaitable` (e.g. an ASGI app call) while sampling it."""
+        self._awaitable = awaitable
+        sampler = threading.Thread(
+            target=self._run_sampler, name="request-profiler", daemon=True
+        )
+        sampler.start()
+        try:
+            return await _Tracked(awaitable, self)
+        finally:
+            self._stop.set()
+            sampler.join()
+
+    def write(self, directory: str | Path) -> Path:
+        """Write the samples as a collapsed-stack file; return its path."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        request_id = _UNSAFE_FILENAME.sub("_", self.request_id)[:64] or "request"
+        path = directory / f"{int(time.time())}-{request_id}.folded"
+        path.write_text(
+            "".join(f"{stack} {count}\n" for stack, count in self.samples.items())
+        )
+        return path
+
+
+class _Tracked:
+    """Awaits an awaitable, flagging the profile while it runs."""
+
+    def __init__(self, awaitable: Awaitable[Any], profile: RequestProfile) -> None:
+        self.iterator = awaitable.__await__()
+        self.profile = profile
+
+    def __await__(self) -> Generator[Any, Any, Any]:
+        send_value: Any = None
+        error: BaseException | None = None
+        while True:
+            self.profile.running = True
+            try:
+                if error is None:
+                    yielded = self.iterator.send(send_value)
+                else:
+                    yielded = self.iterator.throw(error)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                self.profile.running = False
+            try:
+                send_value, error = (yield yielded), None
+            except GeneratorExit:
+                self.iterator.close()
+                raise
+            except BaseException as e:
+                send_value, error = None, e
+
+
+_TRACKED_CODE = _Tracked.__await__.__code__
+
+
+class ProfilingMiddleware:
+    """Profile requests asking for it (X-Profile) and a sampled fraction."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self.active = 0
+
+    def _trigger(self, scope: Scope) -> str | None:
+        if self.active >= settings.profiling_max_concurrent:
+            return None
+        secret = settings.profiling_secret
+        if secret:
+            value = Headers(scope=scope).get("x-profile")
+            if value is not None and hmac.compare_digest(
+                value.encode(), secret.encode()
+            ):
+                return "header"
+        rate = settings.profiling_sample_rate
+        if rate and random.random() < rate:
+            return "sampled"
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        trigger = self._trigger(scope) if scope["type"] == "http" else None
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        request_id = scope.get("state", {}).get("request_id") or "request"
+        profile = RequestProfile(request_id, settings.profiling_interval_ms / 1000)
+        profiled_requests_total.inc(trigger=trigger)
+        self.active += 1
+        started = time.perf_counter()
+        try:
+            await profile.run(self.app(scope, receive, send))
+        finally:
+            self.active -= 1
+            duration_ms = round((time.perf_counter() - started) * 1000, 1)
+            try:
+                path = await asyncio.to_thread(profile.write, settings.profiling_dir)
+            except OSError:
+                logger.warning("Failed to write request profile", exc_info=True)
+            else:
+                logger.info(
+                    "Request profiled",
+                    path=scope["path"],
+                    trigger=trigger,
+                    duration_ms=duration_ms,
+                    sampled_ms=round(profile.samples.total() / 1000, 1),
+                    profile=str(path),
+                )
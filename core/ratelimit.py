@@ -0,0 +1,351 @@
+"""Rate limiting shared by all workers.
+
+Limits are configured per route in settings.rate_limit_rules and enforced
+by the rate limit middleware. Two algorithms are available:
+- token_bucket: `limit` tokens refilled over `period` seconds, bursts up to
+  `burst` (defaults to `limit`)
+- sliding_window: at most `limit` requests in any `period`-second window
+  (weighted two-window approximation)
+
+State is kept outside the worker processes so limits hold for the node as a
+whole rather than per uvicorn worker:
+- shm (default): fixed-size hash table in a memory-mapped file under
+  /dev/shm, protected by byte-range fcntl locks. A decision is a blake2b
+  hash, one lock/unlock pair and a few struct reads/writes.
+- database: rows in the rate_limit_buckets table (Postgres only), for
+  limits shared by several nodes. Adds a database round trip per request.
+  Rows idle for longer than any rule could remember are deleted
+  periodically.
+"""
+
+import asyncio
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import NamedTuple
+
+from fastapi import Request
+from sqlalchemy import BigInteger, delete, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Mapped, mapped_column
+
+from core.logging import get_logger
+from core.metrics import counter
+from db.database import Base, async_session_factory
+from settings import RateLimitRule, settings
+
+logger = get_logger(__name__)
+
+rate_limit_decisions_total = counter(
+    "rate_limit_decisions",
+    "Rate limit decisions by rule and outcome",
+    ["rule", "outcome"],
+)
+
+# Bucket state: (timestamp, value, previous value); all zero for a new key
+State = tuple[float, float, float]
+EMPTY_STATE: State = (0.0, 0.0, 0.0)
+
+# Shared table layout: header, then fixed-size slots (key hash + state)
+MAGIC = b"PXRL0001"
+HEADER = struct.Struct("<8sQ")
+SLOT = struct.Struct("<Qddd")
+# Slots probed for a key; the probe window is locked as one byte range
+PROBE_SLOTS = 8
+
+
+class RateLimitBucketMissing(Exception):
+    """Raised when a database bucket vanishes while a request is counted.
+
+    The rate limit middleware lets such requests through, as it does when
+    the backend is unavailable.
+    """
+
+
+class Decision(NamedTuple):
+    """Outcome of a rate limit check.
+
+    Attributes:
+        allowed: Whether the request may proceed.
+        remaining: Requests left before the limit is hit.
+        retry_after: Seconds until the next request would be allowed.
+    """
+
+    allowed: bool
+    remaining: int
+    retry_after: float
+
+
+def token_bucket(
+    state: State, now: float, rule: RateLimitRule
+) -> tuple[Decision, State]:
+    """Apply one request to a token bucket.
+
+    State: (last refill time, tokens, unused).
+    """
+    updated_at, tokens, _ = state
+    capacity = float(rule.burst or rule.limit)
+    rate = rule.limit / rule.period
+    if updated_at == 0.0:
+        tokens = capacity
+    else:
+        tokens = min(capacity, tokens + max(now - updated_at, 0.0) * rate)
+
+    if tokens >= 1.0:
+        return Decision(True, int(tokens - 1.0), 0.0), (now, tokens - 1.0, 0.0)
+    return Decision(False, 0, (1.0 - tokens) / rate), (now, tokens, 0.0)
+
+
+def sliding_window(
+    state: State, now: float, rule: RateLimitRule
+) -> tuple[Decision, State]:
+    """Apply one request to a sliding window counter.
+
+    State: (current window start, current count, previous window count).
+    The previous window's count is weighted by how much of it still
+    overlaps the sliding window.
+    """
+    window_start, current, previous = state
+    period = float(rule.period)
+    start = now - (now % period)
+    if window_start != start:
+        previous = current if start - window_start == period else 0.0
+        current = 0.0
+
+    elapsed = now - start
+    estimated = previous * (1.0 - elapsed / period) + current
+    if estimated + 1.0 <= rule.limit:
+        remaining = int(rule.limit - estimated - 1.0)
+        return Decision(True, remaining, 0.0), (start, current + 1.0, previous)
+
+    # Wait until the previous window's weight has decayed enough, or until
+    # the next window if the current one alone is full
+    if previous > 0 and current + 1.0 <= rule.limit:
+        free_at = period * (1.0 - (rule.limit - current - 1.0) / previous)
+        retry_after = max(free_at - elapsed, 0.0)
+    else:
+        retry_after = period - elapsed
+    return Decision(False, 0, retry_after), (start, current, previous)
+
+
+ALGORITHMS = {"token_bucket": token_bucket, "sliding_window": sliding_window}
+
+
+def state_lifetime(rule: RateLimitRule) -> float:
+    """Seconds after its last update when a bucket is the same as a new one.
+
+    A token bucket is full again once `burst` tokens have been refilled; a
+    sliding window forgets its previous window after two periods.
+    """
+    refill = (rule.burst or rule.limit) * rule.period / rule.limit
+    return max(refill, 2 * rule.period)
+
+
+@lru_cache(maxsize=4096)
+def key_hash(key: str) -> int:
+    """Stable 64-bit hash of a bucket key (never 0, which marks empty slots)."""
+    digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little") or 1
+
+
+class SharedMemoryRateLimiter:
+    """Rate limiter backed by a memory-mapped table shared by all workers.
+
+    The table is opened lazily per process, so it also works when workers
+    are forked from a preloaded parent.
+    """
+
+    def __init__(self, path: Path, slots: int) -> None:
+        self.path = path
+        self.slots = max(slots, PROBE_SLOTS)
+        self.size = HEADER.size + self.slots * SLOT.size
+        self._pid: int | None = None
+        self._fd = -1
+        self._map: mmap.mmap | None = None
+
+    def hit(self, key: str, rule: RateLimitRule, now: float | None = None) -> Decision:
+        """Count one request for `key` under `rule`."""
+        table = self._table()
+        now = time.time() if now is None else now
+        hashed = key_hash(key)
+        first = hashed % (self.slots - PROBE_SLOTS + 1)
+        offset = HEADER.size + first * SLOT.size
+        length = PROBE_SLOTS * SLOT.size
+
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, length, offset)
+        try:
+            slot_offset, state = self._find_slot(table, hashed, offset)
+            decision, new_state = ALGORITHMS[rule.algorithm](state, now, rule)
+            SLOT.pack_into(table, slot_offset, hashed, *new_state)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, length, offset)
+        return decision
+
+    async def check(self, key: str, rule: RateLimitRule) -> Decision:
+        """Async interface shared with DatabaseRateLimiter."""
+        return self.hit(key, rule)
+
+    def _find_slot(
+        self, table: mmap.mmap, hashed: int, offset: int
+    ) -> tuple[int, State]:
+        """Find the slot holding `hashed`, or the best slot to (re)use."""
+        victim_offset = offset
+        victim_timestamp = float("inf")
+        for slot_offset in range(offset, offset + PROBE_SLOTS * SLOT.size, SLOT.size):
+            slot_key, timestamp, value, previous = SLOT.unpack_from(table, slot_offset)
+            if slot_key == hashed:
+                return slot_offset, (timestamp, value, previous)
+            if slot_key == 0:
+                return slot_offset, EMPTY_STATE
+            if timestamp < victim_timestamp:
+                victim_offset, victim_timestamp = slot_offset, timestamp
+        # Window full: evict the least recently updated bucket
+        return victim_offset, EMPTY_STATE
+
+    def _table(self) -> mmap.mmap:
+        pid = os.getpid()
+        if self._map is not None and self._pid == pid:
+            return self._map
+
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        # Whole-file lock while checking/initialising the header
+        fcntl.lockf(fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(fd).st_size != self.size or os.pread(fd, 8, 0) != MAGIC:
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, self.size)
+                os.pwrite(fd, HEADER.pack(MAGIC, self.slots), 0)
+        finally:
+            fcntl.lockf(fd, fcntl.LOCK_UN)
+
+        self._fd = fd
+        self._map = mmap.mmap(fd, self.size)
+        self._pid = pid
+        return self._map
+
+
+class RateLimitBucket(Base):
+    """Rate limit state for the database backend."""
+
+    __tablename__ = "rate_limit_buckets"
+
+    key: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=False)
+    timestamp: Mapped[float] = mapped_column(index=True)
+    value: Mapped[float]
+    previous: Mapped[float]
+
+
+class DatabaseRateLimiter:
+    """Rate limiter backed by Postgres rows, shared by every node."""
+
+    def __init__(self) -> None:
+        self._last_cleanup = 0.0
+        self._background_tasks: set[asyncio.Task[None]] = set()
+
+    async def check(
+        self, key: str, rule: RateLimitRule, now: float | None = None
+    ) -> Decision:
+        """Count one request for `key` under `rule`."""
+        now = time.time() if now is None else now
+        # Signed 64-bit to fit BIGINT
+        hashed = key_hash(key) - (1 << 63)
+
+        async with async_session_factory() as session, session.begin():
+            await session.execute(
+                insert(RateLimitBucket)
+                .values(key=hashed, timestamp=0.0, value=0.0, previous=0.0)
+                .on_conflict_do_nothing()
+            )
+            bucket = await session.scalar(
+                select(RateLimitBucket)
+                .where(RateLimitBucket.key == hashed)
+                .with_for_update()
+            )
+            if bucket is None:
+                # Deleted by a concurrent cleanup after the insert found it
+                raise RateLimitBucketMissing(key)
+            state = (bucket.timestamp, bucket.value, bucket.previous)
+            decision, (bucket.timestamp, bucket.value, bucket.previous) = ALGORITHMS[
+                rule.algorithm
+            ](state, now, rule)
+
+        self._maybe_cleanup()
+        return decision
+
+    def _maybe_cleanup(self) -> None:
+        now = time.monotonic()
+        if now - self._last_cleanup < settings.rate_limit_cleanup_interval:
+            return
+        self._last_cleanup = now
+        task = asyncio.get_running_loop().create_task(self._delete_expired())
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def _delete_expired(self) -> None:
+        # Rows store a key hash, not their rule: keep every row until the
+        # longest-lived rule would have forgotten it
+        lifetime = max(map(state_lifetime, settings.rate_limit_rules), default=0.0)
+        try:
+            async with async_session_factory() as session, session.begin():
+                await session.execute(
+                    delete(RateLimitBucket).where(
+                        RateLimitBucket.timestamp < time.time() - lifetime
+                    )
+                )
+        except SQLAlchemyError:
+            logger.warning("Failed to delete expired rate limit buckets", exc_info=True)
+
+
+def match_rule(request: Request) -> RateLimitRule | None:
+    """Return the first rule matching the request's method and path."""
+    path = request.url.path
+    for rule in settings.rate_limit_rules:
+        if rule.methods and request.method not in rule.methods:
+            continue
+        if rule.path.endswith("*"):
+            if path.startswith(rule.path[:-1]):
+                return rule
+        elif path == rule.path:
+            return rule
+    return None
+
+
+def bucket_key(request: Request, rule: RateLimitRule) -> str:
+    """Build the bucket key for a request: rule plus client identity.
+
+    "user" rules key on a hash of the Authorization header (the token is not
+    verified here, so its claims cannot be trusted); anonymous requests fall
+    back to the client IP.
+    """
+    identity = None
+    if rule.key == "user":
+        authorization = request.headers.get("authorization")
+        if authorization:
+            identity = "u:" + hashlib.sha256(authorization.encode()).hexdigest()
+    if identity is None:
+        identity = "ip:" + (request.client.host if request.client else "unknown")
+    return f"{rule.name}|{identity}"
+
+
+def _shm_path() -> Path:
+    if settings.rate_limit_shm_path:
+        return Path(settings.rate_limit_shm_path)
+    directory = Path("/dev/shm")
+    if not directory.is_dir():
+        directory = Path(tempfile.gettempdir())
+    return directory / f"{settings.app_name}-ratelimit"
+
+
+# Limiter used by the rate limit middleware
+rate_limiter: SharedMemoryRateLimiter | DatabaseRateLimiter = (
+    DatabaseRateLimiter()
+    if settings.rate_limit_backend == "database"
+    else SharedMemoryRateLimiter(_shm_path(), settings.rate_limit_slots)
+)
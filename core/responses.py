@@ -0,0 +1,210 @@
+"""Fast JSON responses and response-model routing.
+
+This module provides:
+- FastJSONResponse: JSONResponse that renders with Pydantic's Rust serializer
+- ModelResponseRoute: APIRoute that skips response_model revalidation when
+  the handler already returns an instance of the declared model
+- StreamingListResponse: list response streamed from a database cursor
+
+Usage:
+    app = FastAPI(default_response_class=FastJSONResponse)
+    router = APIRouter(route_class=ModelResponseRoute)
+"""
+
+import functools
+import inspect
+from collections.abc import AsyncIterator, Callable, Mapping
+from typing import Any, Literal
+
+import pydantic_core
+from fastapi import Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.routing import APIRoute
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncResult, AsyncScalarResult
+from starlette.concurrency import run_in_threadpool
+
+# Route options that change how the model is dumped; the shortcut only
+# applies when none of them are used.
+_DUMP_OPTIONS = (
+    "response_model_include",
+    "response_model_exclude",
+    "response_model_exclude_unset",
+    "response_model_exclude_defaults",
+    "response_model_exclude_none",
+)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered straight to bytes by pydantic-core.
+
+    Accepts anything FastAPI passes to a response class (dicts, lists,
+    jsonable values) as well as Pydantic models, which are serialized
+    without an intermediate dict.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.__pydantic_serializer__.to_json(content, by_alias=True)
+        return pydantic_core.to_json(content)
+
+
+class ModelResponseRoute(APIRoute):
+    """Route class that trusts handlers returning the declared response model.
+
+    FastAPI normally dumps the returned model to a dict, validates it again
+    against response_model and then serializes the result. When the handler
+    returns an instance of exactly the response_model class, that model was
+    already validated on construction, so it is dumped straight to JSON bytes.
+    Any other return value (dicts, ORM objects, subclasses) takes the regular
+    validating path.
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any) -> None:
+        response_model = kwargs.get("response_model")
+        if (
+            inspect.isclass(response_model)
+            and issubclass(response_model, BaseModel)
+            and not any(kwargs.get(option) for option in _DUMP_OPTIONS)
+            and kwargs.get("response_model_by_alias", True)
+            # include_router() re-creates routes from already-wrapped endpoints
+            and not hasattr(endpoint, "__declared_model__")
+        ):
+            endpoint = _dump_declared_model(
+                endpoint, response_model, kwargs.get("status_code")
+            )
+        super().__init__(path, endpoint, **kwargs)
+
+
+def _dump_declared_model(
+    endpoint: Callable[..., Any],
+    response_model: type[BaseModel],
+    status_code: int | None,
+) -> Callable[..., Any]:
+    """Wrap an endpoint so declared-model results bypass revalidation."""
+    signature = inspect.signature(endpoint, eval_str=True)
+    is_coroutine = inspect.iscoroutinefunction(endpoint)
+
+    @functools.wraps(endpoint)
+    async def wrapper(*args: Any, _sub_response: Response, **kwargs: Any) -> Any:
+        if is_coroutine:
+            result = await endpoint(*args, **kwargs)
+        else:
+            result = await run_in_threadpool(endpoint, *args, **kwargs)
+
+        if type(result) is not response_model:
+            return result
+
+        # Mirror what FastAPI does for returned values: status code from the
+        # injected Response (if the handler set one) or the route default,
+        # plus any headers/cookies set on it.
+        response = FastJSONResponse(
+            result, status_code=_sub_response.status_code or status_code or 200
+        )
+        response.headers.raw.extend(
+            (name, value)
+            for name, value in _sub_response.headers.raw
+            if name != b"content-length"
+        )
+        return response
+
+    wrapper.__signature__ = signature.replace(  # type: ignore[attr-defined]
+        parameters=[
+            *signature.parameters.values(),
+            inspect.Parameter(
+                "_sub_response",
+                inspect.Parameter.KEYWORD_ONLY,
+                annotation=Response,
+            ),
+        ]
+    )
+    wrapper.__declared_model__ = response_model  # type: ignore[attr-defined]
+    return wrapper
+
+
+@functools.cache
+def _list_adapter(item_model: type[BaseModel]) -> TypeAdapter[list[Any]]:
+    return TypeAdapter(list[item_model])  # type: ignore[valid-type]
+
+
+class StreamingListResponse(StreamingResponse):
+    """List response streamed batch by batch from a server-side cursor.
+
+    Rows are fetched `batch_size` at a time from the result of
+    `AsyncSession.stream()`. Each batch is validated into `item_model` and
+    serialized to bytes in one pydantic-core call, then sent before the
+    next batch is fetched, so memory use does not grow with the result size.
+
+    Formats:
+    - "json": `{"items": [...], "meta": {"count": n, ...}}`, with `meta`
+      sent after the items (so it can carry the count)
+    - "ndjson": one item per line (`application/x-ndjson`)
+
+    The session must stay open while the body is sent. Sessions from
+    db.database.get_db do: dependencies with yield are closed after the
+    response has been sent.
+
+    Example:
+        @router.get("/users/export")
+        async def export_users(
+            request: Request, db: Annotated[AsyncSession, Depends(get_db)]
+        ):
+            result = await db.stream(
+                select(User).execution_options(yield_per=1000)
+            )
+            ndjson = "application/x-ndjson" in request.headers.get("accept", "")
+            return StreamingListResponse(
+                result.scalars(),
+                UserPublic,
+                format="ndjson" if ndjson else "json",
+            )
+    """
+
+    def __init__(
+        self,
+        rows: AsyncResult[Any] | AsyncScalarResult[Any],
+        item_model: type[BaseModel],
+        *,
+        format: Literal["json", "ndjson"] = "json",
+        meta: Mapping[str, Any] | None = None,
+        batch_size: int = 1000,
+        status_code: int = 200,
+        headers: Mapping[str, str] | None = None,
+    ) -> None:
+        self.rows = rows
+        self.item_model = item_model
+        self.meta = dict(meta or {})
+        self.batch_size = batch_size
+        self.count = 0
+        if format == "ndjson":
+            body, media_type = self._ndjson(), "application/x-ndjson"
+        else:
+            body, media_type = self._json(), "application/json"
+        super().__init__(
+            body, status_code=status_code, headers=headers, media_type=media_type
+        )
+
+    async def _batches(self) -> AsyncIterator[list[BaseModel]]:
+        adapter = _list_adapter(self.item_model)
+        async for partition in self.rows.partitions(self.batch_size):
+            items = adapter.validate_python(partition, from_attributes=True)
+            self.count += len(items)
+            yield items
+
+    async def _json(self) -> AsyncIterator[bytes]:
+        adapter = _list_adapter(self.item_model)
+        separator = b""
+        yield b'{"items":['
+        async for items in self._batches():
+            # Strip the brackets: batches are joined into one array
+            yield separator + adapter.dump_json(items, by_alias=True)[1:-1]
+            separator = b","
+        meta = pydantic_core.to_json({"count": self.count, **self.meta})
+        yield b'],"meta":' + meta + b"}"
+
+    async def _ndjson(self) -> AsyncIterator[bytes]:
+        async for items in self._batches():
+            yield b"".join(
+                item.__pydantic_serializer__.to_json(item, by_alias=True) + b"\n"
+                for item in items
+            )
@@ -92,6 +92,9 @@ class ListResponse(BaseModel, Generic[T]):
                 )
             )
 
+    For exports too large to hold in memory, stream the rows instead with
+    core.responses.StreamingListResponse.
+
     Attributes:
         items: List of items for the current page.
         meta: Pagination metadata.
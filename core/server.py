@@ -0,0 +1,345 @@
+"""Preload-and-fork server launcher.
+
+`uvicorn --workers N` starts N interpreters that each import the whole
+application. This launcher imports `main:app` once, freezes the imported
+objects out of the garbage collector (gc.freeze) and then forks the workers,
+so module code, settings and other import-time state are shared
+copy-on-write between them instead of being duplicated per worker.
+
+The parent process only supervises: it replaces workers that exit and
+forwards SIGTERM/SIGINT for a graceful shutdown and SIGUSR1 for a drain
+(see core.drain). Workers can be recycled
+(graceful restart) after settings.worker_max_requests requests or once their
+RSS exceeds settings.worker_max_rss_mb.
+
+Workers share their metrics through files in a shared-memory directory
+(core.metrics multiprocess mode), so /metrics covers all of them.
+
+Unless set explicitly, the worker count, threadpool size and database pool
+are derived from the container's cgroup CPU quota and memory limit (see
+core.sizing). uvloop and httptools are required by default; the chosen
+configuration is logged at startup.
+
+Usage:
+    python -m core.server
+    python -m core.server --workers 8 --port 8080
+"""
+
+import argparse
+import contextlib
+import gc
+import importlib.util
+import os
+import random
+import resource
+import signal
+import socket
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+import uvicorn
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from core.logging import get_logger, restart_logging, shutdown_logging
+from core.metrics import enable_multiprocess, registry
+from core.sizing import detect_limits, plan_server
+from settings import settings
+
+logger = get_logger(__name__)
+
+# Requests between RSS checks when worker_max_rss_mb is set
+RSS_CHECK_INTERVAL = 100
+
+# A worker exiting sooner than this after starting counts as a crash loop
+MIN_WORKER_LIFETIME = 1.0
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process in MiB."""
+    try:
+        with open("/proc/self/statm", "rb") as statm:
+            pages = int(statm.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except OSError:
+        # No procfs (macOS): fall back to the peak RSS (reported in bytes)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024)
+
+
+class RecyclingMiddleware:
+    """Ask the worker's server to exit gracefully once it should be recycled.
+
+    Setting `should_exit` makes uvicorn stop accepting connections, finish
+    in-flight requests and run the lifespan shutdown; the parent then forks a
+    replacement.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        server: uvicorn.Server,
+        max_requests: int,
+        max_rss_mb: int,
+    ) -> None:
+        self.app = app
+        self.server = server
+        self.max_requests = max_requests
+        self.max_rss_mb = max_rss_mb
+        self.requests = 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        self.requests += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self._check()
+
+    def _check(self) -> None:
+        if self.server.should_exit:
+            return
+        if self.max_requests and self.requests >= self.max_requests:
+            logger.info(
+                "Recycling worker", reason="max_requests", requests=self.requests
+            )
+            self.server.should_exit = True
+        elif (
+            self.max_rss_mb
+            and self.requests % RSS_CHECK_INTERVAL == 0
+            and (rss := current_rss_mb()) > self.max_rss_mb
+        ):
+            logger.info("Recycling worker", reason="max_rss", rss_mb=round(rss, 1))
+            self.server.should_exit = True
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    """Create the listening socket shared by all workers."""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app: Any, sock: socket.socket, uvicorn_options: dict[str, Any]) -> None:
+    """Serve requests in a forked worker until it exits or is recycled."""
+    # Handlers installed by the parent must not run in the worker
+    for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+        signal.signal(sig, signal.SIG_DFL)
+    # Until the lifespan installs the drain handler, a drain signal must not
+    # kill the worker (SIGUSR1 terminates by default)
+    signal.signal(signal.SIGUSR1, signal.SIG_IGN)
+    random.seed()
+    restart_logging()
+
+    config = uvicorn.Config(app, log_config=None, **uvicorn_options)
+    server = uvicorn.Server(config)
+    max_requests = settings.worker_max_requests
+    if max_requests and settings.worker_max_requests_jitter:
+        # Spread restarts so workers do not recycle at the same moment
+        max_requests += random.randint(0, settings.worker_max_requests_jitter)
+    if max_requests or settings.worker_max_rss_mb:
+        config.app = RecyclingMiddleware(
+            app, server, max_requests, settings.worker_max_rss_mb
+        )
+    server.run(sockets=[sock])
+
+
+class Supervisor:
+    """Fork workers from the preloaded parent and keep them running."""
+
+    def __init__(
+        self,
+        app: Any,
+        sock: socket.socket,
+        workers: int,
+        uvicorn_options: dict[str, Any],
+    ) -> None:
+        self.app = app
+        self.sock = sock
+        self.workers = workers
+        self.uvicorn_options = uvicorn_options
+        self.children: dict[int, float] = {}
+        self.stopping = False
+
+    def spawn(self) -> None:
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 0
+            try:
+                run_worker(self.app, self.sock, self.uvicorn_options)
+            except BaseException:
+                logger.exception("Worker crashed")
+                exit_code = 1
+            finally:
+                shutdown_logging()
+                os._exit(exit_code)
+        self.children[pid] = time.monotonic()
+
+    def stop(self, signum: int, frame: object) -> None:
+        """Forward SIGTERM/SIGINT (shutdown) or SIGUSR1 (drain) to workers.
+
+        Either way workers are not replaced once they exit.
+        """
+        self.stopping = True
+        forwarded = signal.SIGUSR1 if signum == signal.SIGUSR1 else signal.SIGTERM
+        for pid in self.children:
+            with contextlib.suppress(ProcessLookupError):
+                os.kill(pid, forwarded)
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGUSR1, self.stop)
+
+        for _ in range(self.workers):
+            self.spawn()
+        logger.info("Workers started", workers=self.workers, pid=os.getpid())
+
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            started = self.children.pop(pid, None)
+            if started is not None:
+                registry.archive_worker(pid)
+            if started is None or self.stopping:
+                continue
+
+            logger.info(
+                "Worker exited, starting a replacement",
+                pid=pid,
+                exit_code=os.waitstatus_to_exitcode(status),
+            )
+            if time.monotonic() - started < MIN_WORKER_LIFETIME:
+                # Crash loop (e.g. database unreachable): do not spin
+                time.sleep(MIN_WORKER_LIFETIME)
+            if not self.stopping:
+                self.spawn()
+
+        logger.info("All workers stopped")
+
+
+def metrics_dir() -> Path:
+    """Directory of the workers' metric files (see core.metrics)."""
+    if settings.metrics_shm_path:
+        return Path(settings.metrics_shm_path)
+    directory = Path("/dev/shm")
+    if not directory.is_dir():
+        directory = Path(tempfile.gettempdir())
+    return directory / f"{settings.app_name}-metrics"
+
+
+def require_implementations(loop: str, http: str) -> None:
+    """Fail fast when the configured event loop / HTTP parser is missing."""
+    missing = [
+        name
+        for name in (loop, http)
+        if name not in ("asyncio", "h11") and importlib.util.find_spec(name) is None
+    ]
+    if missing:
+        raise SystemExit(
+            f"Not installed: {', '.join(missing)}. Install uvicorn[standard] "
+            "or set SERVER_LOOP=asyncio / SERVER_HTTP=h11."
+        )
+
+
+def require_forwarded_allow_ips() -> None:
+    """Fail fast when rate limits would key on the proxy's address.
+
+    Rules count anonymous requests per client IP. Behind a reverse proxy
+    that is the proxy's IP unless FORWARDED_ALLOW_IPS trusts it, and a
+    per-client limit becomes one limit shared by everyone.
+    """
+    if (
+        settings.rate_limit_enabled
+        and settings.rate_limit_rules
+        and "forwarded_allow_ips" not in settings.model_fields_set
+    ):
+        raise SystemExit(
+            "RATE_LIMIT_RULES limit clients by IP, but FORWARDED_ALLOW_IPS is "
+            "not set. Set it to the reverse proxy's addresses (or 127.0.0.1 "
+            "when clients connect directly), or set RATE_LIMIT_ENABLED=false."
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Preload the app and fork workers")
+    parser.add_argument("--host", default=settings.host)
+    parser.add_argument("--port", type=int, default=settings.port)
+    parser.add_argument(
+        "--workers", type=int, default=settings.workers, help="0 = one per CPU"
+    )
+    args = parser.parse_args()
+
+    require_implementations(settings.server_loop, settings.server_http)
+    require_forwarded_allow_ips()
+
+    limits = detect_limits()
+    settings.workers = args.workers
+    plan = plan_server(limits, settings)
+
+    # Applied before importing the app: the lifespan and the database engine
+    # read these, and forked workers inherit them
+    settings.threadpool_size = plan.threadpool_size
+    settings.db_pool_size = plan.db_pool_size
+    settings.db_max_overflow = plan.db_max_overflow
+
+    from main import app
+
+    logger.info(
+        "Server configuration",
+        limits_source=limits.source,
+        cpu_limit=round(limits.cpus, 2),
+        memory_limit_mb=(
+            limits.memory_bytes // (1024 * 1024) if limits.memory_bytes else None
+        ),
+        workers=plan.workers,
+        threadpool_size=plan.threadpool_size,
+        db_pool_size=plan.db_pool_size,
+        db_max_overflow=plan.db_max_overflow,
+        loop=settings.server_loop,
+        http=settings.server_http,
+    )
+
+    sock = bind_socket(args.host, args.port)
+
+    # Workers publish their metrics to shared files, so /metrics reports all
+    # of them whichever worker takes the scrape
+    enable_multiprocess(metrics_dir())
+
+    # Flush and stop logging threads: threads do not survive fork()
+    shutdown_logging()
+
+    # Move everything allocated so far into a permanent generation, so the
+    # collector never touches (and un-shares) those pages in the workers
+    gc.collect()
+    gc.freeze()
+
+    Supervisor(
+        app,
+        sock,
+        workers=plan.workers,
+        uvicorn_options={
+            "loop": settings.server_loop,
+            "http": settings.server_http,
+            "proxy_headers": True,
+            "forwarded_allow_ips": settings.forwarded_allow_ips,
+            "timeout_graceful_shutdown": settings.drain_timeout,
+        },
+    ).run()
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Single-flight execution of identical concurrent GET requests.
+
+When several requests for the same resource arrive while one is already
+being handled, the later ones wait for the first (the leader) and receive a
+copy of its response bytes instead of running the handler again.
+
+Requests are identical when method, path, query string and Authorization
+header match, so callers only ever share responses produced for their own
+credentials. Collapsing is per worker and opt-in through
+settings.single_flight_paths; without paths the middleware is not added.
+"""
+
+import asyncio
+import hashlib
+from dataclasses import dataclass
+
+from fastapi import Request, Response
+
+from core.metrics import counter, histogram
+from settings import settings
+
+single_flight_requests_total = counter(
+    "single_flight_requests",
+    "Requests on single-flight paths by role",
+    ["outcome"],
+)
+single_flight_wait_seconds = histogram(
+    "single_flight_wait_seconds", "Time collapsed requests waited for the leader"
+)
+
+# Response headers that describe one delivery, not the shared result
+_VOLATILE_HEADERS = {b"content-length", b"date", b"x-process-time", b"x-request-id"}
+
+
+@dataclass(frozen=True)
+class SharedResponse:
+    """Leader response handed to collapsed requests.
+
+    Attributes:
+        status_code: HTTP status code.
+        headers: Raw response headers.
+        body: Response body bytes.
+        state: Leader's request.state values (e.g. the etag_version ETag).
+    """
+
+    status_code: int
+    headers: list[tuple[bytes, bytes]]
+    body: bytes
+    state: dict[str, object]
+
+    def to_response(self) -> Response:
+        """Build a fresh response carrying the shared bytes."""
+        response = Response(content=self.body, status_code=self.status_code)
+        response.raw_headers = [
+            *self.headers,
+            (b"content-length", str(len(self.body)).encode()),
+        ]
+        return response
+
+
+class SingleFlight:
+    """Registry of in-flight leader executions for this worker."""
+
+    def __init__(self) -> None:
+        self._flights: dict[str, asyncio.Future[SharedResponse | None]] = {}
+
+    @staticmethod
+    def flight_key(request: Request) -> str:
+        """Identify a request by method, path, query and credentials."""
+        scoped = "\n".join(
+            (
+                request.method,
+                request.url.path,
+                request.url.query,
+                request.headers.get("authorization", ""),
+            )
+        )
+        return hashlib.sha256(scoped.encode()).hexdigest()
+
+    def join(self, key: str) -> asyncio.Future[SharedResponse | None] | None:
+        """Return the leader's future, or None if the caller is now the leader."""
+        future = self._flights.get(key)
+        if future is None:
+            self._flights[key] = asyncio.get_running_loop().create_future()
+        return future
+
+    def finish(self, key: str, shared: SharedResponse | None) -> None:
+        """Publish the leader's response (None makes waiters run themselves)."""
+        future = self._flights.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(shared)
+
+    @staticmethod
+    def share(request: Request, response: Response, body: bytes) -> SharedResponse:
+        """Capture a leader response for fan-out."""
+        return SharedResponse(
+            status_code=response.status_code,
+            headers=[
+                (name, value)
+                for name, value in response.raw_headers
+                if name not in _VOLATILE_HEADERS
+            ],
+            body=body,
+            state=dict(request.scope.get("state", {})),
+        )
+
+
+def is_single_flight_path(path: str) -> bool:
+    """Check a path against settings.single_flight_paths ("*" suffix = prefix)."""
+    for pattern in settings.single_flight_paths:
+        if pattern.endswith("*"):
+            if path.startswith(pattern[:-1]):
+                return True
+        elif path == pattern:
+            return True
+    return False
+
+
+# Per-worker registry used by the single-flight middleware
+single_flight = SingleFlight()
@@ -0,0 +1,172 @@
+"""Container-aware sizing of workers, thread pools and database pools.
+
+Containers usually see every CPU and all memory of the host through
+os.cpu_count() and /proc/meminfo, while the cgroup only lets them use a
+fraction of it. This module reads the effective CPU quota and memory limit
+(cgroup v2, falling back to v1) and derives:
+
+- workers: one per CPU of quota, capped by memory / settings.worker_memory_mb
+- threadpool_size: threads per worker for sync endpoints and blocking calls
+- db_pool_size: per-worker share of the instance's connection budget
+
+Explicit settings (WORKERS, THREADPOOL_SIZE, DB_POOL_SIZE) always win.
+"""
+
+import math
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+from settings import Settings
+
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+
+# v1 reports "no limit" as a huge page-aligned number
+_V1_UNLIMITED = 1 << 60
+
+# Threads per CPU available to a worker, and the bounds applied
+THREADS_PER_CPU = 16
+MIN_THREADS = 4
+MAX_THREADS = 40
+
+# Connections per CPU when no DB_CONNECTION_BUDGET is set
+CONNECTIONS_PER_CPU = 10
+
+
+@dataclass(frozen=True)
+class ContainerLimits:
+    """Resources available to this process.
+
+    Attributes:
+        cpus: CPU quota (may be fractional), or the usable CPU count.
+        memory_bytes: Memory limit, or None when unlimited.
+        source: Where the limits came from ("cgroup2", "cgroup1" or "host").
+    """
+
+    cpus: float
+    memory_bytes: int | None
+    source: str
+
+
+@dataclass(frozen=True)
+class ServerPlan:
+    """Configuration chosen for the launcher.
+
+    Attributes:
+        workers: Worker processes to fork.
+        threadpool_size: Threadpool size per worker.
+        db_pool_size: Database connections kept per worker.
+        db_max_overflow: Extra connections a worker may open under load.
+    """
+
+    workers: int
+    threadpool_size: int
+    db_pool_size: int
+    db_max_overflow: int
+
+
+def _read(path: Path) -> str | None:
+    try:
+        return path.read_text().strip()
+    except OSError:
+        return None
+
+
+def _cgroup_dirs(root: Path, controller: str | None) -> list[Path]:
+    """Candidate directories for a controller: own cgroup first, then root.
+
+    With a private cgroup namespace (the Docker default) the container's
+    cgroup is mounted at the root; otherwise it is at the path listed in
+    /proc/self/cgroup.
+    """
+    dirs = []
+    for line in (_read(Path("/proc/self/cgroup")) or "").splitlines():
+        _, controllers, path = line.split(":", 2)
+        names = controllers.split(",") if controllers else []
+        if (controller is None and not names) or controller in names:
+            base = root / controller if controller else root
+            dirs.append(base / path.lstrip("/"))
+    dirs.append(root / controller if controller else root)
+    return dirs
+
+
+def _usable_cpus() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        # Not available on macOS
+        return os.cpu_count() or 1
+
+
+def detect_limits(root: Path = CGROUP_ROOT) -> ContainerLimits:
+    """Read the CPU quota and memory limit of this process's cgroup."""
+    cpus = float(_usable_cpus())
+
+    if (root / "cgroup.controllers").exists():
+        memory = None
+        for directory in _cgroup_dirs(root, None):
+            cpu_max = _read(directory / "cpu.max")
+            memory_max = _read(directory / "memory.max")
+            if cpu_max is None and memory_max is None:
+                continue
+            if cpu_max:
+                quota, _, period = cpu_max.partition(" ")
+                if quota != "max":
+                    cpus = min(cpus, int(quota) / int(period or 100_000))
+            if memory_max and memory_max != "max":
+                memory = int(memory_max)
+            break
+        return ContainerLimits(cpus=cpus, memory_bytes=memory, source="cgroup2")
+
+    if (root / "cpu").exists() or (root / "memory").exists():
+        for directory in _cgroup_dirs(root, "cpu"):
+            cfs_quota = _read(directory / "cpu.cfs_quota_us")
+            cfs_period = _read(directory / "cpu.cfs_period_us")
+            if cfs_quota is None or cfs_period is None:
+                continue
+            if int(cfs_quota) > 0:
+                cpus = min(cpus, int(cfs_quota) / int(cfs_period))
+            break
+        memory = None
+        for directory in _cgroup_dirs(root, "memory"):
+            limit = _read(directory / "memory.limit_in_bytes")
+            if limit is None:
+                continue
+            if int(limit) < _V1_UNLIMITED:
+                memory = int(limit)
+            break
+        return ContainerLimits(cpus=cpus, memory_bytes=memory, source="cgroup1")
+
+    return ContainerLimits(cpus=cpus, memory_bytes=None, source="host")
+
+
+def plan_server(limits: ContainerLimits, settings: Settings) -> ServerPlan:
+    """Derive worker, thread and connection counts from container limits."""
+    workers = settings.workers
+    if not workers:
+        workers = max(1, math.ceil(limits.cpus))
+        if limits.memory_bytes is not None:
+            fits = limits.memory_bytes // (settings.worker_memory_mb * 1024 * 1024)
+            workers = max(1, min(workers, fits))
+
+    threadpool_size = settings.threadpool_size
+    if not threadpool_size:
+        threads = math.ceil(THREADS_PER_CPU * limits.cpus / workers)
+        threadpool_size = min(MAX_THREADS, max(MIN_THREADS, threads))
+
+    db_pool_size = settings.db_pool_size
+    db_max_overflow = settings.db_max_overflow
+    if not db_pool_size:
+        budget = settings.db_connection_budget or math.ceil(
+            CONNECTIONS_PER_CPU * limits.cpus
+        )
+        # Keep the whole instance within the budget: no overflow
+        db_pool_size = max(1, budget // workers)
+        db_max_overflow = 0
+
+    return ServerPlan(
+        workers=workers,
+        threadpool_size=threadpool_size,
+        db_pool_size=db_pool_size,
+        db_max_overflow=db_max_overflow,
+    )
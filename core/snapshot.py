@@ -0,0 +1,214 @@
+"""Snapshot of warmed in-process caches, kept across restarts.
+
+A fresh container starts with empty caches, so the first requests after a
+deploy all fetch the same upstream data (e.g. the Cognito JWKS). With
+settings.cache_snapshot_path set, the lifespan restores registered caches
+from that file on startup, before warmup, so a new container (sharing the
+file through a volume) starts warm. The file is written once warmup is done,
+then every settings.cache_snapshot_interval seconds and on shutdown, so a
+worker that is killed rather than stopped still leaves a recent snapshot.
+
+Only non-secret data belongs in a snapshot: public keys and lookups, never
+tokens, credentials or per-user responses.
+
+File layout: a fixed header (magic, format version, payload length, write
+time, SHA-256 of the payload) followed by a JSON payload mapping each cache
+name to {"expires_at": <unix time>, "value": ...}. The file is replaced
+atomically (written to a temporary file, fsynced, renamed), memory-mapped
+on load and ignored unless the header and checksum match. Entries past
+their expiry are skipped.
+
+Usage:
+    from core.snapshot import register_snapshot
+
+    register_snapshot("jwks", dump=dump_jwks, load=load_jwks)
+    # dump() -> (value, expires_at) or None; load(value, expires_at)
+
+    # In the application lifespan
+    snapshot_writer.start(path, interval=300)
+    ...
+    await snapshot_writer.stop()  # writes a final snapshot
+"""
+
+import asyncio
+import contextlib
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from pydantic_core import from_json, to_json
+
+from core.logging import get_logger
+
+logger = get_logger(__name__)
+
+MAGIC = b"PXSNAP01"
+FORMAT_VERSION = 1
+# magic, format version, payload length, written at (unix time), sha256
+_HEADER = struct.Struct("<8sIQd32s")
+
+
+@dataclass(frozen=True)
+class SnapshotSection:
+    """A cache taking part in snapshots.
+
+    Attributes:
+        dump: Returns (JSON-serializable value, expires_at) or None if empty.
+        load: Restores a value produced by dump(), with its expiry.
+    """
+
+    dump: Callable[[], tuple[Any, float] | None]
+    load: Callable[[Any, float], None]
+
+
+_sections: dict[str, SnapshotSection] = {}
+
+
+def register_snapshot(
+    name: str,
+    dump: Callable[[], tuple[Any, float] | None],
+    load: Callable[[Any, float], None],
+) -> None:
+    """Include a cache in snapshots under `name`."""
+    _sections[name] = SnapshotSection(dump=dump, load=load)
+
+
+def save_snapshot(path: str | Path) -> int:
+    """Write all registered, unexpired caches to `path` atomically.
+
+    Returns:
+        Number of caches written.
+    """
+    path = Path(path)
+    now = time.time()
+    entries = {}
+    for name, section in _sections.items():
+        dumped = section.dump()
+        if dumped is None:
+            continue
+        value, expires_at = dumped
+        if expires_at > now:
+            entries[name] = {"expires_at": expires_at, "value": value}
+
+    payload = to_json(entries)
+    header = _HEADER.pack(
+        MAGIC, FORMAT_VERSION, len(payload), now, hashlib.sha256(payload).digest()
+    )
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            tmp.write(header)
+            tmp.write(payload)
+            tmp.flush()
+            os.fsync(tmp.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+    return len(entries)
+
+
+def _read_entries(path: Path) -> dict[str, Any] | None:
+    """Map the file and return its entries, or None if it is not valid."""
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < _HEADER.size:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            magic, version, length, _, digest = _HEADER.unpack_from(mapped)
+            if magic != MAGIC or version != FORMAT_VERSION:
+                return None
+            if _HEADER.size + length != size:
+                return None
+            payload = mapped[_HEADER.size :]
+            if hashlib.sha256(payload).digest() != digest:
+                return None
+            entries = from_json(payload)
+    return entries if isinstance(entries, dict) else None
+
+
+def restore_snapshot(path: str | Path) -> int:
+    """Restore registered caches from `path`, skipping expired entries.
+
+    A missing, truncated or corrupt file is ignored (logged) rather than
+    failing startup.
+
+    Returns:
+        Number of caches restored.
+    """
+    path = Path(path)
+    try:
+        entries = _read_entries(path)
+    except FileNotFoundError:
+        return 0
+    except (OSError, ValueError):
+        logger.warning("Cache snapshot unreadable", path=str(path), exc_info=True)
+        return 0
+    if entries is None:
+        logger.warning("Cache snapshot invalid, ignoring", path=str(path))
+        return 0
+
+    now = time.time()
+    restored = 0
+    for name, entry in entries.items():
+        section = _sections.get(name)
+        if section is None or entry.get("expires_at", 0) <= now:
+            continue
+        try:
+            section.load(entry["value"], entry["expires_at"])
+        except Exception:
+            logger.warning("Cache snapshot entry rejected", cache=name, exc_info=True)
+            continue
+        restored += 1
+    return restored
+
+
+class SnapshotWriter:
+    """Background task writing the snapshot periodically."""
+
+    def __init__(self) -> None:
+        self._task: asyncio.Task[None] | None = None
+        self._path: Path | None = None
+
+    def start(self, path: str | Path, interval: float) -> None:
+        """Write a snapshot now and then every `interval` seconds."""
+        if self._task is not None:
+            return
+        self._path = Path(path)
+        self._task = asyncio.create_task(self._run(self._path, interval))
+
+    async def stop(self) -> None:
+        """Stop the periodic writes and write a final snapshot."""
+        if self._task is None or self._path is None:
+            return
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+        await self._write(self._path)
+
+    async def _run(self, path: Path, interval: float) -> None:
+        while True:
+            await self._write(path)
+            await asyncio.sleep(interval)
+
+    async def _write(self, path: Path) -> None:
+        try:
+            # The file is fsynced: keep that off the event loop
+            saved = await asyncio.to_thread(save_snapshot, path)
+        except OSError:
+            logger.warning("Failed to save cache snapshot", exc_info=True)
+            return
+        logger.debug("Cache snapshot saved", caches=saved)
+
+
+snapshot_writer = SnapshotWriter()
@@ -0,0 +1,95 @@
+"""Startup warmup and readiness state.
+
+Without warmup, the first requests a worker serves pay for filling the
+database pool, fetching the JWKS, building the Cognito client and FastAPI's
+first-call setup (middleware stack build, dependency analysis caches). The
+lifespan runs the warmup tasks concurrently before the worker starts
+accepting connections, and only then marks the worker ready.
+
+GET /ready reports the readiness state (see features.health.routes); it
+stays 503 until warmup has finished.
+
+Warmup is best effort: a failing or slow task is logged and skipped, it
+never prevents the worker from starting.
+"""
+
+import asyncio
+import time
+from collections.abc import Awaitable, Callable, Sequence
+from typing import Any
+
+from core.logging import get_logger
+from core.metrics import gauge
+
+logger = get_logger(__name__)
+
+warmup_duration_seconds = gauge(
+    "warmup_duration_seconds", "Time the last startup warmup took", aggregate="max"
+)
+ready_gauge = gauge("ready", "1 when this worker reports ready")
+
+
+class Readiness:
+    """Whether this worker should receive traffic."""
+
+    def __init__(self) -> None:
+        self.ready = False
+        self.reason = "starting"
+
+    def set_ready(self) -> None:
+        self.ready = True
+        self.reason = "ready"
+        ready_gauge.set(1)
+
+    def set_not_ready(self, reason: str) -> None:
+        self.ready = False
+        self.reason = reason
+        ready_gauge.set(0)
+
+
+async def _timed(name: str, task: Callable[[], Awaitable[Any]]) -> None:
+    started = time.perf_counter()
+    try:
+        await task()
+    except Exception as e:
+        logger.warning("Warmup task failed", task=name, error=repr(e))
+        return
+    logger.debug(
+        "Warmup task done",
+        task=name,
+        duration_ms=round((time.perf_counter() - started) * 1000, 1),
+    )
+
+
+async def run_warmup(
+    tasks: dict[str, Callable[[], Awaitable[Any]]], timeout: float
+) -> None:
+    """Run warmup tasks concurrently, bounded by `timeout` seconds overall."""
+    started = time.perf_counter()
+    pending = [asyncio.create_task(_timed(name, task)) for name, task in tasks.items()]
+    done, not_done = await asyncio.wait(pending, timeout=timeout)
+    for task in not_done:
+        task.cancel()
+    if not_done:
+        logger.warning("Warmup timed out", timeout=timeout, unfinished=len(not_done))
+
+    duration = time.perf_counter() - started
+    warmup_duration_seconds.set(duration)
+    logger.info("Warmup complete", duration_ms=round(duration * 1000, 1))
+
+
+async def warm_routes(app: Any, paths: Sequence[str]) -> None:
+    """Send synthetic GET requests through the full ASGI stack."""
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport,
+        base_url="http://warmup",
+        headers={"user-agent": "warmup"},
+    ) as client:
+        await asyncio.gather(*(client.get(path) for path in paths))
+
+
+# Readiness of this worker, reported by GET /ready
+readiness = Readiness()
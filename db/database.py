@@ -3,18 +3,29 @@
 Uses SQLAlchemy 2.0 async API with connection pooling.
 """
 
+import asyncio
 from collections.abc import AsyncGenerator
 from datetime import datetime
 from typing import Annotated
 
-from sqlalchemy import MetaData, func, text
+from sqlalchemy import Connection, MetaData, event, func, text
 from sqlalchemy.ext.asyncio import (
+    AsyncConnection,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
-from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+from sqlalchemy.orm import (
+    DeclarativeBase,
+    Mapped,
+    Session,
+    SessionTransaction,
+    mapped_column,
+)
+from starlette.requests import Request
 
+from core.batch import batch_context
+from core.deadlines import remaining
 from settings import settings
 
 # Naming convention for database constraints
@@ -27,11 +38,20 @@ NAMING_CONVENTION = {
     "pk": "pk_%(table_name)s",
 }
 
+# Pool sizing (set per worker by core.server; SQLite uses its own pool class)
+pool_options: dict[str, int] = {}
+if settings.db_pool_size and not settings.database_url.startswith("sqlite"):
+    pool_options = {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+    }
+
 # Create async engine
 engine = create_async_engine(
     settings.database_url,
     echo=settings.debug,
     pool_pre_ping=True,
+    **pool_options,
 )
 
 # Create async session factory
@@ -42,6 +62,27 @@ async_session_factory = async_sessionmaker(
 )
 
 
+@event.listens_for(Session, "after_begin")
+def apply_statement_timeout(
+    session: Session, transaction: SessionTransaction, connection: Connection
+) -> None:
+    """Bound Postgres statements by the time left for the current request.
+
+    Runs once per transaction, only when the session actually touches the
+    database. SET LOCAL is scoped to the transaction, so pooled connections
+    are returned without the timeout.
+    """
+    if connection.dialect.name != "postgresql":
+        return
+
+    left = remaining()
+    if left is None:
+        return
+
+    timeout_ms = max(int(left * 1000), 1)
+    connection.exec_driver_sql(f"SET LOCAL statement_timeout = {timeout_ms}")
+
+
 class Base(DeclarativeBase):
     """Base class for all SQLAlchemy models.
 
@@ -90,7 +131,7 @@ class BaseModel(TimestampMixin, Base):
     id: Mapped[IntPK]
 
 
-async def get_db() -> AsyncGenerator[AsyncSession, None]:
+async def get_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
     """FastAPI dependency that provides a database session.
 
     Usage:
@@ -100,7 +141,14 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             return result.scalars().all()
 
     The session is automatically closed after the request completes.
+    Sub-requests of an atomic batch (core.batch) share the batch's session
+    instead; the batch commits or rolls it back as a whole.
     """
+    batch = batch_context(request.scope)
+    if batch is not None and batch.session is not None:
+        yield batch.session
+        return
+
     async with async_session_factory() as session:
         try:
             yield session
@@ -140,3 +188,21 @@ async def verify_database_connection() -> bool:
         return True
     except Exception:
         return False
+
+
+async def warm_database_pool(connections: int) -> None:
+    """Open `connections` pooled connections at once so requests reuse them.
+
+    Connections are checked out concurrently (so each one is new) and then
+    returned to the pool, which keeps up to its pool_size of them open.
+    """
+    results = await asyncio.gather(
+        *(engine.connect().start() for _ in range(connections)),
+        return_exceptions=True,
+    )
+    opened = [conn for conn in results if isinstance(conn, AsyncConnection)]
+    for conn in opened:
+        await conn.close()
+    errors = [error for error in results if isinstance(error, BaseException)]
+    if errors:
+        raise errors[0]
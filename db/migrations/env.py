@@ -42,6 +42,10 @@ if features_dir.exists():
             except ImportError as e:
                 print(f"Warning: Could not import {module_name}: {e}")
 
+# Core models not living in a feature
+importlib.import_module("core.idempotency")
+importlib.import_module("core.ratelimit")
+
 # Set target metadata for autogenerate support
 target_metadata = Base.metadata
 
@@ -0,0 +1,42 @@
+"""Add rate_limit_buckets table
+
+Revision ID: 5c1f3a9d2e47
+Revises: ebe707c0182a
+Create Date: 2026-10-19 04:20:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5c1f3a9d2e47"
+down_revision: str | None = "ebe707c0182a"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "rate_limit_buckets",
+        sa.Column("key", sa.BigInteger(), autoincrement=False, nullable=False),
+        sa.Column("timestamp", sa.Float(), nullable=False),
+        sa.Column("value", sa.Float(), nullable=False),
+        sa.Column("previous", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("key", name=op.f("pk_rate_limit_buckets")),
+    )
+    op.create_index(
+        op.f("ix_rate_limit_buckets_timestamp"),
+        "rate_limit_buckets",
+        ["timestamp"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        op.f("ix_rate_limit_buckets_timestamp"), table_name="rate_limit_buckets"
+    )
+    op.drop_table("rate_limit_buckets")
@@ -78,12 +78,22 @@ log_info "Starting $NEW_CONTAINER..."
 # Read database URL from environment or construct it
 DB_URL=${DATABASE_URL:-postgresql+asyncpg://postgres:${POSTGRES_PASSWORD:-postgres}@db:5432/paxx_test_app}
 
+# Traefik reaches the app over traefik-public: trust X-Forwarded-For from that
+# network, so rate limits see client IPs rather than Traefik's address
+if [ -z "$FORWARDED_ALLOW_IPS" ]; then
+    FORWARDED_ALLOW_IPS=$(docker network inspect traefik-public \
+        --format '{{range .IPAM.Config}}{{.Subnet}},{{end}}' | sed 's/,$//')
+fi
+
 docker run -d \
     --name "$NEW_CONTAINER" \
     --network traefik-public \
     --restart unless-stopped \
     -e "DATABASE_URL=$DB_URL" \
     -e "APP_ENV=${APP_ENV:-production}" \
+    -e "FORWARDED_ALLOW_IPS=$FORWARDED_ALLOW_IPS" \
+    -v paxx-cache:/app/cache \
+    -e "CACHE_SNAPSHOT_PATH=${CACHE_SNAPSHOT_PATH:-/app/cache/snapshot.bin}" \
     --label "traefik.enable=true" \
     --label "traefik.http.routers.${NEW_CONTAINER}.rule=PathPrefix(\`/\`)" \
     --label "traefik.http.routers.${NEW_CONTAINER}.entrypoints=web" \
@@ -91,7 +101,7 @@ docker run -d \
     --label "traefik.http.routers.${NEW_CONTAINER}-secure.entrypoints=websecure" \
     --label "traefik.http.routers.${NEW_CONTAINER}-secure.tls=true" \
     --label "traefik.http.services.${NEW_CONTAINER}.loadbalancer.server.port=8000" \
-    --label "traefik.http.services.${NEW_CONTAINER}.loadbalancer.healthcheck.path=/health" \
+    --label "traefik.http.services.${NEW_CONTAINER}.loadbalancer.healthcheck.path=/ready" \
     --label "traefik.http.services.${NEW_CONTAINER}.loadbalancer.healthcheck.interval=5s" \
     --label "traefik.http.services.${NEW_CONTAINER}.loadbalancer.healthcheck.timeout=3s" \
     "$IMAGE"
@@ -129,7 +139,12 @@ log_info "$NEW_CONTAINER is healthy!"
 
 # 6. Graceful shutdown of old container (if exists)
 if [ -n "$CURRENT_CONTAINER" ] && docker ps --format "{{.Names}}" | grep -q "^${OLD_CONTAINER}$"; then
-    log_info "Stopping $OLD_CONTAINER (graceful drain: ${DRAIN_TIMEOUT}s)..."
+    # SIGUSR1 starts a drain: /ready fails so Traefik stops routing to the
+    # old container, keep-alive connections are closed, in-flight requests
+    # finish, then the app stops itself (see core/drain.py)
+    log_info "Draining $OLD_CONTAINER (timeout: ${DRAIN_TIMEOUT}s)..."
+    docker kill --signal USR1 "$OLD_CONTAINER" 2>/dev/null || true
+    timeout "$DRAIN_TIMEOUT" docker wait "$OLD_CONTAINER" >/dev/null 2>&1 || true
     docker stop --time "$DRAIN_TIMEOUT" "$OLD_CONTAINER" 2>/dev/null || true
     docker rm "$OLD_CONTAINER" 2>/dev/null || true
     log_info "$OLD_CONTAINER removed"
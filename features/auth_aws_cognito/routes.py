@@ -1,8 +1,8 @@
 """AWS Cognito auth feature API routes."""
 
-from botocore.exceptions import ClientError
 from fastapi import APIRouter, Depends, HTTPException, status
 
+from core.responses import ModelResponseRoute
 from features.auth_aws_cognito.dependencies import get_current_user
 from features.auth_aws_cognito.schemas import (
     ChangePasswordRequest,
@@ -29,7 +29,7 @@ from features.auth_aws_cognito.schemas import (
 )
 from features.auth_aws_cognito.services import cognito_service
 
-router = APIRouter()
+router = APIRouter(route_class=ModelResponseRoute)
 
 
 @router.post("/register", response_model=RegisterResponse)
@@ -44,7 +44,7 @@ def register(request: RegisterRequest):
             message="Registration successful. Please check your email for verification code.",
             user_sub=response["UserSub"],
         )
-    except ClientError as e:
+    except cognito_service.client_error as e:
         error_code = e.response["Error"]["Code"]
         error_message = e.response["Error"]["Message"]
 
@@ -79,7 +79,7 @@ def confirm(request: ConfirmRequest):
     try:
         cognito_service.confirm_sign_up(request.email, request.code)
         return ConfirmResponse(message="Email confirmed successfully. You can now log in.")
-    except ClientError as e:
+    except cognito_service.client_error as e:
         error_code = e.response["Error"]["Code"]
 
         if error_code == "CodeMismatchException":
@@ -125,7 +125,7 @@ def resend_confirmation(request: ResendConfirmationRequest):
         return ResendConfirmationResponse(
             message="Verification code sent. Please check your email."
         )
-    except ClientError as e:
+    except cognito_service.client_error as e:
         error_code = e.response["Error"]["Code"]
 
         if error_code == "UserNotFoundException":
@@ -170,7 +170,7 @@ def login(request: LoginRequest):
             refresh_token=auth_result["RefreshToken"],
             expires_in=auth_result["ExpiresIn"],
         )
-    except ClientError as e:
+    except cognito_service.client_error as e:
         error_code = e.response["Error"]["Code"]
 
         if error_code == "NotAuthorizedException":
@@ -215,7 +215,7 @@ def refresh(request: RefreshRequest):
             id_token=auth_result["IdToken"],
             expires_in=auth_result["ExpiresIn"],
         )
-    except ClientError as e:
+    except cognito_service.client_error as e:
         error_code = e.response["Error"]["Code"]
 
         if error_code == "NotAuthorizedException":
@@ -249,7 +249,7 @@ def logout(request: LogoutRequest):
     try:
         cognito_service.global_sign_out(request.access_token)
         return LogoutResponse(message="Successfully logged out")
-    except ClientError as e:
+    except cognito_service.client_error as e:
         error_code = e.response["Error"]["Code"]
 
         if error_code == "NotAuthorizedException":
@@ -295,7 +295,7 @@ def forgot_password(request: ForgotPasswordRequest):
         return ForgotPasswordResponse(
             message="Password reset code sent. Please check your email."
         )
-    except ClientError as e:
+    except cognito_service.client_error as e:
         error_code = e.response["Error"]["Code"]
 
         if error_code == "UserNotFoundException":
@@ -338,7 +338,7 @@ def confirm_forgot_password(request: ConfirmForgotPasswordRequest):
         return ConfirmForgotPasswordResponse(
             message="Password reset successfully. You can now log in with your new password."
         )
-    except ClientError as e:
+    except cognito_service.client_error as e:
         error_code = e.response["Error"]["Code"]
         error_message = e.response["Error"]["Message"]
 
@@ -385,7 +385,7 @@ def change_password(request: ChangePasswordRequest):
             request.access_token, request.previous_password, request.new_password
         )
         return ChangePasswordResponse(message="Password changed successfully.")
-    except ClientError as e:
+    except cognito_service.client_error as e:
         error_code = e.response["Error"]["Code"]
         error_message = e.response["Error"]["Message"]
 
@@ -425,7 +425,7 @@ def delete_account(request: DeleteAccountRequest):
     try:
         cognito_service.delete_user(request.access_token)
         return DeleteAccountResponse(message="Account deleted successfully.")
-    except ClientError as e:
+    except cognito_service.client_error as e:
         error_code = e.response["Error"]["Code"]
 
         if error_code == "NotAuthorizedException":
@@ -1,24 +1,96 @@
 """AWS Cognito auth feature services - Cognito API operations."""
 
 import base64
+import contextlib
 import hashlib
 import hmac
+import threading
+from typing import Any
 
-import boto3
-
+from core.deadlines import check_deadline, remaining
+from core.exceptions import DeadlineExceededError
 from settings import settings
 
 
+def _check_request_deadline(request: Any = None, **kwargs: Any) -> None:
+    """Stop before each HTTP attempt (including retries) once out of time.
+
+    A retry is only started if the request can still wait out a full read
+    timeout; otherwise its threadpool thread would stay blocked on Cognito
+    long after the deadline (up to 3 attempts of cognito_read_timeout).
+    """
+    check_deadline()
+    context = getattr(request, "context", None) or {}
+    if context.get("retries", {}).get("attempt", 1) > 1:
+        left = remaining()
+        if left is not None and left < settings.cognito_read_timeout:
+            raise DeadlineExceededError(detail="Not enough time left to retry Cognito")
+
+
 class CognitoService:
     """AWS Cognito service for user authentication and management."""
 
-    def __init__(self):
-        self.client = boto3.client(
-            "cognito-idp", region_name=settings.cognito_region
-        )
+    def __init__(self) -> None:
         self.user_pool_id = settings.cognito_user_pool_id
         self.client_id = settings.cognito_client_id
         self.client_secret = settings.cognito_client_secret
+        self._client: Any = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self) -> Any:
+        """boto3 Cognito client, created on first use.
+
+        boto3 is imported here rather than at module level; importing it and
+        building the client takes ~200ms, which would otherwise be paid by
+        every worker at startup. Sync routes run in a threadpool, so the
+        first requests can get here at the same time: the client is built
+        once, under a lock, from a session of its own (boto3's default
+        session is not safe to set up from several threads).
+        """
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self._create_client()
+        return self._client
+
+    @property
+    def client_error(self) -> type[Any]:
+        """botocore's ClientError, imported on first use like the client.
+
+        Usage:
+            except cognito_service.client_error as e:
+                error_code = e.response["Error"]["Code"]
+        """
+        from botocore.exceptions import ClientError
+
+        return ClientError  # type: ignore[no-any-return]
+
+    def warm(self) -> None:
+        """Build the client and open its HTTPS connection to Cognito.
+
+        GetUser is an unauthenticated operation; with a dummy token it is
+        rejected, but the TLS connection stays in the client's pool.
+        """
+        with contextlib.suppress(self.client_error):
+            self.client.get_user(AccessToken="warmup")
+
+    def _create_client(self) -> Any:
+        import boto3
+        from botocore.config import Config
+
+        client = boto3.session.Session().client(
+            "cognito-idp",
+            region_name=settings.cognito_region,
+            endpoint_url=settings.cognito_endpoint_url,
+            config=Config(
+                connect_timeout=settings.cognito_connect_timeout,
+                read_timeout=settings.cognito_read_timeout,
+                retries={"mode": "standard", "max_attempts": 3},
+            ),
+        )
+        client.meta.events.register("before-send", _check_request_deadline)
+        return client
 
     def _get_secret_hash(self, username: str) -> str:
         """Generate HMAC-SHA256 secret hash for Cognito API calls."""
@@ -96,9 +168,7 @@ class CognitoService:
             Username=email,
         )
 
-    def confirm_forgot_password(
-        self, email: str, code: str, new_password: str
-    ) -> dict:
+    def confirm_forgot_password(self, email: str, code: str, new_password: str) -> dict:
         """Complete password reset with verification code."""
         return self.client.confirm_forgot_password(
             ClientId=self.client_id,
@@ -0,0 +1 @@
+"""Batch feature - several API calls in one round trip."""
@@ -0,0 +1,63 @@
+"""Batch API routes.
+
+POST /batch runs several API calls in one round trip (see core.batch).
+"""
+
+from fastapi import APIRouter, Request, Response
+from pydantic_core import to_json
+
+from core.batch import BatchContext, SubRequest, dispatch_batch, encode_responses
+from db.database import async_session_factory
+from features.batch.schemas import BatchRequest
+from settings import settings
+
+router = APIRouter()
+
+
+@router.post("/batch", response_class=Response)
+async def batch(request: Request, payload: BatchRequest) -> Response:
+    """Run a list of API requests and return all their responses.
+
+    Requests share the caller's headers (and so its authentication, which is
+    validated once). They run concurrently unless `atomic` is set, in which
+    case they run in order in one database transaction: it is committed only
+    if every request succeeds, and requests after a failed one are not run.
+
+    Returns:
+        200: {"responses": [{"status", "headers", "body"}, ...]} in request
+        order, whatever the status of each response.
+    """
+    requests = [
+        SubRequest(
+            method=item.method,
+            path=item.path,
+            headers=item.headers,
+            body=to_json(item.body) if "body" in item.model_fields_set else None,
+        )
+        for item in payload.requests
+    ]
+
+    if payload.atomic:
+        async with async_session_factory() as session:
+            responses = await dispatch_batch(
+                request.app,
+                request.scope,
+                requests,
+                BatchContext(session),
+                concurrency=1,
+                atomic=True,
+            )
+            if responses[-1].status < 400:
+                await session.commit()
+            else:
+                await session.rollback()
+    else:
+        responses = await dispatch_batch(
+            request.app,
+            request.scope,
+            requests,
+            BatchContext(),
+            concurrency=settings.batch_concurrency,
+        )
+
+    return Response(encode_responses(responses), media_type="application/json")
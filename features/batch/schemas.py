@@ -0,0 +1,50 @@
+"""Batch feature schemas."""
+
+from typing import Any, Literal
+
+from pydantic import BaseModel, Field, field_validator
+
+from settings import settings
+
+
+class BatchItem(BaseModel):
+    method: Literal["GET", "HEAD", "POST", "PUT", "PATCH", "DELETE"] = "GET"
+    path: str = Field(description="Route path, optionally with a query string")
+    headers: dict[str, str] = Field(
+        default_factory=dict, description="Added to the batch request's headers"
+    )
+    body: Any = Field(default=None, description="JSON body, if any")
+
+    @field_validator("path")
+    @classmethod
+    def validate_path(cls, path: str) -> str:
+        if not path.startswith("/") or path.startswith("//"):
+            raise ValueError("must be an absolute path")
+        if path.partition("?")[0].rstrip("/") == "/batch":
+            raise ValueError("batches cannot be nested")
+        return path
+
+    @field_validator("headers")
+    @classmethod
+    def validate_headers(cls, headers: dict[str, str]) -> dict[str, str]:
+        # HTTP header bytes are latin-1 (see core.batch)
+        for name, value in headers.items():
+            try:
+                name.encode("latin-1")
+                value.encode("latin-1")
+            except UnicodeEncodeError:
+                raise ValueError(f"header {name!r} is not latin-1 text") from None
+        return headers
+
+
+class BatchRequest(BaseModel):
+    requests: list[BatchItem] = Field(
+        min_length=1, max_length=settings.batch_max_requests
+    )
+    atomic: bool = Field(
+        default=False,
+        description=(
+            "Run the requests in order in one database transaction, "
+            "stopping at the first error"
+        ),
+    )
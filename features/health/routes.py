@@ -5,6 +5,7 @@ This module provides health check endpoints for monitoring application status.
 
 from fastapi import APIRouter, Response
 
+from core.warmup import readiness
 from db.database import verify_database_connection
 
 router = APIRouter()
@@ -25,3 +26,21 @@ async def health_check(response: Response) -> dict[str, str]:
 
     response.status_code = 503
     return {"status": "unhealthy", "detail": "Database connection failed"}
+
+
+@router.get("/ready")
+async def readiness_check(response: Response) -> dict[str, str]:
+    """Readiness endpoint for load balancers.
+
+    Unlike /health, this does not touch the database: it reports whether
+    the worker finished its startup warmup and is not shutting down.
+
+    Returns:
+        200: {"status": "ready"}
+        503: {"status": "not ready", "detail": "..."} - Starting or stopping
+    """
+    if readiness.ready:
+        return {"status": "ready"}
+
+    response.status_code = 503
+    return {"status": "not ready", "detail": readiness.reason}
@@ -0,0 +1,25 @@
+"""Metrics API routes.
+
+This module exposes the metrics registry for Prometheus scraping.
+"""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from core.metrics import registry
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics() -> PlainTextResponse:
+    """Metrics endpoint.
+
+    Returns:
+        200: Metrics in Prometheus text format: of every worker under
+        core.server (see core.metrics), else of the worker that served the
+        request.
+    """
+    return PlainTextResponse(
+        registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
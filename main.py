@@ -8,18 +8,46 @@ from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
 from features.auth_aws_cognito.routes import router as auth_aws_cognito_router
 
+from anyio import to_thread
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 
+from core.drain import drainer
 from core.exceptions import register_exception_handlers
-from core.logging import configure_logging, get_logger
+from core.logging import (
+    LogSampler,
+    configure_logging,
+    get_logger,
+    shutdown_logging,
+)
+from core.loopmonitor import loop_monitor
 from core.middleware import register_middleware
-from db.database import close_db, verify_database_connection
+from core.responses import FastJSONResponse
+from core.snapshot import restore_snapshot, snapshot_writer
+from core.warmup import readiness, run_warmup, warm_routes
+from db.database import close_db, verify_database_connection, warm_database_pool
+from features.auth_aws_cognito.dependencies import warm_jwks
+from features.auth_aws_cognito.services import cognito_service
+from features.batch.routes import router as batch_router
 from features.health.routes import router as health_router
+from features.metrics.routes import router as metrics_router
 from settings import settings
 
 # Configure logging before anything else
-configure_logging(level=settings.log_level, format=settings.log_format)
+configure_logging(
+    level=settings.log_level,
+    format=settings.log_format,
+    queue_size=settings.log_queue_size,
+    overflow=settings.log_queue_overflow,
+    sampler=LogSampler(
+        ratio=settings.log_sample_ratio,
+        event_ratios=settings.log_event_sample_ratios,
+        rate_limits=settings.log_event_rate_limits,
+        slow_ms=settings.log_slow_request_ms,
+    ),
+    fast_json=settings.log_fast_json,
+)
 logger = get_logger(__name__)
 
 
@@ -28,10 +56,20 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     """Manage application lifespan events.
 
     Startup:
+        - Sizes the threadpool used for sync code (settings.threadpool_size)
+        - Starts the event-loop lag monitor (core.loopmonitor)
         - Validates database connectivity (fails fast if unreachable)
+        - Restores cached data from the cache snapshot, if configured
+        - Warms up pools and caches, then reports ready (core.warmup)
+        - Writes the cache snapshot now and periodically, if configured
+        - Drains on SIGUSR1 (core.drain)
 
     Shutdown:
+        - Reports how many requests were drained or cut off
+        - Writes a final cache snapshot, if configured
         - Closes all database connections gracefully
+        - Stops the event-loop lag monitor
+        - Flushes buffered log records
     """
     # Startup
     logger.info(
@@ -39,6 +77,18 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
         app_name=settings.app_name,
         environment=settings.environment,
     )
+    drainer.install_signal_handler(settings.drain_delay, settings.drain_timeout)
+
+    if settings.threadpool_size:
+        to_thread.current_default_thread_limiter().total_tokens = (
+            settings.threadpool_size
+        )
+
+    if settings.loop_monitor_enabled:
+        loop_monitor.start(
+            interval=settings.loop_monitor_interval_ms / 1000,
+            threshold=settings.loop_block_threshold_ms / 1000 or None,
+        )
 
     # Validate database connection (fail fast)
     if not await verify_database_connection():
@@ -47,12 +97,44 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
 
     logger.info("Database connection verified")
 
+    if settings.cache_snapshot_path:
+        restored = restore_snapshot(settings.cache_snapshot_path)
+        logger.info("Cache snapshot restored", caches=restored)
+
+    if settings.warmup_enabled:
+        await run_warmup(
+            {
+                "database_pool": lambda: warm_database_pool(
+                    settings.warmup_db_connections or settings.db_pool_size or 5
+                ),
+                "jwks": warm_jwks,
+                "cognito": lambda: run_in_threadpool(cognito_service.warm),
+                "routes": lambda: warm_routes(app, settings.warmup_paths),
+            },
+            timeout=settings.warmup_timeout,
+        )
+    if settings.cache_snapshot_path:
+        snapshot_writer.start(
+            settings.cache_snapshot_path, settings.cache_snapshot_interval
+        )
+    if not drainer.draining:
+        readiness.set_ready()
+
     yield
 
-    # Shutdown
+    # Shutdown (the server has stopped accepting and finished or cancelled
+    # in-flight requests by now)
+    drainer.start("shutting down")
+    drainer.finish()
+    logger.info("Drain complete", drained=drainer.drained, cut_off=drainer.cut_off)
+
+    await snapshot_writer.stop()
+
     logger.info("Application shutting down - closing database connections")
     await close_db()
     logger.info("Shutdown complete")
+    loop_monitor.stop()
+    shutdown_logging()
 
 
 def create_app() -> FastAPI:
@@ -65,12 +147,24 @@ def create_app() -> FastAPI:
         title=settings.app_name,
         debug=settings.debug,
         lifespan=lifespan,
+        default_response_class=FastJSONResponse,
     )
 
     # Register exception handlers
     register_exception_handlers(app)
 
-    # Register custom middleware
+    # Register routers
+    app.include_router(health_router, tags=["health"])
+
+    if settings.metrics_enabled:
+        app.include_router(metrics_router, tags=["metrics"])
+
+    app.include_router(auth_aws_cognito_router, prefix="/auth", tags=['auth'])
+
+    if settings.batch_enabled:
+        app.include_router(batch_router, tags=["batch"])
+
+    # Register custom middleware (after the routers, which it inspects)
     register_middleware(app)
 
     # Configure CORS
@@ -82,11 +176,6 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
-    # Register routers
-    app.include_router(health_router, tags=["health"])
-
-    app.include_router(auth_aws_cognito_router, prefix="/auth", tags=['auth'])
-
     return app
 
 
@@ -0,0 +1,22 @@
+"""Unit test fixtures.
+
+Unlike e2e/, these tests run in-process against the app and a throwaway
+SQLite database (see the root conftest.py).
+"""
+
+from collections.abc import AsyncIterator
+
+import pytest
+
+from db.database import Base, engine
+
+
+@pytest.fixture
+async def database() -> AsyncIterator[None]:
+    """Create all tables for the test and drop them afterwards."""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
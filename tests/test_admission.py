@@ -0,0 +1,111 @@
+"""Tests for admission control (load shedding)."""
+
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from core import middleware
+from core.admission import AdmissionController, Priority, RequestShed
+from core.middleware import admission_control_middleware
+from settings import settings
+
+
+async def wait_queued(controller: AdmissionController, depth: int) -> None:
+    for _ in range(100):
+        if controller.queue_depth == depth:
+            return
+        await asyncio.sleep(0)
+    raise AssertionError(f"queue depth {controller.queue_depth} != {depth}")
+
+
+async def test_slots_go_to_the_highest_priority_first() -> None:
+    controller = AdmissionController(max_in_flight=1, max_queue=10, queue_timeout=5)
+    await controller.acquire(Priority.NORMAL)
+    admitted: list[Priority] = []
+
+    async def request(priority: Priority) -> None:
+        await controller.acquire(priority)
+        admitted.append(priority)
+        controller.release()
+
+    tasks = []
+    for priority in (Priority.LOW, Priority.NORMAL, Priority.CRITICAL, Priority.HIGH):
+        tasks.append(asyncio.create_task(request(priority)))
+        await wait_queued(controller, len(tasks))
+    controller.release()
+    await asyncio.gather(*tasks)
+
+    assert admitted == [
+        Priority.CRITICAL,
+        Priority.HIGH,
+        Priority.NORMAL,
+        Priority.LOW,
+    ]
+    assert controller.in_flight == 0
+
+
+async def test_full_queue_evicts_lower_priority() -> None:
+    controller = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout=5)
+    await controller.acquire(Priority.NORMAL)
+    low = asyncio.create_task(controller.acquire(Priority.LOW))
+    await wait_queued(controller, 1)
+
+    high = asyncio.create_task(controller.acquire(Priority.HIGH))
+    await wait_queued(controller, 1)
+
+    with pytest.raises(RequestShed, match="evicted"):
+        await low
+    # Nothing lower to evict: an equal priority request is shed
+    with pytest.raises(RequestShed, match="queue_full"):
+        await controller.acquire(Priority.HIGH)
+
+    controller.release()
+    await high
+    controller.release()
+    assert controller.in_flight == 0
+    assert controller.queue_depth == 0
+
+
+async def test_queue_timeout_sheds() -> None:
+    controller = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout=0.01)
+    await controller.acquire(Priority.NORMAL)
+
+    with pytest.raises(RequestShed, match="queue_timeout"):
+        await controller.acquire(Priority.HIGH)
+
+    assert controller.queue_depth == 0
+    controller.release()
+    assert controller.in_flight == 0
+
+
+async def test_middleware_answers_503_with_retry_after(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    controller = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout=0.05)
+    monkeypatch.setattr(middleware, "admission_controller", controller)
+    release = asyncio.Event()
+    app = FastAPI()
+    app.middleware("http")(admission_control_middleware)
+
+    @app.post("/slow")
+    async def slow() -> dict[str, bool]:
+        await release.wait()
+        return {"done": True}
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        first = asyncio.create_task(client.post("/slow"))
+        for _ in range(100):
+            if controller.in_flight:
+                break
+            await asyncio.sleep(0.001)
+        shed = await client.post("/slow")
+        release.set()
+        assert (await first).status_code == 200
+
+    assert shed.status_code == 503
+    assert shed.headers["retry-after"] == str(settings.admission_retry_after)
+    assert controller.in_flight == 0
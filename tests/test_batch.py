@@ -0,0 +1,131 @@
+"""Tests for batched sub-request dispatch (POST /batch)."""
+
+from typing import Any
+
+import pytest
+from fastapi import FastAPI, Response
+from httpx import ASGITransport, AsyncClient
+
+from core import middleware
+from core.admission import AdmissionController
+from core.middleware import admission_control_middleware, idempotency_middleware
+from features.batch.routes import router as batch_router
+
+pytestmark = pytest.mark.usefixtures("database")
+
+
+def make_app() -> tuple[FastAPI, list[int]]:
+    """App with the batch route, POST /orders and a failing POST /fail."""
+    app = FastAPI()
+    app.include_router(batch_router)
+    app.middleware("http")(idempotency_middleware)
+    app.middleware("http")(admission_control_middleware)
+    calls: list[int] = []
+
+    @app.get("/ping")
+    async def ping() -> dict[str, bool]:
+        return {"pong": True}
+
+    @app.post("/orders", status_code=201)
+    async def create_order() -> dict[str, int]:
+        calls.append(1)
+        return {"call": len(calls)}
+
+    @app.get("/items/{name}")
+    async def item(name: str) -> dict[str, str]:
+        return {"name": name}
+
+    @app.post("/fail")
+    async def fail() -> Response:
+        return Response(status_code=400)
+
+    return app, calls
+
+
+async def post_batch(app: FastAPI, payload: dict[str, Any]) -> list[int]:
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        response = await client.post("/batch", json=payload)
+    assert response.status_code == 200
+    return [item["status"] for item in response.json()["responses"]]
+
+
+async def test_subrequests_use_the_batch_admission_slot(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """With one slot, held by the batch itself, sub-requests still run."""
+    controller = AdmissionController(max_in_flight=1, max_queue=10, queue_timeout=0.1)
+    monkeypatch.setattr(middleware, "admission_controller", controller)
+    app, _ = make_app()
+
+    statuses = await post_batch(
+        app, {"requests": [{"path": "/ping"}, {"path": "/ping"}, {"path": "/ping"}]}
+    )
+
+    assert statuses == [200, 200, 200]
+    assert controller.in_flight == 0
+
+
+async def test_atomic_batch_does_not_store_idempotent_responses() -> None:
+    """A rolled-back order is created again when the batch is retried."""
+    app, calls = make_app()
+    payload = {
+        "atomic": True,
+        "requests": [
+            {
+                "method": "POST",
+                "path": "/orders",
+                "headers": {"Idempotency-Key": "order-1"},
+                "body": {},
+            },
+            {"method": "POST", "path": "/fail", "body": {}},
+        ],
+    }
+
+    assert await post_batch(app, payload) == [201, 400]
+    assert await post_batch(app, payload) == [201, 400]
+    assert len(calls) == 2
+
+
+async def test_batch_stores_idempotent_responses() -> None:
+    app, calls = make_app()
+    payload = {
+        "requests": [
+            {
+                "method": "POST",
+                "path": "/orders",
+                "headers": {"Idempotency-Key": "order-1"},
+                "body": {},
+            }
+        ],
+    }
+
+    assert await post_batch(app, payload) == [201]
+    assert await post_batch(app, payload) == [201]
+    assert len(calls) == 1
+
+
+async def test_subrequest_path_is_decoded() -> None:
+    app, _ = make_app()
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        direct = await client.get("/items/a%20b")
+        response = await client.post(
+            "/batch", json={"requests": [{"path": "/items/a%20b"}]}
+        )
+
+    assert response.json()["responses"][0]["body"] == direct.json() == {"name": "a b"}
+
+
+async def test_non_latin1_header_is_rejected() -> None:
+    app, _ = make_app()
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        response = await client.post(
+            "/batch", json={"requests": [{"path": "/ping", "headers": {"x-a": "€"}}]}
+        )
+
+    assert response.status_code == 422
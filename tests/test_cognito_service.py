@@ -0,0 +1,70 @@
+"""Tests for the lazily built Cognito client."""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+
+from core.deadlines import deadline_context
+from core.exceptions import DeadlineExceededError
+from features.auth_aws_cognito.services import CognitoService, _check_request_deadline
+from settings import settings
+
+
+def test_client_is_built_once_across_threads(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Concurrent first requests from the threadpool share one client."""
+    built: list[object] = []
+    start = threading.Barrier(8)
+
+    def create_client(self: CognitoService) -> Any:
+        time.sleep(0.05)
+        client = object()
+        built.append(client)
+        return client
+
+    def first_use(service: CognitoService) -> Any:
+        start.wait()
+        return service.client
+
+    monkeypatch.setattr(CognitoService, "_create_client", create_client)
+    service = CognitoService()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        clients = list(pool.map(first_use, [service] * 8))
+
+    assert len(built) == 1
+    assert all(client is built[0] for client in clients)
+
+
+def test_client_error_is_botocore_client_error() -> None:
+    from botocore.exceptions import ClientError
+
+    assert CognitoService().client_error is ClientError
+
+
+def attempt(number: int) -> Any:
+    """A botocore request as passed to before-send handlers."""
+    return SimpleNamespace(context={"retries": {"attempt": number}})
+
+
+def test_first_attempt_runs_until_the_deadline() -> None:
+    with deadline_context(client_timeout=1.0):
+        _check_request_deadline(request=attempt(1))
+    with (
+        deadline_context(client_timeout=1e-9),
+        pytest.raises(DeadlineExceededError),
+    ):
+        time.sleep(0.001)
+        _check_request_deadline(request=attempt(1))
+
+
+def test_retry_needs_a_full_read_timeout(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "cognito_read_timeout", 0.5)
+    with deadline_context(client_timeout=1.0):
+        _check_request_deadline(request=attempt(2))
+    with deadline_context(client_timeout=0.2), pytest.raises(DeadlineExceededError):
+        _check_request_deadline(request=attempt(2))
+    # Outside a request (e.g. warm()) retries are not limited
+    _check_request_deadline(request=attempt(3))
@@ -0,0 +1,122 @@
+"""Tests for conditional GET (ETag / If-None-Match)."""
+
+from collections.abc import AsyncIterator
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from core.conditional import etag_matches, etag_version, make_weak_etag
+from core.middleware import conditional_get_middleware
+
+
+def make_app() -> tuple[FastAPI, list[str]]:
+    """App with the conditional GET middleware; also returns handler calls."""
+    calls: list[str] = []
+    versions = {"items": "1"}
+    app = FastAPI()
+    app.middleware("http")(conditional_get_middleware)
+
+    @app.api_route("/plain", methods=["GET", "POST"])
+    async def plain() -> dict[str, str]:
+        calls.append("plain")
+        return {"hello": "world"}
+
+    async def items_version() -> str:
+        return versions["items"]
+
+    @app.get("/items")
+    @etag_version(items_version)
+    async def items() -> list[int]:
+        calls.append("items")
+        return [1, 2]
+
+    @app.put("/items/version/{version}")
+    async def bump(version: str) -> None:
+        versions["items"] = version
+
+    return app, calls
+
+
+@pytest.fixture
+async def app_client() -> AsyncIterator[tuple[AsyncClient, list[str]]]:
+    app, calls = make_app()
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        yield client, calls
+
+
+def test_weak_comparison() -> None:
+    etag = make_weak_etag(b"body")
+    opaque = etag.removeprefix("W/")
+
+    assert etag.startswith('W/"')
+    assert etag_matches(etag, etag)
+    assert etag_matches(opaque, etag)
+    assert etag_matches(etag, opaque)
+    assert etag_matches(f'"other", {etag} ,W/"more"', etag)
+    assert etag_matches("*", etag)
+    assert etag_matches(" * ", etag)
+    assert not etag_matches('"other", W/"more"', etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches("", etag)
+
+
+async def test_matching_if_none_match_gets_304(
+    app_client: tuple[AsyncClient, list[str]],
+) -> None:
+    client, _ = app_client
+    first = await client.get("/plain")
+    etag = first.headers["etag"]
+
+    response = await client.get("/plain", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    list_form = await client.get(
+        "/plain", headers={"If-None-Match": f'"stale", {etag}'}
+    )
+    assert list_form.status_code == 304
+    star = await client.get("/plain", headers={"If-None-Match": "*"})
+    assert star.status_code == 304
+    stale = await client.get("/plain", headers={"If-None-Match": '"stale"'})
+    assert stale.status_code == 200
+    assert stale.json() == {"hello": "world"}
+
+
+async def test_non_get_passes_through(
+    app_client: tuple[AsyncClient, list[str]],
+) -> None:
+    client, _ = app_client
+
+    response = await client.post("/plain", headers={"If-None-Match": "*"})
+
+    assert response.status_code == 200
+    assert "etag" not in response.headers
+
+
+async def test_etag_version_skips_the_handler(
+    app_client: tuple[AsyncClient, list[str]],
+) -> None:
+    client, calls = app_client
+    first = await client.get("/items")
+    etag = first.headers["etag"]
+    assert first.json() == [1, 2]
+    assert calls == ["items"]
+
+    cached = await client.get("/items", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert calls == ["items"]
+
+    # The query is part of the representation
+    other_query = await client.get("/items?page=2", headers={"If-None-Match": etag})
+    assert other_query.status_code == 200
+    assert other_query.headers["etag"] != etag
+
+    await client.put("/items/version/2")
+    changed = await client.get("/items", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert calls == ["items", "items", "items"]
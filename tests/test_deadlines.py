@@ -0,0 +1,146 @@
+"""Tests for per-request deadlines."""
+
+import asyncio
+from types import SimpleNamespace
+from typing import Any, cast
+
+import pytest
+from fastapi import Depends, FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import Connection
+from starlette.types import Message, Receive, Scope, Send
+
+from core.deadlines import deadline_context, parse_timeout_header, request_timeout
+from core.middleware import RequestDeadlineMiddleware
+from db.database import apply_statement_timeout
+from settings import settings
+
+
+@pytest.fixture(autouse=True)
+def short_timeout(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "request_timeout", 0.05)
+    monkeypatch.setattr(settings, "request_timeout_max", 1.0)
+
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(RequestDeadlineMiddleware)
+
+    @app.get("/sleep/{seconds}")
+    async def sleep(seconds: float) -> dict[str, bool]:
+        await asyncio.sleep(seconds)
+        return {"done": True}
+
+    @app.get("/long/{seconds}", dependencies=[Depends(request_timeout(0.5))])
+    async def long(seconds: float) -> dict[str, bool]:
+        await asyncio.sleep(seconds)
+        return {"done": True}
+
+    return app
+
+
+async def get(path: str, **headers: str) -> Any:
+    async with AsyncClient(
+        transport=ASGITransport(app=make_app()), base_url="http://test"
+    ) as client:
+        return await client.get(path, headers=headers)
+
+
+async def test_fast_request_passes() -> None:
+    response = await get("/sleep/0")
+    assert response.status_code == 200
+
+
+async def test_deadline_answers_504() -> None:
+    response = await get("/sleep/0.2")
+    assert response.status_code == 504
+    assert response.json() == {"message": "Request deadline exceeded"}
+
+
+async def test_client_header_shortens_the_deadline() -> None:
+    response = await get("/long/0.1", **{"X-Request-Timeout": "0.02"})
+    assert response.status_code == 504
+
+
+async def test_route_timeout_reschedules_the_deadline() -> None:
+    response = await get("/long/0.1")
+    assert response.status_code == 200
+
+
+def test_parse_timeout_header() -> None:
+    assert parse_timeout_header("0.5") == 0.5
+    assert parse_timeout_header("60") == settings.request_timeout_max
+    for value in (None, "", "soon", "0", "-1", "inf", "nan"):
+        assert parse_timeout_header(value) is None
+
+
+async def run_raw(body_length: int | None) -> list[Message]:
+    """Run an app that finishes its body after the client disconnected."""
+    sent: list[Message] = []
+    body_sent = asyncio.Event()
+    headers = []
+    if body_length is not None:
+        headers.append((b"content-length", str(body_length).encode()))
+
+    async def app(scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": b"ok", "more_body": True})
+        await asyncio.sleep(0.01)
+        await send({"type": "http.response.body", "body": b""})
+
+    async def send(message: Message) -> None:
+        sent.append(message)
+        if message.get("body"):
+            body_sent.set()
+
+    messages = [{"type": "http.request", "body": b""}]
+
+    async def receive() -> Message:
+        if messages:
+            return messages.pop()
+        await body_sent.wait()
+        return {"type": "http.disconnect"}
+
+    scope = {"type": "http", "path": "/", "headers": []}
+    await RequestDeadlineMiddleware(app)(scope, receive, send)
+    return sent
+
+
+async def test_close_after_content_length_is_not_a_disconnect() -> None:
+    sent = await run_raw(body_length=2)
+    assert sent[-1] == {"type": "http.response.body", "body": b""}
+
+
+async def test_disconnect_cancels_the_request() -> None:
+    sent = await run_raw(body_length=None)
+    assert [message.get("body") for message in sent] == [None, b"ok"]
+
+
+class FakeConnection:
+    def __init__(self, dialect: str) -> None:
+        self.dialect = SimpleNamespace(name=dialect)
+        self.statements: list[str] = []
+
+    def exec_driver_sql(self, statement: str) -> None:
+        self.statements.append(statement)
+
+
+def statement_timeouts(dialect: str) -> list[str]:
+    connection = FakeConnection(dialect)
+    apply_statement_timeout(
+        cast(Any, None), cast(Any, None), cast(Connection, connection)
+    )
+    return connection.statements
+
+
+def test_statement_timeout_follows_the_deadline() -> None:
+    with deadline_context(client_timeout=0.02):
+        (statement,) = statement_timeouts("postgresql")
+    assert statement.startswith("SET LOCAL statement_timeout = ")
+    assert 1 <= int(statement.rsplit(" ", 1)[1]) <= 20
+
+
+def test_statement_timeout_needs_postgres_and_a_request() -> None:
+    assert statement_timeouts("postgresql") == []
+    with deadline_context(client_timeout=None):
+        assert statement_timeouts("sqlite") == []
@@ -0,0 +1,108 @@
+"""Tests for the shared dependencies."""
+
+import pytest
+from pydantic import BaseModel, Field, computed_field, field_serializer, field_validator
+from sqlalchemy import select
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+
+from core.dependencies import FieldSelection, sparse_fields
+from core.exceptions import BadRequestError
+
+
+class Item(BaseModel):
+    id: int
+    name: str
+    created_at: str = Field(alias="createdAt")
+
+    @field_validator("name")
+    @classmethod
+    def strip_name(cls, name: str) -> str:
+        return name.strip()
+
+    @field_serializer("created_at")
+    def date_only(self, created_at: str) -> str:
+        return created_at[:10]
+
+
+class ItemBase(DeclarativeBase):
+    pass
+
+
+class ItemRecord(ItemBase):
+    __tablename__ = "items"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    name: Mapped[str]
+    created_at: Mapped[str]
+
+
+@pytest.mark.parametrize("fields", [None, "", ",", " , ,"])
+def test_no_fields_selects_everything(fields: str | None) -> None:
+    selection = sparse_fields(Item)(fields)
+
+    assert selection.fields is None
+    assert selection.model is Item
+
+
+def test_fields_by_name_or_alias() -> None:
+    selection = sparse_fields(Item)("id, createdAt,")
+
+    assert selection.fields == frozenset({"id", "created_at"})
+    item = selection.model(id=1, created_at="2024-05-01T10:00:00")
+    assert item.model_dump(by_alias=True) == {"id": 1, "createdAt": "2024-05-01"}
+
+
+def test_unknown_field_is_rejected() -> None:
+    with pytest.raises(BadRequestError):
+        sparse_fields(Item)("id,password")
+
+
+def test_sparse_model_is_cached() -> None:
+    first = FieldSelection(Item, frozenset({"id"}))
+    second = FieldSelection(Item, frozenset({"id"}))
+
+    assert first.model is second.model
+
+
+def test_apply_loads_only_selected_columns() -> None:
+    statement = select(ItemRecord)
+    selection = FieldSelection(Item, frozenset({"name"}))
+
+    assert FieldSelection(Item, None).apply(statement, ItemRecord) is statement
+    sql = str(selection.apply(statement, ItemRecord))
+    assert "items.name" in sql
+    assert "items.created_at" not in sql
+
+
+class Row:
+    """ORM-like object whose unloaded attributes must not be read."""
+
+    id = 1
+    name = "  widget "
+
+    @property
+    def created_at(self) -> str:
+        raise AssertionError("unloaded column read")
+
+
+def test_sparse_model_reads_only_selected_attributes() -> None:
+    model = FieldSelection(Item, frozenset({"id", "name"})).model
+
+    item = model.model_validate(Row())
+
+    assert isinstance(item, Item)
+    assert item.model_dump_json() == '{"id":1,"name":"widget"}'
+
+
+def test_computed_fields_are_rejected() -> None:
+    class Priced(BaseModel):
+        price: int
+        quantity: int
+
+        @computed_field  # type: ignore[prop-decorator]
+        @property
+        def total(self) -> int:
+            return self.price * self.quantity
+
+    with pytest.raises(ValueError, match="total"):
+        sparse_fields(Priced)
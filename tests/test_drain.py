@@ -0,0 +1,112 @@
+"""Tests for graceful connection draining."""
+
+import asyncio
+import os
+import signal
+from collections.abc import AsyncIterator
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from core import middleware
+from core.drain import Drainer
+from core.middleware import DrainMiddleware
+from core.warmup import readiness
+from features.health.routes import router as health_router
+
+
+@pytest.fixture
+def drainer(monkeypatch: pytest.MonkeyPatch) -> Drainer:
+    """A fresh drainer, with readiness restored after the test."""
+    drainer = Drainer()
+    monkeypatch.setattr(middleware, "drainer", drainer)
+    monkeypatch.setattr(readiness, "ready", True)
+    monkeypatch.setattr(readiness, "reason", "ready")
+    return drainer
+
+
+@pytest.fixture
+async def app_client() -> AsyncIterator[tuple[AsyncClient, asyncio.Event]]:
+    release = asyncio.Event()
+    app = FastAPI()
+    app.include_router(health_router)
+    app.add_middleware(DrainMiddleware)
+
+    @app.get("/slow")
+    async def slow() -> dict[str, bool]:
+        await release.wait()
+        return {"done": True}
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        yield client, release
+
+
+async def wait_in_flight(drainer: Drainer, count: int) -> None:
+    for _ in range(100):
+        if drainer.in_flight == count:
+            return
+        await asyncio.sleep(0.001)
+    raise AssertionError(f"{drainer.in_flight} requests in flight, not {count}")
+
+
+async def test_keep_alive_until_draining(
+    drainer: Drainer, app_client: tuple[AsyncClient, asyncio.Event]
+) -> None:
+    http, _ = app_client
+
+    response = await http.get("/ready")
+
+    assert response.status_code == 200
+    assert "connection" not in response.headers
+    assert drainer.in_flight == 0
+
+
+async def test_drain_closes_connections_and_fails_readiness(
+    drainer: Drainer, app_client: tuple[AsyncClient, asyncio.Event]
+) -> None:
+    http, release = app_client
+    in_flight = asyncio.create_task(http.get("/slow"))
+    await wait_in_flight(drainer, 1)
+
+    drainer.start()
+    ready = await http.get("/ready")
+    assert not await drainer.wait_idle(0.01)
+    release.set()
+    finished = await in_flight
+
+    assert ready.status_code == 503
+    assert ready.json() == {"status": "not ready", "detail": "draining"}
+    assert ready.headers["connection"] == "close"
+    assert finished.status_code == 200
+    assert finished.json() == {"done": True}
+    assert finished.headers["connection"] == "close"
+    assert await drainer.wait_idle(0.01)
+    assert drainer.drained == 2
+    assert drainer.cut_off == 0
+
+
+async def test_signal_drains_then_stops_the_worker(
+    drainer: Drainer,
+    app_client: tuple[AsyncClient, asyncio.Event],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    http, release = app_client
+    signals: list[int] = []
+    monkeypatch.setattr(os, "kill", lambda pid, sig: signals.append(sig))
+    in_flight = asyncio.create_task(http.get("/slow"))
+    await wait_in_flight(drainer, 1)
+
+    drainer._on_signal(delay=0.01, timeout=5)
+    await asyncio.sleep(0.05)
+    assert drainer.draining
+    assert signals == []
+
+    release.set()
+    assert (await in_flight).status_code == 200
+    assert drainer._task is not None
+    await drainer._task
+    assert signals == [signal.SIGTERM]
+    assert drainer.drained == 1
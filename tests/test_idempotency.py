@@ -0,0 +1,121 @@
+"""Tests for Idempotency-Key storage and replay."""
+
+import pytest
+from fastapi import FastAPI, Response
+from httpx import ASGITransport, AsyncClient
+
+from core.idempotency import IdempotencyKeyMismatch, IdempotencyStore
+from core.middleware import idempotency_middleware
+
+pytestmark = pytest.mark.usefixtures("database")
+
+
+def make_app(statuses: list[int]) -> tuple[FastAPI, list[int]]:
+    """App whose POST /orders answers with the next status in `statuses`."""
+    app = FastAPI()
+    app.middleware("http")(idempotency_middleware)
+    calls: list[int] = []
+
+    @app.post("/orders")
+    async def create_order() -> Response:
+        calls.append(1)
+        status_code = statuses[min(len(calls), len(statuses)) - 1]
+        return Response(f'{{"call":{len(calls)}}}', status_code=status_code)
+
+    return app, calls
+
+
+async def test_store_replays_finished_response() -> None:
+    """A finished key is replayed instead of being claimed again."""
+    store = IdempotencyStore(max_entries=10, ttl=60)
+    assert await store.begin("key-1", "fingerprint") is None
+
+    response = store.new_response("fingerprint", 201, [], b'{"id":1}')
+    await store.finish("key-1", response)
+
+    stored = await store.begin("key-1", "fingerprint")
+    assert stored is not None
+    assert stored.status_code == 201
+    assert stored.body == b'{"id":1}'
+
+
+async def test_store_replays_from_database() -> None:
+    """A response stored by another worker is found in the table."""
+    first, second = (IdempotencyStore(max_entries=10, ttl=60) for _ in range(2))
+    assert await first.begin("key-1", "fingerprint") is None
+    await first.finish("key-1", first.new_response("fingerprint", 201, [], b'{"id":1}'))
+
+    stored = await second.begin("key-1", "fingerprint")
+    assert stored is not None
+    assert stored.body == b'{"id":1}'
+
+
+async def test_store_rejects_key_reused_with_other_body() -> None:
+    store = IdempotencyStore(max_entries=10, ttl=60)
+    assert await store.begin("key-1", "fingerprint") is None
+    await store.finish("key-1", store.new_response("fingerprint", 201, [], b""))
+
+    with pytest.raises(IdempotencyKeyMismatch):
+        await store.begin("key-1", "other-fingerprint")
+
+
+async def test_store_releases_unstored_claim() -> None:
+    """finish(None) lets the next request with the key run again."""
+    store = IdempotencyStore(max_entries=10, ttl=60)
+    assert await store.begin("key-1", "fingerprint") is None
+    await store.finish("key-1", None)
+
+    assert await store.begin("key-1", "fingerprint") is None
+
+
+@pytest.mark.parametrize("status_code", [200, 201, 400, 404, 422])
+def test_is_storable(status_code: int) -> None:
+    assert IdempotencyStore.is_storable(status_code)
+
+
+@pytest.mark.parametrize("status_code", [408, 409, 429, 500, 503])
+def test_is_not_storable(status_code: int) -> None:
+    assert not IdempotencyStore.is_storable(status_code)
+
+
+async def test_middleware_replays_retry() -> None:
+    app, calls = make_app([201])
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        headers = {"Idempotency-Key": "replay"}
+        first = await client.post("/orders", json={"n": 1}, headers=headers)
+        retry = await client.post("/orders", json={"n": 1}, headers=headers)
+
+    assert len(calls) == 1
+    assert retry.status_code == first.status_code == 201
+    assert retry.content == first.content
+    assert retry.headers["idempotent-replayed"] == "true"
+
+
+async def test_middleware_rejects_key_reused_with_other_body() -> None:
+    app, calls = make_app([201])
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        headers = {"Idempotency-Key": "conflict"}
+        await client.post("/orders", json={"n": 1}, headers=headers)
+        response = await client.post("/orders", json={"n": 2}, headers=headers)
+
+    assert len(calls) == 1
+    assert response.status_code == 422
+
+
+async def test_middleware_does_not_replay_rate_limited_response() -> None:
+    """A retry after 429 runs the handler instead of replaying the 429."""
+    app, calls = make_app([429, 201])
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        headers = {"Idempotency-Key": "limited"}
+        first = await client.post("/orders", json={"n": 1}, headers=headers)
+        retry = await client.post("/orders", json={"n": 1}, headers=headers)
+
+    assert first.status_code == 429
+    assert retry.status_code == 201
+    assert len(calls) == 2
@@ -0,0 +1,112 @@
+"""Tests for request-scoped DataLoaders."""
+
+import asyncio
+from collections.abc import Mapping
+from typing import Any
+
+import pytest
+
+from core.idempotency import IdempotencyRecord
+from core.loaders import DataLoader, Loaders
+from core.ratelimit import RateLimitBucket
+from db.database import async_session_factory
+
+
+class Recorder:
+    """batch_load that records its calls and how many overlap."""
+
+    def __init__(self, fail: bool = False) -> None:
+        self.calls: list[list[int]] = []
+        self.fail = fail
+        self.running = 0
+        self.max_running = 0
+
+    async def __call__(self, keys: list[int]) -> Mapping[int, str]:
+        self.calls.append(keys)
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(0.01)
+            if self.fail:
+                raise RuntimeError("database down")
+            return {key: f"value-{key}" for key in keys if key != 0}
+        finally:
+            self.running -= 1
+
+
+async def test_concurrent_loads_are_batched() -> None:
+    batch_load = Recorder()
+    loader = DataLoader(batch_load)
+
+    values = await asyncio.gather(*(loader.load(key) for key in (1, 2, 1, 0)))
+
+    assert values == ["value-1", "value-2", "value-1", None]
+    assert batch_load.calls == [[1, 2, 0]]
+
+
+async def test_loaded_keys_are_cached() -> None:
+    batch_load = Recorder()
+    loader = DataLoader(batch_load)
+
+    assert await loader.load_many([1, 2]) == ["value-1", "value-2"]
+    assert await loader.load_many([2, 3]) == ["value-2", "value-3"]
+    assert batch_load.calls == [[1, 2], [3]]
+
+    loader.clear(2)
+    loader.prime(3, "primed")
+    assert await loader.load_many([2, 3]) == ["value-2", "primed"]
+    assert batch_load.calls == [[1, 2], [3], [2]]
+
+
+async def test_large_batches_are_loaded_one_chunk_at_a_time() -> None:
+    batch_load = Recorder()
+    loader = DataLoader(batch_load, max_batch_size=2)
+
+    assert await loader.load_many([1, 2, 3, 4, 5]) == [
+        f"value-{key}" for key in (1, 2, 3, 4, 5)
+    ]
+    assert batch_load.calls == [[1, 2], [3, 4], [5]]
+    assert batch_load.max_running == 1
+
+
+async def test_failed_keys_are_loaded_again() -> None:
+    batch_load = Recorder(fail=True)
+    loader = DataLoader(batch_load)
+
+    with pytest.raises(RuntimeError):
+        await loader.load(1)
+
+    batch_load.fail = False
+    assert await loader.load(1) == "value-1"
+
+
+@pytest.mark.usefixtures("database")
+async def test_loaders_take_turns_on_the_session(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Loaders of different models never query the session at once."""
+    running = 0
+    max_running = 0
+
+    async with async_session_factory() as session:
+        execute = session.execute
+
+        async def tracked_execute(*args: Any, **kwargs: Any) -> Any:
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            try:
+                await asyncio.sleep(0.01)
+                return await execute(*args, **kwargs)
+            finally:
+                running -= 1
+
+        monkeypatch.setattr(session, "execute", tracked_execute)
+        loaders = Loaders(session)
+
+        await asyncio.gather(
+            loaders.model(RateLimitBucket, "key").load(1),
+            loaders.model(IdempotencyRecord, "key").load("a"),
+        )
+
+    assert max_running == 1
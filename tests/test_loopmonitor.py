@@ -0,0 +1,66 @@
+"""Tests for the event-loop blocked detector."""
+
+import asyncio
+import threading
+import time
+from typing import Any
+
+import pytest
+import structlog
+
+from core import loopmonitor
+from core.loopmonitor import LoopMonitor, event_loop_blocks_total
+
+
+class RecordingLogger:
+    def __init__(self) -> None:
+        self.warnings: list[tuple[str, dict[str, Any]]] = []
+
+    def warning(self, event: str, **fields: Any) -> None:
+        self.warnings.append((event, fields))
+
+
+def block_the_loop(seconds: float) -> None:
+    time.sleep(seconds)
+
+
+async def test_blocked_loop_is_reported_once(monkeypatch: pytest.MonkeyPatch) -> None:
+    logger = RecordingLogger()
+    monkeypatch.setattr(loopmonitor, "logger", logger)
+    blocks = event_loop_blocks_total.value()
+    monitor = LoopMonitor()
+    monitor.start(interval=0.005, threshold=0.02)
+    watchdog = monitor._thread
+    assert watchdog is not None
+
+    async def request() -> None:
+        structlog.contextvars.bind_contextvars(request_id="req-1")
+        block_the_loop(0.2)
+
+    try:
+        await asyncio.sleep(0.02)
+        await asyncio.create_task(request())
+        await asyncio.sleep(0.02)
+    finally:
+        monitor.stop()
+
+    assert not watchdog.is_alive()
+    assert monitor._thread is None
+    assert event_loop_blocks_total.value() == blocks + 1
+    ((event, fields),) = logger.warnings
+    assert event == "Event loop blocked"
+    assert fields["request_id"] == "req-1"
+    assert fields["blocked_ms"] >= 20
+    assert "block_the_loop" in fields["stack"]
+
+
+async def test_stop_joins_the_watchdog() -> None:
+    monitor = LoopMonitor()
+    monitor.start(interval=0.005, threshold=None)
+    await asyncio.sleep(0.02)
+    monitor.stop()
+
+    assert [
+        thread for thread in threading.enumerate() if thread.name == "loop-monitor"
+    ] == []
+    monitor.stop()
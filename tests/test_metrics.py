@@ -0,0 +1,125 @@
+"""Tests for the metrics registry and its multiprocess mode."""
+
+import os
+from pathlib import Path
+
+import pytest
+
+from core import metrics
+from core.metrics import Counter, Gauge, Histogram, MetricsRegistry
+
+# The forked workers only touch their own metric file
+pytestmark = pytest.mark.filterwarnings(
+    "ignore:This process .* is multi-threaded:DeprecationWarning"
+)
+
+
+@pytest.fixture
+def registry(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> MetricsRegistry:
+    """A registry in multiprocess mode, writing to a temporary directory."""
+    monkeypatch.setattr(metrics, "_multiprocess", metrics._Multiprocess(tmp_path))
+    registry = MetricsRegistry()
+    registry.register(Counter("requests", "Requests", ["route"]))
+    registry.register(Gauge("in_flight", "In flight"))
+    registry.register(Gauge("warmup_seconds", "Warmup", aggregate="max"))
+    registry.register(Histogram("latency_seconds", "Latency", buckets=(0.1, 1.0)))
+    return registry
+
+
+def record(registry: MetricsRegistry, requests: int, in_flight: float) -> None:
+    counter = registry.register(Counter("requests", "Requests", ["route"]))
+    assert isinstance(counter, Counter)
+    counter.inc(requests, route="/a")
+    for metric in ("in_flight", "warmup_seconds"):
+        gauge = registry.register(Gauge(metric, ""))
+        assert isinstance(gauge, Gauge)
+        gauge.set(in_flight)
+    histogram = registry.register(Histogram("latency_seconds", ""))
+    assert isinstance(histogram, Histogram)
+    histogram.observe(0.05)
+    histogram.observe(5.0)
+
+
+def run_worker(registry: MetricsRegistry, requests: int, in_flight: float) -> int:
+    """Record metrics in a forked worker, wait for it to exit; return its pid."""
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            assert metrics._multiprocess is not None
+            metrics._multiprocess.forget_file()
+            registry.reset()
+            record(registry, requests, in_flight)
+        except BaseException:
+            code = 1
+        finally:
+            os._exit(code)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    return pid
+
+
+def test_render_adds_up_workers(registry: MetricsRegistry) -> None:
+    run_worker(registry, requests=2, in_flight=5)
+    record(registry, requests=1, in_flight=3)
+
+    lines = registry.render().splitlines()
+
+    assert 'app_requests_total{route="/a"} 3.0' in lines
+    # Gauges only count live workers (the forked one has exited)
+    assert "app_in_flight 3.0" in lines
+    assert 'app_latency_seconds_bucket{le="0.1"} 2' in lines
+    assert 'app_latency_seconds_bucket{le="+Inf"} 4' in lines
+    assert "app_latency_seconds_sum 10.1" in lines
+    assert "app_latency_seconds_count 4" in lines
+
+
+def test_gauge_aggregates(
+    registry: MetricsRegistry, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    run_worker(registry, requests=1, in_flight=5)
+    record(registry, requests=1, in_flight=3)
+    # Treat the exited worker as alive
+    monkeypatch.setattr(metrics, "_pid_alive", lambda pid: True)
+
+    lines = registry.render().splitlines()
+
+    assert "app_in_flight 8.0" in lines
+    assert "app_warmup_seconds 5.0" in lines
+
+
+def test_archived_worker_counts_are_kept(
+    registry: MetricsRegistry, tmp_path: Path
+) -> None:
+    for _ in range(3):
+        registry.archive_worker(run_worker(registry, requests=2, in_flight=5))
+    record(registry, requests=1, in_flight=3)
+
+    lines = registry.render().splitlines()
+
+    assert sorted(path.name for path in tmp_path.glob("*.db")) == sorted(
+        ["archive.db", f"{os.getpid()}.db"]
+    )
+    assert 'app_requests_total{route="/a"} 7.0' in lines
+    assert "app_in_flight 3.0" in lines
+    assert "app_latency_seconds_count 8" in lines
+
+
+def test_value_file_grows(tmp_path: Path) -> None:
+    path = tmp_path / "values.db"
+    values = metrics._ValueFile(path)
+    for index in range(5000):
+        values.write("requests", "", (f"/route/{index}",), float(index))
+
+    stored = metrics._read_values(path)
+    assert len(stored) == 5000
+    assert stored['["requests", "", "/route/4999"]'] == 4999.0
+
+
+def test_single_process_render() -> None:
+    registry = MetricsRegistry()
+    counter = registry.register(Counter("requests", "Requests"))
+    assert isinstance(counter, Counter)
+    counter.inc()
+
+    assert "app_requests_total 1.0" in registry.render().splitlines()
@@ -0,0 +1,56 @@
+"""Tests for middleware registration."""
+
+import pytest
+from fastapi import FastAPI
+
+from core.cache import cache_response
+from core.middleware import (
+    register_middleware,
+    response_cache_middleware,
+    single_flight_middleware,
+)
+from settings import settings
+
+
+def dispatch_functions(app: FastAPI) -> list[object]:
+    """The functions registered with app.middleware("http")."""
+    return [
+        middleware.kwargs["dispatch"]
+        for middleware in app.user_middleware
+        if "dispatch" in middleware.kwargs
+    ]
+
+
+def test_response_cache_needs_a_cached_route() -> None:
+    app = FastAPI()
+
+    @app.get("/plain")
+    async def plain() -> dict[str, str]:
+        return {}
+
+    register_middleware(app)
+    assert response_cache_middleware not in dispatch_functions(app)
+
+
+def test_response_cache_registered_for_cached_route() -> None:
+    app = FastAPI()
+
+    @app.get("/cached")
+    @cache_response(ttl=30)
+    async def cached() -> dict[str, str]:
+        return {}
+
+    register_middleware(app)
+    assert response_cache_middleware in dispatch_functions(app)
+
+
+def test_single_flight_needs_paths(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "single_flight_paths", [])
+    app = FastAPI()
+    register_middleware(app)
+    assert single_flight_middleware not in dispatch_functions(app)
+
+    monkeypatch.setattr(settings, "single_flight_paths", ["/reports/*"])
+    app = FastAPI()
+    register_middleware(app)
+    assert single_flight_middleware in dispatch_functions(app)
@@ -0,0 +1,41 @@
+"""Tests for the sampling request profiler."""
+
+import asyncio
+from collections.abc import Generator
+from typing import Any
+
+import pytest
+
+from core.profiling import RequestProfile
+
+
+class Sleep:
+    """An awaitable that is not a coroutine, like some ASGI apps."""
+
+    def __await__(self) -> Generator[Any, Any, str]:
+        yield from asyncio.sleep(0.05).__await__()
+        return "done"
+
+
+async def handler() -> str:
+    await asyncio.sleep(0.05)
+    return "done"
+
+
+@pytest.mark.parametrize("make", [handler, Sleep])
+async def test_run_returns_result_and_samples(make: Any) -> None:
+    profile = RequestProfile("request-1", interval=0.005)
+
+    assert await profile.run(make()) == "done"
+    assert profile.samples
+    assert not profile.running
+
+
+async def test_run_propagates_errors() -> None:
+    async def fail() -> None:
+        await asyncio.sleep(0)
+        raise ValueError("boom")
+
+    profile = RequestProfile("request-1", interval=0.005)
+    with pytest.raises(ValueError, match="boom"):
+        await profile.run(fail())
@@ -0,0 +1,195 @@
+"""Tests for the rate limiting algorithms and backends."""
+
+from pathlib import Path
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core import server
+from core.ratelimit import (
+    EMPTY_STATE,
+    DatabaseRateLimiter,
+    RateLimitBucket,
+    RateLimitBucketMissing,
+    SharedMemoryRateLimiter,
+    sliding_window,
+    state_lifetime,
+    token_bucket,
+)
+from db.database import async_session_factory
+from settings import RateLimitRule, settings
+
+
+def rule(**overrides: object) -> RateLimitRule:
+    values: dict[str, object] = {"name": "test", "path": "/test", "limit": 3}
+    values.update(overrides)
+    return RateLimitRule.model_validate(values)
+
+
+def test_token_bucket_allows_burst_then_limits() -> None:
+    limit = rule(algorithm="token_bucket", limit=3, period=3.0)
+    state = EMPTY_STATE
+    allowed = []
+    for _ in range(4):
+        decision, state = token_bucket(state, 100.0, limit)
+        allowed.append(decision.allowed)
+
+    assert allowed == [True, True, True, False]
+    # One token per second is refilled
+    assert decision.retry_after == pytest.approx(1.0)
+
+
+def test_token_bucket_refills_over_time() -> None:
+    limit = rule(algorithm="token_bucket", limit=3, period=3.0)
+    state = EMPTY_STATE
+    for _ in range(3):
+        _, state = token_bucket(state, 100.0, limit)
+
+    decision, state = token_bucket(state, 101.0, limit)
+    assert decision.allowed
+    assert decision.remaining == 0
+    decision, _ = token_bucket(state, 101.0, limit)
+    assert not decision.allowed
+
+
+def test_token_bucket_burst_caps_capacity() -> None:
+    limit = rule(algorithm="token_bucket", limit=10, period=10.0, burst=2)
+    state = EMPTY_STATE
+    results = []
+    for _ in range(3):
+        decision, state = token_bucket(state, 100.0, limit)
+        results.append(decision.allowed)
+
+    assert results == [True, True, False]
+
+
+def test_sliding_window_limits_within_period() -> None:
+    limit = rule(limit=3, period=60.0)
+    state = EMPTY_STATE
+    allowed = []
+    for now in (120.0, 130.0, 140.0, 150.0):
+        decision, state = sliding_window(state, now, limit)
+        allowed.append(decision.allowed)
+
+    assert allowed == [True, True, True, False]
+    # The window is full by itself: wait for the next one
+    assert decision.retry_after == pytest.approx(30.0)
+
+
+def test_sliding_window_weights_previous_window() -> None:
+    limit = rule(limit=4, period=60.0)
+    state = EMPTY_STATE
+    for _ in range(4):
+        _, state = sliding_window(state, 150.0, limit)
+
+    # 15s into the next window, 75% of the previous 4 requests still count
+    decision, state = sliding_window(state, 195.0, limit)
+    assert decision.allowed
+    decision, _ = sliding_window(state, 195.0, limit)
+    assert not decision.allowed
+    assert 0 < decision.retry_after < 45.0
+
+
+def test_sliding_window_forgets_after_two_periods() -> None:
+    limit = rule(limit=1, period=60.0)
+    decision, state = sliding_window(EMPTY_STATE, 120.0, limit)
+    assert decision.allowed
+
+    decision, _ = sliding_window(state, 240.0, limit)
+    assert decision.allowed
+
+
+def test_state_lifetime() -> None:
+    assert state_lifetime(rule(limit=10, period=60.0)) == 120.0
+    assert state_lifetime(rule(limit=10, period=60.0, burst=50)) == 300.0
+
+
+def test_shared_memory_limiter_is_shared_between_instances(tmp_path: Path) -> None:
+    """Separate limiters on the same file (e.g. workers) share buckets."""
+    limit = rule(limit=2)
+    first = SharedMemoryRateLimiter(tmp_path / "ratelimit", slots=64)
+    second = SharedMemoryRateLimiter(tmp_path / "ratelimit", slots=64)
+
+    assert first.hit("client", limit, now=100.0).allowed
+    assert second.hit("client", limit, now=100.0).allowed
+    assert not first.hit("client", limit, now=100.0).allowed
+    assert second.hit("other-client", limit, now=100.0).allowed
+
+
+def test_shared_memory_limiter_evicts_oldest_bucket(tmp_path: Path) -> None:
+    """A full probe window reuses the least recently updated slot."""
+    limit = rule(limit=1)
+    limiter = SharedMemoryRateLimiter(tmp_path / "ratelimit", slots=8)
+    for index in range(8):
+        assert limiter.hit(f"client-{index}", limit, now=100.0 + index).allowed
+
+    assert limiter.hit("new-client", limit, now=110.0).allowed
+    # client-0 was evicted, so its limit starts over
+    assert limiter.hit("client-0", limit, now=110.0).allowed
+    assert not limiter.hit("client-7", limit, now=110.0).allowed
+
+
+@pytest.mark.usefixtures("database")
+async def test_database_limiter_deletes_idle_buckets(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(settings, "rate_limit_rules", [rule(limit=5, period=60.0)])
+    now = 10_000.0
+    monkeypatch.setattr("core.ratelimit.time.time", lambda: now)
+    async with async_session_factory() as session, session.begin():
+        session.add_all(
+            [
+                RateLimitBucket(key=1, timestamp=now - 121, value=1, previous=0),
+                RateLimitBucket(key=2, timestamp=now - 60, value=1, previous=0),
+            ]
+        )
+
+    await DatabaseRateLimiter()._delete_expired()
+
+    async with async_session_factory() as session:
+        keys = (await session.scalars(select(RateLimitBucket.key))).all()
+    assert keys == [2]
+
+
+def test_server_requires_forwarded_allow_ips(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "rate_limit_enabled", True)
+    monkeypatch.setattr(settings, "rate_limit_rules", [rule()])
+    monkeypatch.setattr(
+        settings,
+        "__pydantic_fields_set__",
+        settings.model_fields_set - {"forwarded_allow_ips"},
+    )
+    with pytest.raises(SystemExit):
+        server.require_forwarded_allow_ips()
+
+    monkeypatch.setattr(settings, "forwarded_allow_ips", "172.18.0.0/16")
+    server.require_forwarded_allow_ips()
+
+
+@pytest.mark.usefixtures("database")
+async def test_database_limiter_counts_requests(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    limit = rule(limit=2, period=60.0)
+    # Keep the background cleanup from deleting the bucket
+    monkeypatch.setattr(settings, "rate_limit_rules", [limit])
+    monkeypatch.setattr("core.ratelimit.time.time", lambda: 1000.0)
+    limiter = DatabaseRateLimiter()
+
+    decisions = [await limiter.check("client", limit) for _ in range(3)]
+
+    assert [decision.allowed for decision in decisions] == [True, True, False]
+
+
+@pytest.mark.usefixtures("database")
+async def test_database_limiter_reports_a_vanished_bucket(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    async def deleted_by_cleanup(self: AsyncSession, statement: object) -> None:
+        return None
+
+    monkeypatch.setattr(AsyncSession, "scalar", deleted_by_cleanup)
+
+    with pytest.raises(RateLimitBucketMissing):
+        await DatabaseRateLimiter().check("client", rule(), now=1000.0)
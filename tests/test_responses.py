@@ -0,0 +1,112 @@
+"""Tests for streamed list responses."""
+
+import json
+from collections.abc import AsyncIterator
+from typing import Annotated, Any, cast
+
+import pytest
+from fastapi import Depends, FastAPI
+from httpx import ASGITransport, AsyncClient
+from pydantic import BaseModel, ConfigDict, Field
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.ratelimit import RateLimitBucket
+from core.responses import StreamingListResponse
+from db.database import async_session_factory, get_db
+
+
+class Item(BaseModel):
+    model_config = ConfigDict(from_attributes=True, populate_by_name=True)
+
+    key: int = Field(serialization_alias="id")
+
+
+class Rows:
+    """Stand-in for an AsyncScalarResult, recording partition sizes."""
+
+    def __init__(self, count: int) -> None:
+        self.rows = [{"key": key} for key in range(count)]
+        self.sizes: list[int] = []
+
+    async def partitions(self, size: int) -> AsyncIterator[list[dict[str, int]]]:
+        self.sizes.append(size)
+        for start in range(0, len(self.rows), size):
+            yield self.rows[start : start + size]
+
+
+def respond(rows: Rows, **options: Any) -> StreamingListResponse:
+    return StreamingListResponse(cast(Any, rows), Item, **options)
+
+
+async def chunks(response: StreamingListResponse) -> list[bytes]:
+    body = []
+    async for chunk in response.body_iterator:
+        assert isinstance(chunk, bytes)
+        body.append(chunk)
+    return body
+
+
+async def test_json_joins_batches_into_one_array() -> None:
+    rows = Rows(5)
+    response = respond(rows, batch_size=2, meta={"next": None})
+
+    body = await chunks(response)
+
+    assert rows.sizes == [2]
+    assert body == [
+        b'{"items":[',
+        b'{"id":0},{"id":1}',
+        b',{"id":2},{"id":3}',
+        b',{"id":4}',
+        b'],"meta":{"count":5,"next":null}}',
+    ]
+    assert json.loads(b"".join(body))["items"][4] == {"id": 4}
+    assert response.media_type == "application/json"
+
+
+async def test_empty_json() -> None:
+    response = respond(Rows(0))
+
+    assert b"".join(await chunks(response)) == b'{"items":[],"meta":{"count":0}}'
+
+
+async def test_ndjson_has_one_item_per_line() -> None:
+    response = respond(Rows(3), format="ndjson", batch_size=2)
+
+    body = await chunks(response)
+
+    assert body == [b'{"id":0}\n{"id":1}\n', b'{"id":2}\n']
+    assert response.media_type == "application/x-ndjson"
+
+
+@pytest.mark.usefixtures("database")
+async def test_streams_a_table_through_get_db() -> None:
+    async with async_session_factory() as session:
+        session.add_all(
+            RateLimitBucket(key=key, timestamp=0.0, value=0.0, previous=0.0)
+            for key in range(25)
+        )
+        await session.commit()
+
+    app = FastAPI()
+
+    @app.get("/buckets")
+    async def buckets(db: Annotated[AsyncSession, Depends(get_db)]) -> Any:
+        result = await db.stream(
+            select(RateLimitBucket)
+            .order_by(RateLimitBucket.key)
+            .execution_options(yield_per=10)
+        )
+        return StreamingListResponse(result.scalars(), Item, batch_size=10)
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        response = await client.get("/buckets")
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "items": [{"id": key} for key in range(25)],
+        "meta": {"count": 25},
+    }
@@ -0,0 +1,44 @@
+"""Tests for cgroup limit detection."""
+
+from pathlib import Path
+
+import pytest
+
+from core import sizing
+
+
+@pytest.fixture(autouse=True)
+def many_cpus(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(sizing, "_usable_cpus", lambda: 64)
+
+
+def test_detect_limits_cgroup2(tmp_path: Path) -> None:
+    (tmp_path / "cgroup.controllers").write_text("cpu memory")
+    (tmp_path / "cpu.max").write_text("150000 100000")
+    (tmp_path / "memory.max").write_text(str(512 * 1024 * 1024))
+
+    limits = sizing.detect_limits(tmp_path)
+    assert limits.source == "cgroup2"
+    assert limits.cpus == 1.5
+    assert limits.memory_bytes == 512 * 1024 * 1024
+
+
+def test_detect_limits_cgroup1(tmp_path: Path) -> None:
+    (tmp_path / "cpu").mkdir()
+    (tmp_path / "cpu" / "cpu.cfs_quota_us").write_text("200000")
+    (tmp_path / "cpu" / "cpu.cfs_period_us").write_text("100000")
+    (tmp_path / "memory").mkdir()
+    (tmp_path / "memory" / "memory.limit_in_bytes").write_text("9223372036854771712")
+
+    limits = sizing.detect_limits(tmp_path)
+    assert limits.source == "cgroup1"
+    assert limits.cpus == 2.0
+    assert limits.memory_bytes is None
+
+
+def test_detect_limits_unlimited_quota(tmp_path: Path) -> None:
+    (tmp_path / "cpu").mkdir()
+    (tmp_path / "cpu" / "cpu.cfs_quota_us").write_text("-1")
+    (tmp_path / "cpu" / "cpu.cfs_period_us").write_text("100000")
+
+    assert sizing.detect_limits(tmp_path).cpus == 64
@@ -0,0 +1,85 @@
+"""Tests for the cache snapshot file and its writer."""
+
+import asyncio
+import time
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from core import snapshot
+from core.snapshot import SnapshotWriter, restore_snapshot, save_snapshot
+
+
+@pytest.fixture
+def cache(monkeypatch: pytest.MonkeyPatch) -> dict[str, Any]:
+    """A single registered cache holding {"value": ..., "expires_at": ...}."""
+    monkeypatch.setattr(snapshot, "_sections", {})
+    data: dict[str, Any] = {"value": None, "expires_at": 0.0}
+
+    def dump() -> tuple[Any, float] | None:
+        if data["value"] is None:
+            return None
+        return data["value"], data["expires_at"]
+
+    def load(value: Any, expires_at: float) -> None:
+        data.update(value=value, expires_at=expires_at)
+
+    snapshot.register_snapshot("test", dump=dump, load=load)
+    return data
+
+
+def test_save_and_restore(tmp_path: Path, cache: dict[str, Any]) -> None:
+    cache.update(value={"keys": [1, 2]}, expires_at=time.time() + 60)
+    assert save_snapshot(tmp_path / "snapshot.bin") == 1
+
+    cache.update(value=None, expires_at=0.0)
+    assert restore_snapshot(tmp_path / "snapshot.bin") == 1
+    assert cache["value"] == {"keys": [1, 2]}
+
+
+def test_restore_ignores_damaged_file(tmp_path: Path, cache: dict[str, Any]) -> None:
+    cache.update(value="cached", expires_at=time.time() + 60)
+    path = tmp_path / "snapshot.bin"
+    save_snapshot(path)
+    path.write_bytes(path.read_bytes()[:-1] + b"x")
+
+    cache.update(value=None)
+    assert restore_snapshot(path) == 0
+    assert cache["value"] is None
+
+
+async def test_writer_writes_on_start_and_periodically(
+    tmp_path: Path, cache: dict[str, Any]
+) -> None:
+    """A killed worker still leaves a recent snapshot behind."""
+    path = tmp_path / "snapshot.bin"
+    cache.update(value="first", expires_at=time.time() + 60)
+    writer = SnapshotWriter()
+    writer.start(path, interval=0.01)
+    try:
+        for _ in range(100):
+            if path.exists():
+                break
+            await asyncio.sleep(0.01)
+        assert path.exists()
+
+        cache["value"] = "second"
+        await asyncio.sleep(0.1)
+        cache["value"] = None
+        assert restore_snapshot(path) == 1
+        assert cache["value"] == "second"
+    finally:
+        await writer.stop()
+
+
+async def test_writer_writes_on_stop(tmp_path: Path, cache: dict[str, Any]) -> None:
+    path = tmp_path / "snapshot.bin"
+    writer = SnapshotWriter()
+    writer.start(path, interval=3600)
+    cache.update(value="latest", expires_at=time.time() + 60)
+    await writer.stop()
+
+    cache["value"] = None
+    assert restore_snapshot(path) == 1
+    assert cache["value"] == "latest"